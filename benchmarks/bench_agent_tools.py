@@ -0,0 +1,94 @@
+"""Tool calls per question for the search agent, with and without the typed outlet_query tool.
+
+    OPENAI_API_KEY=... TAVILY_API_KEY=... python benchmarks/bench_agent_tools.py --queries queries.txt
+
+Runs every question through the search agent twice: with web_search only,
+and with outlet_query + outlet_coverage + web_search (what OutletPipeline
+uses). Prints tool calls, the tools used and the latency per question, then
+the mean per toolset. This calls the real model (or OPENAI_BASE_URL);
+--stub-web replaces the web search with a tool that finds nothing, so only
+OpenAI is needed. Outlets come from mcdonalds_outlets.json, so no database is
+needed. Questions that fail (e.g. no API access) are reported as failed and
+left out of the means. The offline ScriptedChatModel (fakes.py) cannot stand
+in here: it replays a fixed list of tool calls, so its counts would only
+restate the script.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from langchain.agents import Tool  # noqa: E402
+
+import llm_train  # noqa: E402
+from outlet_snapshot import OutletSnapshot  # noqa: E402
+
+SAMPLE_QUERIES = [
+    "Which McDonald's outlets in Kuala Lumpur are near KLCC?",
+    "What is the phone number of McDonald's Bukit Bintang in Kuala Lumpur?",
+    "Which McDonald's drive-thru outlets are there in Cheras, Kuala Lumpur?",
+    "Where is McDonald's Pandan Mewah in Kuala Lumpur?",
+    "Which McDonald's outlets in Kuala Lumpur are within 3 km of Mid Valley?",
+    "Which McDonald's outlets overlap with McDonald's Suria KLCC's 5 km area?",
+    "Which McDonald's outlet in Kuala Lumpur allows birthday parties?",
+    "Which McDonald's outlets in Kuala Lumpur are open 24 hours?",
+]
+
+
+def run_toolset(label, tools, queries):
+    agent = llm_train.build_search_agent(llm_train.get_llm(), tools)
+    agent.verbose = False
+    calls, failed = [], 0
+    for query in queries:
+        usage = llm_train.ToolUsage()
+        started = time.perf_counter()
+        try:
+            agent.invoke({"input": query}, config={"callbacks": [usage]})
+            error = None
+        except Exception as e:
+            error = str(e)[:200]
+        stats = usage.stats()
+        # A question the agent did not finish says nothing about how many calls it needs
+        if error is None:
+            calls.append(stats["tool_calls"])
+        else:
+            failed += 1
+        print(json.dumps({"label": label, "query": query, "tool_calls": stats["tool_calls"],
+                          "per_tool": stats["per_tool"], "latency_s": round(time.perf_counter() - started, 2),
+                          "error": error}))
+    return {"label": label, "questions": len(queries), "failed": failed,
+            "mean_tool_calls": round(statistics.mean(calls), 2) if calls else None,
+            "max_tool_calls": max(calls) if calls else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search agent tool calls per question")
+    parser.add_argument("--queries", help="file with one query per line (defaults to a built-in sample)")
+    parser.add_argument("--outlets", default=os.path.join(os.path.dirname(__file__), "..", "mcdonalds_outlets.json"))
+    parser.add_argument("--stub-web", action="store_true", help="replace web_search with a tool that finds nothing")
+    args = parser.parse_args()
+
+    queries = SAMPLE_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    with open(args.outlets, encoding="utf-8") as f:
+        outlets = [dict(outlet, id=i + 1) for i, outlet in enumerate(json.load(f))]
+    llm_train.outlet_snapshot = OutletSnapshot(loader=lambda: outlets, version_loader=lambda: 1)
+
+    web = llm_train.get_search_tool()
+    if args.stub_web:
+        web = Tool(name="web_search", func=lambda query: "No results found.", description=web.description)
+    results = [
+        run_toolset("web_search only", [web], queries),
+        run_toolset("typed outlet tools", [llm_train.build_outlet_query_tool(), llm_train.build_coverage_tool(), web], queries),
+    ]
+    for result in results:
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
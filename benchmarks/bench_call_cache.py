@@ -0,0 +1,61 @@
+"""Measure the pipeline with memoized web search and LLM calls.
+
+    # record once against the real APIs (or the stub server), then replay offline
+    python benchmarks/bench_call_cache.py --mode on --cache /tmp/calls.sqlite3
+    python benchmarks/bench_call_cache.py --mode replay --cache /tmp/calls.sqlite3
+
+Each pass runs every query through llm_train.process_query; in "on" mode the
+first pass records and the second is served from the store. In "replay" mode
+any call that was not recorded fails with ReplayMiss, so the run is fully
+offline and deterministic.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+DEFAULT_QUERIES = [
+    "Which outlet allows birthday parties?",
+    "Which McDonald's outlets are open 24 hours?",
+    "Does McDonald's Bukit Bintang have drive-thru?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage call cache benchmark")
+    parser.add_argument("--mode", choices=["on", "replay"], default="on")
+    parser.add_argument("--cache", default="call_cache.sqlite3", help="path of the SQLite call store")
+    parser.add_argument("--queries", help="file with one query per line (defaults to a built-in sample)")
+    parser.add_argument("--passes", type=int, default=2)
+    args = parser.parse_args()
+
+    # The cache is configured at import time, so set it up before importing the pipeline
+    os.environ["CALL_CACHE_MODE"] = args.mode
+    os.environ["CALL_CACHE_PATH"] = args.cache
+    # Measure the per-call caches, not the whole-response cache in front of them
+    os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+    from llm_train import process_query  # noqa: E402
+    from call_cache import call_store  # noqa: E402
+    from bench_utils import summarize  # noqa: E402
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    for number in range(1, args.passes + 1):
+        latencies = []
+        start = time.perf_counter()
+        for query in queries:
+            began = time.perf_counter()
+            process_query(query)
+            latencies.append(time.perf_counter() - began)
+        print(json.dumps(summarize(f"{args.mode} pass {number}", latencies, time.perf_counter() - start)))
+    print(json.dumps(call_store.stats()))
+
+
+if __name__ == "__main__":
+    main()
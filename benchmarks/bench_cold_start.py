@@ -0,0 +1,120 @@
+"""Cold start of the API: import time, then time to first response, readiness and first answers.
+
+    python benchmarks/bench_cold_start.py --runs 5 --outlets 10000
+
+Import time is measured in fresh interpreters (`import main` and `import
+llm_train`). Each server run then starts harness_server.py (scripted LLM and
+web search, outlets from a fixture file, so no network or database is needed)
+and records, from process start: the first answered request (GET /), the
+first 200 from GET /readyz (skipped on commits without it), the first
+GET /outlets and the first completed LLM job. Medians over --runs are printed
+as JSON; run the script on two commits to compare them.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench_harness import free_port
+from fixtures import fixture_outlets, write_outlets
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+OFFLINE_ENV = {"OPENAI_API_KEY": "benchmark", "TAVILY_API_KEY": "benchmark", "POSTGRES_POOL_MIN": "0",
+               "RESPONSE_CACHE_BACKEND": "off", "CALL_CACHE_MODE": "off", "LLM_EMBEDDED_WORKERS": "0"}
+LLM_QUERY = "Which outlet allows birthday parties?"
+
+
+def import_seconds(module):
+    """Wall time of `python -c "import <module>"`, minus the bare interpreter start"""
+    env = dict(os.environ, **OFFLINE_ENV, JOB_QUEUE_PATH=os.path.join(tempfile.gettempdir(), "cold-start.sqlite3"))
+
+    def run(code):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return time.perf_counter() - started
+
+    return run(f"import {module}") - run("pass")
+
+
+def wait_for(client, deadline, method, path, ok=(200,), **kwargs):
+    """Retry a request until it returns one of `ok`; None on a client error (e.g. a missing path) or timeout"""
+    while time.monotonic() < deadline:
+        try:
+            response = client.request(method, path, **kwargs)
+            if response.status_code in ok:
+                return response
+            if 400 <= response.status_code < 500:
+                return None
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def server_run(args, outlets_file):
+    port = free_port()
+    command = [sys.executable, os.path.join(os.path.dirname(__file__), "harness_server.py"), "--port", str(port),
+               "--outlets-file", outlets_file, "--llm-latency", str(args.llm_latency),
+               "--search-latency", str(args.search_latency)]
+    # The API runs its own embedded worker so the first LLM job is answered in-process
+    env = dict(os.environ, **dict(OFFLINE_ENV, LLM_EMBEDDED_WORKERS="1"))
+    started = time.monotonic()
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = started + args.timeout
+    timings = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            since_start = lambda: round(time.monotonic() - started, 3)  # noqa: E731
+            wait_for(client, deadline, "GET", "/")
+            timings["first_response_s"] = since_start()
+            if wait_for(client, deadline, "GET", "/readyz") is not None:
+                timings["ready_s"] = since_start()
+            wait_for(client, deadline, "GET", "/outlets")
+            timings["first_outlets_s"] = since_start()
+            job = wait_for(client, deadline, "POST", "/llmresponses", ok=(200, 202), json={"llmresponse": LLM_QUERY})
+            if job is not None:
+                path = f"/llmresponses/jobs/{job.json()['job_id']}"
+                while client.get(path, params={"wait": 5}).json()["status"] not in ("done", "error"):
+                    if time.monotonic() > deadline:
+                        break
+                else:
+                    timings["first_answer_s"] = since_start()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--outlets", type=int, default=10000)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=120, help="seconds one server run may take")
+    args = parser.parse_args()
+
+    for module in ("llm_train", "main"):
+        seconds = [import_seconds(module) for _ in range(args.runs)]
+        print(json.dumps({"label": f"import {module}", "runs": args.runs,
+                          "median_s": round(statistics.median(seconds), 3), "max_s": round(max(seconds), 3)}))
+
+    with tempfile.TemporaryDirectory(prefix="cold-start-") as directory:
+        outlets_file = write_outlets(fixture_outlets(args.outlets), os.path.join(directory, "outlets.jsonl"))
+        runs = [server_run(args, outlets_file) for _ in range(args.runs)]
+    for milestone in ("first_response_s", "ready_s", "first_outlets_s", "first_answer_s"):
+        values = [run[milestone] for run in runs if milestone in run]
+        if values:
+            print(json.dumps({"label": f"server {milestone[:-2]}", "runs": len(values), "outlets": args.outlets,
+                              "median_s": round(statistics.median(values), 3), "max_s": round(max(values), 3)}))
+
+
+if __name__ == "__main__":
+    main()
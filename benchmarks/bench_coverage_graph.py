@@ -0,0 +1,102 @@
+"""Coverage graph cost vs dataset size: full build, incremental update after a re-scrape, and queries.
+
+    python benchmarks/bench_coverage_graph.py --outlets 1000 10000 100000 --changed 0.01
+
+Outlets are spread nationwide with a fifth of them around a handful of city
+centres (a single tight cluster would make the edge count, and so any
+graph, quadratic). For each size this times building the 5 km graph from
+scratch, then updating it after --changed of the outlets moved, were added
+or were removed (the incremental update should cost a fraction of a
+rebuild and produce the same graph), and the median per-outlet neighbour
+lookup.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from coverage_graph import CoverageGraph  # noqa: E402
+
+CITIES = [(3.139, 101.6869), (5.4141, 100.3288), (1.4927, 103.7414), (4.5975, 101.0901), (1.5533, 110.3592)]
+
+
+def synthetic_outlets(count, seed=0):
+    rng = random.Random(seed)
+    outlets = []
+    for i in range(count):
+        if rng.random() < 0.2:
+            city = rng.choice(CITIES)
+            lat, lng = rng.gauss(city[0], 0.25), rng.gauss(city[1], 0.25)
+        else:
+            lat, lng = rng.uniform(1.2, 6.7), rng.uniform(99.6, 119.3)
+        outlets.append({"id": i + 1, "name": f"McDonald's Outlet {i}", "latitude": lat, "longitude": lng})
+    return outlets
+
+
+def rescrape(outlets, fraction, seed=1):
+    """Copy of `outlets` with `fraction` of them moved, a third as many removed and as many added"""
+    rng = random.Random(seed)
+    changed = max(int(len(outlets) * fraction), 1)
+    outlets = [dict(o) for o in outlets]
+    for outlet in rng.sample(outlets, changed):
+        outlet["latitude"] += rng.uniform(-0.02, 0.02)
+        outlet["longitude"] += rng.uniform(-0.02, 0.02)
+    removed = set(o["id"] for o in rng.sample(outlets, changed // 3))
+    outlets = [o for o in outlets if o["id"] not in removed]
+    next_id = max(o["id"] for o in outlets) + 1
+    for i in range(changed // 3):
+        outlets.append({"id": next_id + i, "name": f"McDonald's New {i}",
+                        "latitude": rng.gauss(CITIES[0][0], 0.25), "longitude": rng.gauss(CITIES[0][1], 0.25)})
+    return outlets
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, round((time.perf_counter() - started) * 1000, 2)
+
+
+def same_graph(a, b):
+    edges = lambda g: sorted(zip(g.ids[g.first].tolist(), g.ids[g.second].tolist()))  # noqa: E731
+    return (np.array_equal(a.ids, b.ids) and edges(a) == edges(b)
+            and np.array_equal(a.overlap_counts, b.overlap_counts)
+            and np.array_equal(a.component_sizes, b.component_sizes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coverage graph benchmark")
+    parser.add_argument("--outlets", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--changed", type=float, default=0.01, help="Share of outlets changed by the re-scrape")
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    for count in args.outlets:
+        outlets = synthetic_outlets(count)
+        graph, build_ms = timed(lambda: CoverageGraph.build(outlets))
+        print(json.dumps(dict(graph.summary(), label="build", build_ms=build_ms)))
+
+        updated_outlets = rescrape(outlets, args.changed)
+        updated, update_ms = timed(lambda: graph.update(updated_outlets))
+        rebuilt, rebuild_ms = timed(lambda: CoverageGraph.build(updated_outlets))
+        print(json.dumps({"label": "update", "outlets": count, "changed": args.changed, "update_ms": update_ms,
+                          "rebuild_ms": rebuild_ms, "matches_rebuild": same_graph(updated, rebuilt)}))
+
+        ids = random.Random(2).sample(updated.ids.tolist(), min(args.queries, len(updated)))
+        timings = []
+        for outlet_id in ids:
+            started = time.perf_counter()
+            updated.neighbours_of(outlet_id)
+            timings.append(time.perf_counter() - started)
+        print(json.dumps({"label": "neighbours_of", "outlets": count, "queries": len(ids),
+                          "median_us": round(statistics.median(timings) * 1e6, 1),
+                          "max_us": round(max(timings) * 1e6, 1)}))
+
+
+if __name__ == "__main__":
+    main()
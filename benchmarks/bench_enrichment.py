@@ -0,0 +1,128 @@
+"""Outlet attribute enrichment: batch cost, incremental reruns and attribute questions with and without it.
+
+    python benchmarks/bench_enrichment.py --outlets 10000 --changed 0.01
+
+The batch part derives attributes for --outlets fixture outlets (fixtures.py)
+from their names and seeded synthetic facility records, the way
+outlet_enrichment.py does, then reruns with a --changed share of the
+facility records edited: only outlets whose enrichment hash changed are
+derived again. The query part asks attribute questions through
+aprocess_query with the scripted model and search from fakes.py, once on a
+snapshot without attributes (the web-search path) and once on an enriched
+one, and reports model calls, web searches and latency. No database, network
+or API keys are needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+os.environ["SESSION_BACKEND"] = "off"
+from langchain_core.tools import Tool  # noqa: E402
+
+import llm_train  # noqa: E402
+from fakes import ScriptedChatModel, ScriptedSearch  # noqa: E402
+from fixtures import fixture_outlets  # noqa: E402
+from outlet_attributes import derive_attributes  # noqa: E402
+from outlet_enrichment import default_sources, enrichment_hash  # noqa: E402
+from outlet_snapshot import outlet_snapshot  # noqa: E402
+
+FACILITIES = ["Drive-Thru", "24 Hours", "Birthday Party", "McCafé", "McDelivery", "Breakfast", "WiFi"]
+QUESTIONS = ["Which outlets are open 24 hours?", "Which outlet allows birthday parties?",
+             "Which outlets have a McCafe and WiFi?", "Is McDonald's Bukit Bintang open 24 hours?",
+             "Does McDonald's Bangsar host birthday parties?"]
+
+
+def facility_records(outlets, seed):
+    rng = random.Random(seed)
+    return [{"name": outlet["name"], "facilities": [label for label in FACILITIES if rng.random() < 0.4]}
+            for outlet in outlets]
+
+
+def enrich(outlets, sources, stored):
+    """One enrichment pass over in-memory rows, updated in place: returns (outlets derived, seconds)"""
+    started = time.perf_counter()
+    pending = []
+    for outlet in outlets:
+        digest = enrichment_hash(outlet, sources)
+        if stored.get(outlet["name"]) != digest:
+            pending.append((outlet, digest))
+    for outlet, digest in pending:
+        stored[outlet["name"]] = digest
+        outlet.update(derive_attributes(outlet, sources))
+    return len(pending), time.perf_counter() - started
+
+
+def bench_batch(args, outlets):
+    records = facility_records(outlets, args.seed)
+    rows = [dict(outlet) for outlet in outlets]
+    stored = {}
+    processed, full = enrich(rows, default_sources(records), stored)
+    rng = random.Random(args.seed + 1)
+    edited = [dict(record) for record in records]
+    for record in rng.sample(edited, int(len(edited) * args.changed)):
+        # Toggle WiFi so the record really changes
+        labels = record["facilities"]
+        record["facilities"] = [label for label in labels if label != "WiFi"] if "WiFi" in labels else labels + ["WiFi"]
+    reprocessed, incremental = enrich(rows, default_sources(edited), stored)
+    print(json.dumps({"label": "enrichment", "outlets": len(outlets), "full_processed": processed,
+                      "full_s": round(full, 3), "outlets_per_s": round(processed / full),
+                      "incremental_processed": reprocessed, "incremental_s": round(incremental, 3)}))
+    return rows
+
+
+class CountingModel(ScriptedChatModel):
+    calls: int = 0
+
+    def reply(self, messages):
+        self.calls += 1
+        return super().reply(messages)
+
+
+async def ask_all(model, search):
+    model.calls, search.calls = 0, 0
+    latencies = []
+    for question in QUESTIONS:
+        started = time.perf_counter()
+        await llm_train.aprocess_query(question)
+        latencies.append(time.perf_counter() - started)
+    return {"questions": len(QUESTIONS), "llm_calls": model.calls, "web_searches": search.calls,
+            "median_ms": round(statistics.median(latencies) * 1000, 2), "max_ms": round(max(latencies) * 1000, 2)}
+
+
+def bench_queries(args, plain, enriched):
+    search = ScriptedSearch(latency=args.search_latency)
+    model = llm_train.llm = CountingModel(latency=args.llm_latency)
+    llm_train.search_tool = Tool(name="web_search", func=search.run, coroutine=search.arun,
+                                 description=llm_train.SEARCH_TOOL_DESCRIPTION)
+    for label, rows in (("without attributes", plain), ("with attributes", enriched)):
+        outlet_snapshot.loader = lambda rows=rows: [dict(row) for row in rows]
+        outlet_snapshot.version_loader = (lambda version=label: version)
+        outlet_snapshot.invalidate()
+        print(json.dumps(dict({"label": label, "outlets": len(rows)}, **asyncio.run(ask_all(model, search)))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outlet attribute enrichment benchmark")
+    parser.add_argument("--outlets", type=int, default=10000)
+    parser.add_argument("--changed", type=float, default=0.01, help="share of facility records edited")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    outlets = fixture_outlets(args.outlets, args.seed)
+    enriched = bench_batch(args, outlets)
+    bench_queries(args, outlets, enriched)
+
+
+if __name__ == "__main__":
+    main()
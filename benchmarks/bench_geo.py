@@ -0,0 +1,84 @@
+"""Benchmark the grid spatial index against a naive Python haversine loop.
+
+    python benchmarks/bench_geo.py --sizes 10000 100000 1000000
+
+Points are synthetic, spread over Peninsular Malaysia and Borneo. The naive
+pairwise-overlap loop is O(n^2) and is only run up to --naive-pairs-limit points.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from geo_index import GeoIndex, EARTH_RADIUS_KM  # noqa: E402
+from bench_utils import time_call  # noqa: E402
+
+
+def naive_haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def naive_radius(points, lat, lon, radius_km):
+    return sorted((d, i) for i, (plat, plon) in enumerate(points)
+                  if (d := naive_haversine(lat, lon, plat, plon)) <= radius_km)
+
+
+def naive_nearest(points, lat, lon, k):
+    return sorted((naive_haversine(lat, lon, plat, plon), i) for i, (plat, plon) in enumerate(points))[:k]
+
+
+def naive_pairs(points, radius_km):
+    pairs = []
+    for i in range(len(points)):
+        for j in range(i + 1, len(points)):
+            if naive_haversine(*points[i], *points[j]) <= 2 * radius_km:
+                pairs.append((i, j))
+    return pairs
+
+
+def synthetic_points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    peninsula = n * 2 // 3
+    lat = np.concatenate([rng.uniform(1.3, 6.7, peninsula), rng.uniform(1.0, 7.0, n - peninsula)])
+    lon = np.concatenate([rng.uniform(100.1, 104.3, peninsula), rng.uniform(109.6, 119.3, n - peninsula)])
+    return lat, lon
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spatial index vs naive loop")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--naive-pairs-limit", type=int, default=5_000)
+    args = parser.parse_args()
+
+    query = (3.139, 101.6869)  # Kuala Lumpur
+    for n in args.sizes:
+        lat, lon = synthetic_points(n)
+        points = list(zip(lat.tolist(), lon.tolist()))
+        start = time.perf_counter()
+        index = GeoIndex(lat, lon)
+        build_s = time.perf_counter() - start
+
+        result = {"n": n, "build_ms": round(build_s * 1000, 2)}
+        result["radius_5km_ms"] = round(time_call(lambda: index.within_radius(*query, 5.0)) * 1000, 3)
+        result["knn_10_ms"] = round(time_call(lambda: index.nearest(*query, k=10)) * 1000, 3)
+        result["bbox_ms"] = round(time_call(lambda: index.within_bbox(3.0, 101.5, 3.3, 101.8)) * 1000, 3)
+        result["naive_radius_5km_ms"] = round(time_call(lambda: naive_radius(points, *query, 5.0), repeat=1) * 1000, 3)
+        result["naive_knn_10_ms"] = round(time_call(lambda: naive_nearest(points, *query, 10), repeat=1) * 1000, 3)
+        pairs_n = min(n, args.naive_pairs_limit)
+        subset = GeoIndex(lat[:pairs_n], lon[:pairs_n])
+        result["pairs_n"] = pairs_n
+        result["pairs_5km_ms"] = round(time_call(lambda: subset.overlapping_pairs(5.0), repeat=1) * 1000, 3)
+        result["naive_pairs_5km_ms"] = round(time_call(lambda: naive_pairs(points[:pairs_n], 5.0), repeat=1) * 1000, 3)
+        result["all_pairs_5km_ms"] = round(time_call(lambda: index.overlapping_pairs(5.0), repeat=1) * 1000, 3)
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
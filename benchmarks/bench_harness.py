@@ -0,0 +1,173 @@
+"""Offline load test of the whole API: outlets, geo, tiles and LLM queries against scripted fakes.
+
+    python benchmarks/bench_harness.py --outlets 50 10000 --concurrency 1 16 64 --output results.json
+    python benchmarks/bench_harness.py --outlets 50 10000 --concurrency 1 16 64 --compare results.json
+
+For every fixture size (fixtures.py) this starts harness_server.py, which
+runs the API with a scripted LLM and web search (fakes.py), then drives
+each scenario at each concurrency and reports throughput, p50/p95/p99 and
+the server's RSS. Nothing touches the network, and fixtures and scripts are
+seeded, so runs on two commits measure the same work. --output saves the
+results with the commit they ran on; --compare prints the change in req/s
+and p99 against a saved run. Pass --postgres to load each fixture into the
+POSTGRES_* database and serve from it instead of from the fixture file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench_llm_load import run_load
+from bench_utils import print_result, run_http_load
+from fixtures import fixture_outlets, load_postgres, write_outlets
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+LLM_QUERY = "Which outlet allows birthday parties?"
+KL = {"lat": 3.139, "lng": 101.6869}
+# Scenario label -> (path, query parameters)
+HTTP_SCENARIOS = {
+    "GET /outlets": ("/outlets", {}),
+    "GET /outlets page": ("/outlets", {"limit": 1000}),
+    "GET /outlets/nearby": ("/outlets/nearby", {**KL, "k": 5}),
+    "GET /outlets/within": ("/outlets/within", {**KL, "radius_km": 5}),
+    "GET /tiles": ("/tiles/11/1601/1007", {}),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def memory_mb(pid):
+    """Current and peak resident memory of a process, from /proc (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return {}
+    return {"rss_mb": round(int(fields["VmRSS"].split()[0]) / 1024, 1),
+            "peak_rss_mb": round(int(fields["VmHWM"].split()[0]) / 1024, 1)}
+
+
+def start_server(args, outlets_file, log):
+    port = free_port()
+    command = [sys.executable, os.path.join(os.path.dirname(__file__), "harness_server.py"), "--port", str(port),
+               "--llm-latency", str(args.llm_latency), "--token-delay", str(args.token_delay),
+               "--search-latency", str(args.search_latency)]
+    if outlets_file:
+        command += ["--outlets-file", outlets_file]
+    if args.script:
+        command += ["--script", args.script]
+    server = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"harness server exited with {server.returncode}; see {log.name}")
+        try:
+            # The first /outlets call also loads the snapshot, outside the measurements
+            if httpx.get(f"{url}/outlets", params={"limit": 1}, timeout=30).status_code == 200:
+                return server, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"harness server did not start; see {log.name}")
+
+
+def run_size(args, count, directory):
+    outlets = fixture_outlets(count, args.seed)
+    outlets_file = None
+    if args.postgres:
+        load_postgres(outlets)
+    else:
+        outlets_file = write_outlets(outlets, os.path.join(directory, f"outlets-{count}.jsonl"))
+    results = []
+    with open(os.path.join(directory, f"server-{count}.log"), "w") as log:
+        server, url = start_server(args, outlets_file, log)
+        try:
+            for label, (path, params) in HTTP_SCENARIOS.items():
+                for concurrency in args.concurrency:
+                    result = asyncio.run(run_http_load("GET", url + path, max(args.requests, concurrency),
+                                                       concurrency, label=f"{label} c={concurrency}",
+                                                       params=params))
+                    results.append(dict(result, outlets=count, **memory_mb(server.pid)))
+                    print_result(results[-1])
+            for concurrency in args.concurrency:
+                _, end_to_end, _, _ = asyncio.run(run_load(url, LLM_QUERY, max(args.llm_requests, concurrency),
+                                                           concurrency, duplicates=False))
+                end_to_end["label"] = f"POST /llmresponses c={concurrency}"
+                results.append(dict(end_to_end, outlets=count, **memory_mb(server.pid)))
+                print_result(results[-1])
+            tracing = httpx.get(f"{url}/metrics", timeout=30).text
+            tokens = sum(float(line.rsplit(" ", 1)[1]) for line in tracing.splitlines()
+                         if line.startswith("llm_tokens_total"))
+            print(json.dumps({"outlets": count, "llm_tokens": tokens}))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    before = {(r["label"], r["outlets"]): r for r in baseline["results"]}
+    print(f"# compared with {baseline.get('commit')} ({baseline_path})")
+    for result in results:
+        old = before.get((result["label"], result["outlets"]))
+        if old is None:
+            continue
+        change = lambda key: round((result[key] - old[key]) / old[key] * 100, 1) if old[key] else None  # noqa: E731
+        print(json.dumps({"label": result["label"], "outlets": result["outlets"],
+                          "req_per_s": result["req_per_s"], "req_per_s_change_pct": change("req_per_s"),
+                          "p99_ms": result["p99_ms"], "p99_change_pct": change("p99_ms")}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline API load test harness")
+    parser.add_argument("--outlets", type=int, nargs="+", default=[50, 10000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=500, help="requests per HTTP scenario and concurrency")
+    parser.add_argument("--llm-requests", type=int, default=64, help="LLM queries per concurrency")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument("--script", help="JSON script for the fake LLM and search (see fakes.py)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--postgres", action="store_true", help="serve each fixture from the POSTGRES_* database")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="saved results to compare against")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="harness-") as directory:
+        for count in args.outlets:
+            results += run_size(args, count, directory)
+    run = {"commit": git_commit(), "created_at": time.time(), "parameters": vars(args), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Load test the LLM job queue against a stub LLM.
+
+    python benchmarks/stub_llm_server.py --port 9000 --latency 1.0 &
+    OPENAI_BASE_URL=http://localhost:9000/v1 python main.py &
+    python benchmarks/bench_llm_load.py --url http://localhost:8000 --concurrency 1 8 32 64
+
+Each client POSTs /llmresponses (which only enqueues) and then long-polls
+GET /llmresponses/jobs/{id} until the answer is ready. "enqueue" is the API
+latency seen by the client; "end to end" includes the queue wait and the
+pipeline. Queries get a numeric suffix so deduplication does not merge them
+(pass --duplicates to measure deduplication instead). Run llm_worker.py
+processes with LLM_EMBEDDED_WORKERS=0 to measure scale-out.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+import httpx
+
+from bench_utils import print_result, summarize
+
+DEFAULT_QUERY = "Which outlet allows birthday parties?"
+
+
+async def run_load(url, query, total, concurrency, duplicates):
+    counter = itertools.count()
+    enqueue_latencies, total_latencies = [], []
+    errors = 0
+    deduplicated = 0
+
+    async def client_loop(client):
+        nonlocal errors, deduplicated
+        while True:
+            number = next(counter)
+            if number >= total:
+                return
+            text = query if duplicates else f"{query} ({number})"
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{url}/llmresponses", json={"llmresponse": text})
+                enqueue_latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+                accepted = response.json()
+                deduplicated += accepted["deduplicated"]
+                while True:
+                    job = (await client.get(f"{url}/llmresponses/jobs/{accepted['job_id']}",
+                                            params={"wait": 30})).json()
+                    if job["status"] in ("done", "error"):
+                        break
+                errors += job["status"] == "error"
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            total_latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        metrics = (await client.get(f"{url}/llmresponses/queue-metrics")).json()
+    return (summarize(f"enqueue c={concurrency}", enqueue_latencies, elapsed),
+            summarize(f"end to end c={concurrency}", total_latencies, elapsed, errors),
+            deduplicated, metrics)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the LLM job queue")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--query", default=DEFAULT_QUERY)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--duplicates", action="store_true", help="send the identical query every time")
+    args = parser.parse_args()
+
+    for concurrency in args.concurrency:
+        enqueue, end_to_end, deduplicated, metrics = asyncio.run(run_load(
+            args.url, args.query, max(args.requests, concurrency), concurrency, args.duplicates))
+        print_result(enqueue)
+        print_result(end_to_end)
+        print(json.dumps({"deduplicated": deduplicated, "queue": metrics}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare time-to-first-token of POST /llmresponses/stream with the blocking POST /llmresponses.
+
+    python benchmarks/stub_llm_server.py --port 9000 --latency 0.5 --token-delay 0.03 &
+    OPENAI_BASE_URL=http://localhost:9000/v1 python main.py &
+    python benchmarks/bench_llm_stream.py --url http://localhost:8000 --requests 20
+
+For the blocking endpoint the first byte of the answer arrives with the whole
+response. For the stream, "first event" is the first stage update and "first
+token" the first piece of the answer.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from bench_utils import summarize
+
+DEFAULT_QUERY = "Which outlet allows birthday parties?"
+
+
+async def blocking(client, url, query):
+    began = time.perf_counter()
+    response = await client.post(f"{url}/llmresponses", json={"llmresponse": query})
+    response.raise_for_status()
+    return time.perf_counter() - began
+
+
+async def streamed(client, url, query):
+    """(first event, first token, done) offsets in seconds"""
+    began = time.perf_counter()
+    first_event = first_token = None
+    async with client.stream("POST", f"{url}/llmresponses/stream", json={"llmresponse": query}) as response:
+        response.raise_for_status()
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: ") and event not in (None, "job"):
+                elapsed = time.perf_counter() - began
+                first_event = first_event or elapsed
+                if event == "token" and first_token is None:
+                    first_token = elapsed
+                if event == "done":
+                    # Answers that are not streamed arrive whole with the done event
+                    return first_event, first_token or elapsed, elapsed
+                if event == "error":
+                    raise RuntimeError(json.loads(line[len("data: "):])["detail"])
+    raise RuntimeError("Stream ended without a done event")
+
+
+async def run(url, query, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(timeout=300) as client:
+        async def limited(func):
+            async with semaphore:
+                return await func(client, url, query)
+
+        start = time.perf_counter()
+        full = await asyncio.gather(*(limited(blocking) for _ in range(total)))
+        blocking_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        streams = await asyncio.gather(*(limited(streamed) for _ in range(total)))
+        stream_elapsed = time.perf_counter() - start
+
+    print(json.dumps(summarize("blocking: full response", full, blocking_elapsed)))
+    for position, label in enumerate(["stream: first event", "stream: first token", "stream: done"]):
+        print(json.dumps(summarize(label, [timing[position] for timing in streams], stream_elapsed)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming time-to-first-token benchmark")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--query", default=DEFAULT_QUERY)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.query, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark outlet-name resolution on synthetic name sets.
+
+    python benchmarks/bench_names.py --sizes 50 10000 50000
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from outlet_names import OutletNameIndex, validate_outlet_mentions  # noqa: E402
+
+
+def synthetic_outlets(n, seed=0):
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))).title() for _ in range(max(50, n // 10))]
+    return [{"name": f"McDonald's {' '.join(rng.sample(words, rng.randint(1, 3)))}{rng.choice(['', ' DT'])}"}
+            for _ in range(n)]
+
+
+def misspell(name, rng):
+    position = rng.randrange(len("McDonald's "), len(name))
+    return name[:position] + rng.choice(string.ascii_lowercase) + name[position + 1:]
+
+
+def per_call_us(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return round((time.perf_counter() - start) / len(items) * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outlet name index benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 10_000, 50_000])
+    parser.add_argument("--samples", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    for n in args.sizes:
+        outlets = synthetic_outlets(n)
+        start = time.perf_counter()
+        index = OutletNameIndex(outlets)
+        build_ms = round((time.perf_counter() - start) * 1000, 2)
+        names = [o["name"] for o in rng.sample(outlets, min(args.samples, n))]
+        typos = [misspell(name, rng) for name in names]
+        response = " ".join(f"- {name}: open 24 hours." for name in names[:10])
+        print(json.dumps({
+            "n": n,
+            "build_ms": build_ms,
+            "exact_us": per_call_us(index.resolve, names),
+            "fuzzy_us": per_call_us(index.resolve, typos),
+            "validate_10_mentions_us": per_call_us(lambda text: validate_outlet_mentions(text, index), [response] * 20),
+        }))
+
+
+if __name__ == "__main__":
+    main()
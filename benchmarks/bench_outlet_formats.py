@@ -0,0 +1,85 @@
+"""Bytes and serialization time of /outlets responses per format, as the outlet count grows.
+
+    python benchmarks/bench_outlet_formats.py --outlets 10000 100000 500000 --limit 1000
+
+For each dataset size this prints the cost of the full JSON list (what plain
+`GET /outlets` returns) and of one page deep into the data, for every
+available format (json always; msgpack and arrow when installed), with all
+fields and with the compact projection `id,name,latitude,longitude`. Page
+numbers should stay flat as --outlets grows. Name-prefix and bbox page
+lookups are timed too.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from outlet_pages import available_formats, encode_page, select_page, OUTLET_FIELDS  # noqa: E402
+from outlet_snapshot import Snapshot  # noqa: E402
+
+COMPACT_FIELDS = ("id", "name", "latitude", "longitude")
+
+
+def synthetic_outlets(count, seed=0):
+    rng = random.Random(seed)
+    outlets = []
+    for i in range(count):
+        latitude, longitude = round(rng.uniform(1.2, 6.7), 8), round(rng.uniform(99.6, 119.3), 8)
+        outlets.append({
+            "id": i + 1,
+            "name": f"McDonald's {rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}{rng.randint(0, 99999):05d}",
+            "address": f"{rng.randint(1, 300)}, Jalan {rng.randint(1, 999)}, Kuala Lumpur",
+            "telephone": f"03-{rng.randint(10000000, 99999999)}",
+            "latitude": latitude,
+            "longitude": longitude,
+            "waze_link": f"https://www.waze.com/live-map/directions?navigate=yes&to=ll.{latitude}%2C{longitude}",
+            "state": "Kuala Lumpur",
+        })
+    return outlets
+
+
+def median_ms(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return result, round(statistics.median(timings) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outlet response format benchmark")
+    parser.add_argument("--outlets", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(json.dumps({"formats": available_formats()}))
+    for count in args.outlets:
+        outlets = synthetic_outlets(count)
+        body, full_ms = median_ms(
+            lambda: json.dumps(outlets, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 1)
+        print(json.dumps({"label": "full list json", "outlets": count, "bytes": len(body), "encode_ms": full_ms}))
+        snapshot = Snapshot(1, outlets)
+        after = snapshot.ids[len(outlets) // 2]
+        (indices, _), select_ms = median_ms(lambda: select_page(snapshot, args.limit, after), args.repeat)
+        for fmt in available_formats():
+            for label, fields in (("all fields", OUTLET_FIELDS), ("compact", COMPACT_FIELDS)):
+                (page, _), encode_ms = median_ms(lambda: encode_page(snapshot, indices, fields, fmt), args.repeat)
+                print(json.dumps({"label": f"page {fmt} {label}", "outlets": count, "rows": len(indices),
+                                  "bytes": len(page), "select_ms": select_ms, "encode_ms": encode_ms}))
+        snapshot.sorted_names, snapshot.geo_index  # build the lazy indexes outside the timings
+        (prefix_page, _), prefix_ms = median_ms(lambda: select_page(snapshot, args.limit, name_prefix="McDonald's Q1"),
+                                                args.repeat)
+        (bbox_page, _), bbox_ms = median_ms(lambda: select_page(snapshot, args.limit, bbox=(3.0, 101.5, 3.3, 101.8)),
+                                            args.repeat)
+        print(json.dumps({"label": "filters", "outlets": count, "name_prefix_rows": len(prefix_page),
+                          "name_prefix_ms": prefix_ms, "bbox_rows": len(bbox_page), "bbox_ms": bbox_ms}))
+
+
+if __name__ == "__main__":
+    main()
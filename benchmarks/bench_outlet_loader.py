@@ -0,0 +1,89 @@
+"""Bulk loader throughput (rows/s) and memory on synthetic files.
+
+    python benchmarks/bench_outlet_loader.py --rows 1000000 --formats json jsonl csv
+    python benchmarks/bench_outlet_loader.py --rows 1000000 --formats jsonl --db
+
+Synthetic files are written row by row to a temporary directory, with the
+untidy values real exports have (padded names, coordinates as strings).
+Without `--db` the loader runs as a dry run: reading, validating,
+normalizing and COPY-encoding are timed, which is the client-side cost. With
+`--db` the rows are really COPYed and merged (POSTGRES_* settings), so use a
+scratch database. Peak RSS shows that memory stays flat as --rows grows.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from outlet_loader import load_file  # noqa: E402
+
+FIELDS = ["name", "address", "telephone", "latitude", "longitude", "state"]
+
+
+def iter_synthetic(count, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "name": f" McDonald's Outlet  {i} ",
+            "address": f"{rng.randint(1, 300)}, Jalan {rng.randint(1, 999)}, Kuala Lumpur",
+            "telephone": f"03-{rng.randint(10000000, 99999999)}",
+            "latitude": f"{rng.uniform(1.2, 6.7):.8f}",
+            "longitude": f"{rng.uniform(99.6, 119.3):.8f}",
+            "state": "Kuala Lumpur",
+        }
+
+
+def write_file(path, fmt, count):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, FIELDS)
+            writer.writeheader()
+            writer.writerows(iter_synthetic(count))
+        elif fmt == "jsonl":
+            for record in iter_synthetic(count):
+                f.write(json.dumps(record) + "\n")
+        else:
+            f.write("[\n")
+            for i, record in enumerate(iter_synthetic(count)):
+                f.write((",\n" if i else "") + json.dumps(record, indent=4))
+            f.write("\n]\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outlet loader benchmark")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--formats", nargs="+", default=["json", "jsonl", "csv"], choices=["json", "jsonl", "csv"])
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--db", action="store_true", help="load into Postgres instead of a dry run")
+    args = parser.parse_args()
+
+    conn = None
+    if args.db:
+        from mcdonalds_scraper import setup_database
+
+        conn = setup_database()
+        if conn is None:
+            sys.exit("No database connection")
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt in args.formats:
+            path = os.path.join(directory, f"outlets.{fmt}")
+            started = time.perf_counter()
+            write_file(path, fmt, args.rows)
+            written = time.perf_counter() - started
+            stats = load_file(conn, path, fmt, args.chunk_size)
+            print(json.dumps(dict(
+                stats, label=f"{fmt} {'copy' if conn else 'dry run'}",
+                file_mb=round(os.path.getsize(path) / 1e6, 1), write_s=round(written, 1),
+                peak_rss_mb=round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1))))
+    if conn:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Diff-based outlet sync vs DELETE-all + reinsert on synthetic datasets.
+
+    python benchmarks/bench_outlet_sync.py --outlets 100000 --change 0.01
+    python benchmarks/bench_outlet_sync.py --outlets 100000 --change 0.01 --db
+
+Scenarios: the initial load into an empty table, a re-scrape with nothing
+changed, and one where `--change` of the outlets were updated, deleted and
+added (a third each). Without `--db` only the in-process diff is timed; with
+`--db` each scenario also runs against Postgres (POSTGRES_* settings) inside
+a transaction that is rolled back, next to the old DELETE + INSERT, so the
+real table is left untouched.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from outlet_sync import diff_outlets, outlet_hash, sync_outlets  # noqa: E402
+
+
+def synthetic_outlets(count, seed=0):
+    rng = random.Random(seed)
+    return [{
+        "name": f"McDonald's Outlet {i}",
+        "address": f"{rng.randint(1, 300)}, Jalan {rng.randint(1, 999)}, {rng.randint(10000, 99999)} Kuala Lumpur",
+        "telephone": f"03-{rng.randint(10000000, 99999999)}",
+        "latitude": round(rng.uniform(1.2, 6.7), 8),
+        "longitude": round(rng.uniform(99.6, 119.3), 8),
+        "waze_link": f"https://www.waze.com/live-map/directions?navigate=yes&to=ll.{i}",
+        "state": "Kuala Lumpur",
+    } for i in range(count)]
+
+
+def mutate(outlets, fraction, seed=1):
+    """Update, delete and add `fraction` of the outlets in total, a third each"""
+    rng = random.Random(seed)
+    changed = [dict(outlet) for outlet in outlets]
+    share = max(1, int(len(outlets) * fraction / 3))
+    for outlet in rng.sample(changed, share):
+        outlet["telephone"] = f"03-{rng.randint(10000000, 99999999)}"
+    for index in sorted(rng.sample(range(len(changed)), share), reverse=True):
+        del changed[index]
+    changed.extend(synthetic_outlets(share, seed=2))
+    for i, outlet in enumerate(changed[-share:]):
+        outlet["name"] = f"McDonald's New Outlet {i}"
+    return changed
+
+
+def legacy_replace(cur, outlets):
+    from psycopg2.extras import execute_values
+
+    cur.execute("DELETE FROM mcdonalds_ai")
+    execute_values(cur, "INSERT INTO mcdonalds_ai (name, address, telephone, latitude, longitude, waze_link, state) "
+                        "VALUES %s", [(o["name"], o["address"], o["telephone"], o["latitude"], o["longitude"],
+                                       o["waze_link"], o["state"]) for o in outlets])
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outlet sync benchmark")
+    parser.add_argument("--outlets", type=int, default=100000)
+    parser.add_argument("--change", type=float, default=0.01, help="fraction of outlets changed per re-scrape")
+    parser.add_argument("--db", action="store_true", help="also run against Postgres (rolled back)")
+    args = parser.parse_args()
+
+    base = synthetic_outlets(args.outlets)
+    changed = mutate(base, args.change)
+    stored = {outlet["name"]: outlet_hash(outlet) for outlet in base}
+    scenarios = [("initial", {}, base), ("unchanged", stored, base), (f"changed {args.change:.0%}", stored, changed)]
+    for label, previous, outlets in scenarios:
+        (upserts, changes), elapsed = timed(diff_outlets, previous, outlets)
+        print(json.dumps({"label": f"diff {label}", "outlets": len(outlets), "writes": len(upserts),
+                          "changes": len(changes), "elapsed_s": round(elapsed, 3),
+                          "outlets_per_s": round(len(outlets) / elapsed)}))
+
+    if not args.db:
+        return
+    from mcdonalds_scraper import setup_database
+
+    conn = setup_database()
+    if conn is None:
+        sys.exit("No database connection")
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM mcdonalds_ai")
+            for label, _, outlets in scenarios:
+                summary, elapsed = timed(sync_outlets, cur, outlets)
+                print(json.dumps(dict(summary, label=f"sync {label}", elapsed_s=round(elapsed, 3))))
+                _, elapsed = timed(legacy_replace, cur, outlets)
+                print(json.dumps({"label": f"delete+insert {label}", "rows_written": len(outlets),
+                                  "elapsed_s": round(elapsed, 3)}))
+                # Put the sync's view back: the legacy path leaves rows without hashes
+                sync_outlets(cur, outlets)
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Concurrent load benchmark for GET /outlets.
+
+Start the API against a local Postgres (`python main.py`), then run:
+
+    python benchmarks/bench_outlets.py --url http://localhost:8000 --concurrency 50 --requests 2000
+
+Run it once on the commit before a change and once after to compare
+p50/p99 latency and req/s.
+"""
+import argparse
+import asyncio
+
+from bench_utils import print_result, run_http_load
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test GET /outlets")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--label", default="GET /outlets")
+    args = parser.parse_args()
+
+    for concurrency in args.concurrency:
+        result = asyncio.run(run_http_load(
+            "GET", f"{args.url}/outlets", args.requests, concurrency,
+            label=f"{args.label} c={concurrency}"))
+        print_result(result)
+
+
+if __name__ == "__main__":
+    main()
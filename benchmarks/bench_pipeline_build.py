@@ -0,0 +1,93 @@
+"""Measure per-request construction overhead of the LLM pipeline with a fake LLM.
+
+    python benchmarks/bench_pipeline_build.py --requests 200
+
+"per-request build" rebuilds the chains and agent for every query (what
+llm_train did before OutletPipeline); "shared pipeline" reuses one instance.
+Both run the same scripted fake LLM, so the difference is pure construction
+cost. Allocations are counted with tracemalloc.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# llm_train builds API clients at import time; no network calls are made here
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from langchain.agents import Tool  # noqa: E402
+from langchain_community.llms.fake import FakeListLLM  # noqa: E402
+
+import llm_train  # noqa: E402
+
+DETECTION = "Which McDonald's outlet in Kuala Lumpur allows birthday parties?"
+SEARCH = "Final Answer: - McDonald's Bukit Bintang: Offers birthday party facilities"
+FINAL = "McDonald's Bukit Bintang offers birthday party facilities."
+
+
+def fake_llm():
+    return FakeListLLM(responses=[DETECTION, SEARCH, FINAL])
+
+
+def fake_tools():
+    return [Tool(name="web_search", func=lambda q: "no results", description="fake search")]
+
+
+def run_query(pipeline):
+    detected = pipeline.detection_chain.run("Which outlet allows birthday parties?")
+    found = pipeline.search_agent.run(detected)
+    return pipeline.conclusion_chain.run(original_query=detected, first_response=found, second_response="")
+
+
+def measure(label, make_pipeline, requests):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    for _ in range(requests):
+        run_query(make_pipeline())
+    elapsed = time.perf_counter() - start
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocations = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return {
+        "label": label,
+        "requests": requests,
+        "per_request_ms": round(elapsed / requests * 1000, 3),
+        "retained_allocations": allocations,
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline construction overhead")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    llm, tools = fake_llm(), fake_tools()
+    # Silence the agent's verbose tracing so it does not dominate the timings
+    shared = llm_train.OutletPipeline(llm, tools)
+    shared.search_agent.verbose = False
+
+    def rebuilt():
+        pipeline = llm_train.OutletPipeline(llm, tools)
+        pipeline.search_agent.verbose = False
+        return pipeline
+
+    build_only = time.perf_counter()
+    for _ in range(args.requests):
+        llm_train.OutletPipeline(llm, tools)
+    build_ms = (time.perf_counter() - build_only) / args.requests * 1000
+
+    print(json.dumps({"construction_only_ms": round(build_ms, 3)}))
+    print(json.dumps(measure("per-request build", rebuilt, args.requests)))
+    print(json.dumps(measure("shared pipeline", lambda: shared, args.requests)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Replay a query log against the response cache, using a stubbed LLM chain.
+
+    python benchmarks/bench_response_cache.py --queries query_log.txt --llm-latency 0.2
+
+Without `--queries` a synthetic log is generated: questions drawn from a skewed
+(Zipf-like) distribution, each asked in several phrasings ("KL", casing,
+punctuation, word order). Every configuration replays the same log; misses pay
+the stubbed chain latency, hits only the cache lookup.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from response_cache import ResponseCache, InMemoryBackend, SQLiteBackend, hashing_embedder  # noqa: E402
+from bench_utils import summarize  # noqa: E402
+
+QUESTIONS = [
+    "Which outlet allows birthday parties?",
+    "Which McDonald's outlets are open 24 hours?",
+    "Which outlets serve breakfast?",
+    "Does McDonald's Bukit Bintang have drive-thru?",
+    "What time does McDonald's Bangsar close?",
+    "Which outlets have free wifi?",
+    "Is there a McDonald's with a playground in Cheras?",
+    "Which McDonald's in KL offers delivery?",
+    "What are the opening hours of McDonald's Sri Petaling?",
+    "Which outlets have parking?",
+]
+PHRASINGS = [
+    lambda q: q,
+    lambda q: q.lower(),
+    lambda q: q.rstrip("?") + " in KL?",
+    lambda q: q.rstrip("?") + " in Kuala Lumpur",
+    lambda q: q.replace("Which", "which").replace("?", " ?"),
+    lambda q: "Tell me: " + q.rstrip("?").lower(),
+    lambda q: q.replace("outlets ", "outlet ").replace("Which outlet ", "Which outlets "),
+]
+LLM_CALLS_PER_QUERY = 3
+
+
+def synthetic_log(size, seed):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(QUESTIONS))]
+    log = []
+    for _ in range(size):
+        question = rng.choices(QUESTIONS, weights)[0]
+        log.append((rng.choice(PHRASINGS)(question), question))
+    return log
+
+
+def replay(label, log, cache, latency):
+    """Replay (query, intended question) pairs; a hit answering another question counts as wrong"""
+    latencies = []
+    wrong = 0
+    start = time.perf_counter()
+    for query, question in log:
+        began = time.perf_counter()
+        response = cache.get(query, '"v1"') if cache else None
+        if response is None:
+            time.sleep(latency * LLM_CALLS_PER_QUERY)
+            response = f"stub answer for {question}"
+            if cache:
+                cache.put(query, '"v1"', response)
+        elif response != f"stub answer for {question}":
+            wrong += 1
+        latencies.append(time.perf_counter() - began)
+    result = summarize(label, latencies, time.perf_counter() - start)
+    result["wrong_hits"] = wrong
+    if cache:
+        result.update({key: value for key, value in cache.stats().items() if key != "stores"})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response cache replay benchmark")
+    parser.add_argument("--queries", help="query log, one query per line (defaults to a synthetic log)")
+    parser.add_argument("--size", type=int, default=300, help="length of the synthetic log")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per stubbed LLM call")
+    parser.add_argument("--threshold", type=float, default=0.85, help="semantic similarity threshold")
+    args = parser.parse_args()
+
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            # Without labels every distinct line counts as its own question
+            log = [(line.strip(), line.strip()) for line in f if line.strip()]
+    else:
+        log = synthetic_log(args.size, args.seed)
+
+    with tempfile.TemporaryDirectory() as folder:
+        configurations = [
+            ("no cache", None),
+            ("exact / memory", ResponseCache(InMemoryBackend())),
+            ("exact / sqlite", ResponseCache(SQLiteBackend(os.path.join(folder, "cache.sqlite3")))),
+            ("semantic / memory", ResponseCache(InMemoryBackend(), embed=hashing_embedder(),
+                                                threshold=args.threshold)),
+        ]
+        for label, cache in configurations:
+            print(json.dumps(replay(label, log, cache, args.llm_latency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare query latency with and without the fast-path router, using a stubbed LLM chain.
+
+    python benchmarks/bench_router.py --llm-latency 0.2 --queries queries.txt
+
+The stub chain sleeps `--llm-latency` seconds per LLM call and makes the same
+five sequential calls as llm_train.process_query. Outlets come from
+mcdonalds_outlets.json, so no database or API keys are needed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from outlet_snapshot import Snapshot  # noqa: E402
+from query_router import route_query, router_metrics  # noqa: E402
+from bench_utils import summarize  # noqa: E402
+
+SAMPLE_QUERIES = [
+    "Which outlet allows birthday parties?",
+    "Which McDonald's outlets are open 24 hours?",
+    "outlets near KLCC",
+    "telephone of McDonald's Bangsar",
+    "What is the address of McDonald's Mid Valley 3?",
+    "Where is the nearest KFC?",
+    "What's the weather in KL today?",
+    "Which McDonald's is near Cheras?",
+    "Does McDonald's Bukit Bintang have drive-thru?",
+    "Waze directions to McDonald's Suria KLCC",
+    "Which outlets serve breakfast?",
+    "Phone number for McDonalds Sri Petaling",
+]
+LLM_CALLS_PER_QUERY = 5
+
+
+def stub_chain(query, latency):
+    for _ in range(LLM_CALLS_PER_QUERY):
+        time.sleep(latency)
+    return f"stub answer for {query}"
+
+
+def run(queries, latency, snapshot, use_router):
+    latencies = []
+    start = time.perf_counter()
+    for query in queries:
+        began = time.perf_counter()
+        route = route_query(query, snapshot) if use_router else None
+        if route is None or route.kind == "llm":
+            stub_chain(query, latency)
+        latencies.append(time.perf_counter() - began)
+    return summarize("router" if use_router else "llm only", latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fast-path router latency benchmark")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per stubbed LLM call")
+    parser.add_argument("--queries", help="file with one query per line (defaults to a built-in sample)")
+    parser.add_argument("--outlets", default=os.path.join(os.path.dirname(__file__), "..", "mcdonalds_outlets.json"))
+    args = parser.parse_args()
+
+    queries = SAMPLE_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    with open(args.outlets, encoding="utf-8") as f:
+        outlets = [dict(o, id=i + 1) for i, o in enumerate(json.load(f))]
+    snapshot = Snapshot(0, outlets)
+
+    for use_router in (False, True):
+        print(json.dumps(run(queries, args.llm_latency, snapshot, use_router)))
+    print(json.dumps(router_metrics()))
+
+
+if __name__ == "__main__":
+    main()
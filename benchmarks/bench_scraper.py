@@ -0,0 +1,51 @@
+"""Scraper throughput (outlets/s) against local fixture pages, by number of workers.
+
+    python benchmarks/bench_scraper.py --states 16 --latency 0.5 --workers 1 4 8
+
+Each state page is delayed by `--latency` seconds to stand in for the time a
+browser needs to load and render the locator, so the numbers show how well
+the engine overlaps states rather than raw HTTP speed. `--fail-first` makes
+the first request(s) for every state fail to include the retry path.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import mcdonalds_scraper  # noqa: E402
+from mcdonalds_scraper import HttpFetcher, scrape_states  # noqa: E402
+from scraper_fixture_server import build_pages, load_outlets, serve, state_names  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel scraper benchmark")
+    parser.add_argument("--states", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per fixture page")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--fail-first", type=int, default=0, help="failed requests per state before success")
+    args = parser.parse_args()
+
+    # Keep retry pauses short so the benchmark measures the engine, not the backoff
+    mcdonalds_scraper.RETRY_BACKOFF = 0.05
+    states = state_names(args.states)
+    for workers in args.workers:
+        server = serve(build_pages(load_outlets(), states), latency=args.latency, fail_first=args.fail_first)
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        started = time.perf_counter()
+        outlets, failed = scrape_states(states, lambda: HttpFetcher(base_url, timeout=10), workers)
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+        print(json.dumps({
+            "label": f"workers={workers}",
+            "states": len(states),
+            "outlets": len(outlets),
+            "failed_states": len(failed),
+            "elapsed_s": round(elapsed, 3),
+            "outlets_per_s": round(len(outlets) / elapsed, 1),
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Browserless vs Selenium extraction against local fixtures: startup, wall time and memory.
+
+    python benchmarks/bench_scraper_modes.py --states 16 --workers 4 --modes http pages selenium
+
+Every mode runs in a fresh Python process so imports and memory are measured
+from scratch. "startup" is importing the scraper plus listing the states
+(for Selenium this includes launching Chrome); "wall" is the whole run.
+Peak RSS covers the process and its reaped children (chromedriver, Chrome).
+Modes that cannot start here, e.g. Selenium without Chrome, are reported as
+unavailable instead of failing the run.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from scraper_fixture_server import build_pages, load_outlets, serve, state_names
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def run_mode(mode, base_url, workers):
+    """Child process: scrape every fixture state in one mode and print a JSON result line"""
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    from mcdonalds_scraper import make_fetcher_factory, scrape_states
+
+    make_fetcher = make_fetcher_factory(mode, timeout=30, fixtures=base_url)
+    fetcher = make_fetcher()
+    try:
+        states = fetcher.list_states()
+    finally:
+        fetcher.close()
+    startup = time.perf_counter() - started
+    outlets, failed = scrape_states(states, make_fetcher, workers, retries=0)
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is in KiB on Linux
+    peak_kib = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    print(json.dumps({
+        "label": mode,
+        "outlets": len(outlets),
+        "failed_states": len(failed),
+        "startup_s": round(startup, 3),
+        "wall_s": round(elapsed, 3),
+        "outlets_per_s": round(len(outlets) / elapsed, 1),
+        "peak_rss_mb": round(peak_kib / 1024, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scraper extraction mode benchmark")
+    parser.add_argument("--states", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per fixture response")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", default=["http", "pages", "selenium"],
+                        choices=["auto", "http", "pages", "selenium"])
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "URL"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(args.child[0], args.child[1], args.workers)
+        return
+
+    server = serve(build_pages(load_outlets(), state_names(args.states)), latency=args.latency)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        for mode in args.modes:
+            result = subprocess.run(
+                [sys.executable, __file__, "--workers", str(args.workers), "--child", mode, base_url],
+                capture_output=True, text=True)
+            lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+            if result.returncode != 0 or not lines:
+                error = (result.stderr.strip().splitlines() or ["no output"])[-1]
+                print(json.dumps({"label": mode, "unavailable": error}))
+                continue
+            print(lines[-1])
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Session memory: store cost per backend, and how follow-up questions fare with and without their context.
+
+    python benchmarks/bench_sessions.py --sessions 10000 --turns 5 --llm-latency 0.5
+
+The store part records --turns turns for each of --sessions sessions (with
+--max-sessions as the LRU bound) and reads every session back, in memory and
+in SQLite. The conversation part runs a few scripted conversations through
+aprocess_query with the scripted model and search from fakes.py, once with
+a session id and once without, and reports how many questions were turned
+away, answered from earlier turns, model calls, web searches and wall time. Outlets come from mcdonalds_outlets.json, so no database or API
+keys are needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+from langchain_core.tools import Tool  # noqa: E402
+
+import llm_train  # noqa: E402
+from fakes import ScriptedChatModel, ScriptedSearch  # noqa: E402
+from outlet_snapshot import outlet_snapshot  # noqa: E402
+from response_cache import InMemoryBackend, SQLiteBackend  # noqa: E402
+from session_memory import SessionMemory, session_memory  # noqa: E402
+
+CONVERSATIONS = [
+    ["Which outlet allows birthday parties?", "What are their phone numbers?", "Are they open 24 hours?"],
+    ["Where is McDonald's Bukit Bintang?", "What is its phone number?", "Does it have a drive-thru?"],
+    ["Which McDonald's outlets are near KLCC?", "Which of those are open 24 hours?",
+     "How do I get there on Waze?"],
+]
+ANSWER = "McDonald's Bukit Bintang: lots of text about the outlet. " * 20
+
+
+def bench_store(label, backend, sessions, turns):
+    memory = SessionMemory(backend, max_turns=turns)
+    started = time.perf_counter()
+    for turn in range(turns):
+        for session in range(sessions):
+            memory.record(f"session-{session}", {"query": f"question {turn}", "response": ANSWER})
+    recorded = time.perf_counter() - started
+    started = time.perf_counter()
+    for session in range(sessions):
+        memory.turns(f"session-{session}")
+    read = time.perf_counter() - started
+    stats = memory.stats()
+    print(json.dumps({"label": label, "sessions_written": sessions, "turns_per_session": turns,
+                      "record_us": round(recorded / (sessions * turns) * 1e6, 1),
+                      "read_us": round(read / sessions * 1e6, 1), "sessions_kept": stats["sessions"],
+                      "evictions": stats["evictions"]}))
+
+
+class CountingModel(ScriptedChatModel):
+    calls: int = 0
+
+    def reply(self, messages):
+        self.calls += 1
+        return super().reply(messages)
+
+
+async def run_conversations(model, search, with_sessions):
+    model.calls, search.calls = 0, 0
+    session_memory.metrics.clear()
+    rejected = 0
+    started = time.perf_counter()
+    for number, questions in enumerate(CONVERSATIONS):
+        session_id = f"conversation-{number}" if with_sessions else None
+        for question in questions:
+            response = await llm_train.aprocess_query(question, session_id=session_id)
+            rejected += response == llm_train.default_response()
+    # Without context, follow-ups such as "What are their phone numbers?" are turned away as off-topic
+    return {"label": "with sessions" if with_sessions else "without sessions",
+            "questions": sum(map(len, CONVERSATIONS)), "rejected": rejected,
+            "follow_ups_answered_locally": session_memory.metrics["follow_ups_answered_locally"],
+            "llm_calls": model.calls, "web_searches": search.calls,
+            "elapsed_s": round(time.perf_counter() - started, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session memory benchmark")
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--max-sessions", type=int, default=5000)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    bench_store("memory", InMemoryBackend(args.max_sessions), args.sessions, args.turns)
+    with tempfile.TemporaryDirectory() as directory:
+        bench_store("sqlite", SQLiteBackend(os.path.join(directory, "sessions.sqlite3"), args.max_sessions,
+                                            table="sessions"), args.sessions, args.turns)
+
+    with open(os.path.join(os.path.dirname(__file__), "..", "mcdonalds_outlets.json"), encoding="utf-8") as f:
+        outlets = [dict(outlet, id=i + 1) for i, outlet in enumerate(json.load(f))]
+    outlet_snapshot.loader = lambda: outlets
+    outlet_snapshot.version_loader = lambda: 1
+    search = ScriptedSearch(latency=args.search_latency)
+    model = llm_train.llm = CountingModel(latency=args.llm_latency)
+    llm_train.search_tool = Tool(name="web_search", func=search.run, coroutine=search.arun,
+                                 description=llm_train.SEARCH_TOOL_DESCRIPTION)
+    for with_sessions in (False, True):
+        print(json.dumps(asyncio.run(run_conversations(model, search, with_sessions))))
+
+
+if __name__ == "__main__":
+    main()
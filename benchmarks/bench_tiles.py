@@ -0,0 +1,79 @@
+"""Map tile cost vs dataset size: bytes and render time per viewport, against the full outlet list.
+
+    python benchmarks/bench_tiles.py --outlets 50 10000 100000 500000
+
+Outlets are spread over Peninsular Malaysia and Borneo. For each size and
+zoom this renders the 4x3 tiles of a 1024x768 viewport over Kuala Lumpur:
+once cold (including building the zoom level's clusters) and once from the
+tile cache. Viewport bytes and cluster counts should stay bounded as
+--outlets grows, while the full JSON list grows linearly.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tile_index import TileIndex  # noqa: E402
+
+CENTER = (3.139, 101.6869)
+
+
+def synthetic_outlets(count, seed=0):
+    rng = random.Random(seed)
+    outlets = []
+    for i in range(count):
+        # Cluster around KL like the real data, with the rest spread nationwide
+        if rng.random() < 0.3:
+            lat, lng = rng.gauss(CENTER[0], 0.08), rng.gauss(CENTER[1], 0.08)
+        else:
+            lat, lng = rng.uniform(1.2, 6.7), rng.uniform(99.6, 119.3)
+        outlets.append({"id": i + 1, "name": f"McDonald's Outlet {i}", "address": f"{i}, Jalan Example",
+                        "telephone": "03-12345678", "latitude": lat, "longitude": lng,
+                        "waze_link": f"https://www.waze.com/live-map/directions?navigate=yes&to=ll.{lat}%2C{lng}"})
+    return outlets
+
+
+def viewport_tiles(zoom, width_tiles=4, height_tiles=3):
+    n = 2 ** zoom
+    lat = math.radians(CENTER[0])
+    x = int((CENTER[1] + 180) / 360 * n)
+    y = int((1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * n)
+    return [(zoom, (x + dx) % n, min(max(y + dy, 0), n - 1))
+            for dx in range(-(width_tiles // 2), width_tiles - width_tiles // 2)
+            for dy in range(-(height_tiles // 2), height_tiles - height_tiles // 2)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Map tile benchmark")
+    parser.add_argument("--outlets", type=int, nargs="+", default=[50, 10000, 100000, 500000])
+    parser.add_argument("--zooms", type=int, nargs="+", default=[5, 8, 11, 14])
+    args = parser.parse_args()
+
+    for count in args.outlets:
+        outlets = synthetic_outlets(count)
+        started = time.perf_counter()
+        full = json.dumps(outlets, separators=(",", ":")).encode("utf-8")
+        print(json.dumps({"label": "full list", "outlets": count, "bytes": len(full),
+                          "encode_ms": round((time.perf_counter() - started) * 1000, 2)}))
+        index = TileIndex(outlets)
+        for zoom in args.zooms:
+            tiles = viewport_tiles(zoom)
+            started = time.perf_counter()
+            bodies = [index.render(*tile) for tile in set(tiles)]
+            cold = time.perf_counter() - started
+            started = time.perf_counter()
+            for tile in set(tiles):
+                index.render(*tile)
+            cached = time.perf_counter() - started
+            clusters = sum(len(json.loads(body)["clusters"]) for body in bodies)
+            print(json.dumps({"label": f"viewport z={zoom}", "outlets": count, "tiles": len(bodies),
+                              "clusters": clusters, "bytes": sum(map(len, bodies)),
+                              "cold_ms": round(cold * 1000, 2), "cached_ms": round(cached * 1000, 3)}))
+
+
+if __name__ == "__main__":
+    main()
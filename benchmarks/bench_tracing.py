@@ -0,0 +1,67 @@
+"""Overhead of pipeline tracing: a DAG of no-op stages with tracing on and off.
+
+    python benchmarks/bench_tracing.py --runs 2000 --stages 8
+
+Each run opens a trace and executes --stages trivial PipelineRun stages (the
+shape of one query without any LLM work), so the difference between the
+modes is the full cost of spans, histograms and trace export. The per-call
+cost of `span` and `count` is measured on its own too.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import tracing  # noqa: E402
+from pipeline_dag import PipelineRun  # noqa: E402
+
+
+async def one_query(stages):
+    with tracing.trace("query"):
+        run = PipelineRun()
+        previous = []
+        for i in range(stages):
+            run.start(f"stage{i}", lambda **inputs: None, deps=previous)
+            previous = [f"stage{i}"]
+        await run.result(previous[0])
+        await run.close()
+
+
+async def measure_runs(runs, stages):
+    started = time.perf_counter()
+    for _ in range(runs):
+        await one_query(stages)
+    return (time.perf_counter() - started) / runs
+
+
+def measure_calls(calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        with tracing.span("db", "select"):
+            pass
+        tracing.count("bench_total", kind="x")
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tracing overhead benchmark")
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--stages", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=100000)
+    args = parser.parse_args()
+
+    for enabled in (False, True):
+        tracing.TRACING_ENABLED = enabled
+        tracing.metrics.reset()
+        per_run = asyncio.run(measure_runs(args.runs, args.stages))
+        per_call = measure_calls(args.calls)
+        print(json.dumps({"tracing": "on" if enabled else "off", "stages": args.stages,
+                          "per_query_us": round(per_run * 1e6, 1), "span_and_count_us": round(per_call * 1e6, 3),
+                          "metrics_bytes": len(tracing.render_metrics())}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Shared helpers for the benchmark scripts in this folder"""
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, pct):
+    """Return the `pct` percentile (0-100) of `values` using nearest-rank"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(label, latencies, elapsed, errors=0):
+    """Build a result dict with p50/p95/p99 latency (ms) and throughput"""
+    return {
+        "label": label,
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "req_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def print_result(result):
+    """Print a result dict as a single aligned line plus its JSON form"""
+    print(f"{result['label']:<32} {result['req_per_s']:>9} req/s  "
+          f"p50={result['p50_ms']}ms  p99={result['p99_ms']}ms  errors={result['errors']}")
+    print(json.dumps(result))
+
+
+def time_call(func, repeat=5):
+    """Return the best wall time (seconds) of `repeat` calls to `func`"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def run_http_load(method, url, total, concurrency, label=None, **request_kwargs):
+    """Issue `total` HTTP requests with at most `concurrency` in flight and summarize them"""
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker(client):
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **request_kwargs)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return summarize(label or f"{method} {url}", latencies, elapsed, errors)
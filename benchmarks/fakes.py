@@ -0,0 +1,139 @@
+"""In-process stand-ins for ChatOpenAI and the Tavily web search, for offline benchmarks.
+
+ScriptedChatModel answers each pipeline stage from a script (detection rewrite,
+the search agent's tool calls and final answer, the compiled answer) after a
+configurable latency, streams its answer word by word, and reports token
+usage like the OpenAI API so tracing counts it. ScriptedSearch replays
+recorded search results. A script is a JSON file:
+
+    {
+      "search_steps": [{"action": "web_search", "action_input": "McDonald's birthday party KL"}],
+      "search_answer": "- McDonald's Bukit Bintang: Offers birthday party facilities",
+      "compile": "McDonald's Bukit Bintang offers birthday party facilities.",
+      "search_results": {"birthday": "[{\\"content\\": \\"...\\"}]", "*": "[]"}
+    }
+
+Missing keys fall back to DEFAULT_SCRIPT. The detection stage echoes the
+question in context ("McDonald's ... in Kuala Lumpur") unless "detect" is set.
+"""
+import asyncio
+import json
+import time
+from typing import Any, Dict, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+DEFAULT_SCRIPT = {
+    "detect": None,
+    "search_steps": [{"action": "web_search", "action_input": "McDonald's birthday party Kuala Lumpur"}],
+    "search_answer": "- McDonald's Bukit Bintang: Offers birthday party facilities\n"
+                     "- McDonald's Pandan Mewah: Has a dedicated party room",
+    "compile": "McDonald's Bukit Bintang offers birthday party facilities, and "
+               "McDonald's Pandan Mewah DT has a dedicated party room.",
+    "search_results": {
+        "*": json.dumps([{"url": "https://www.mcdonalds.com.my/", "content":
+                          "McDonald's Bukit Bintang and McDonald's Pandan Mewah DT host birthday parties."}]),
+    },
+}
+
+
+def load_script(path=None):
+    script = dict(DEFAULT_SCRIPT)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            script.update(json.load(f))
+    return script
+
+
+def action_blob(action, action_input):
+    """A structured-chat agent step, as the model would write it"""
+    return "```\n" + json.dumps({"action": action, "action_input": action_input}) + "\n```"
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model replaying a script per pipeline stage after `latency` + `token_delay` per word"""
+
+    script: Dict[str, Any] = DEFAULT_SCRIPT
+    latency: float = 1.0
+    token_delay: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def reply(self, messages):
+        """Pick the scripted reply for whichever stage sent `messages`"""
+        prompt = "\n".join(str(message.content) for message in messages)
+        if "query detector" in prompt:
+            question = str(messages[-1].content).strip()
+            if self.script.get("detect"):
+                return self.script["detect"]
+            return question if "McDonald's" in question else f"Which McDonald's outlet in Kuala Lumpur: {question}"
+        if "modifies the original search results" in prompt:
+            return self.script["compile"]
+        # The search agent: one scripted tool call per step, then the final answer. Its
+        # scratchpad (previous steps and their observations) is in the last message
+        step = str(messages[-1].content).count("Observation:")
+        steps = self.script.get("search_steps") or []
+        if step < len(steps):
+            return action_blob(steps[step]["action"], steps[step]["action_input"])
+        return action_blob("Final Answer", self.script["search_answer"])
+
+    def _result(self, messages, content):
+        prompt_tokens = sum(len(str(message.content).split()) for message in messages)
+        completion_tokens = len(content.split())
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))],
+                          llm_output={"token_usage": usage, "model_name": "scripted"})
+
+    def _delay(self, content):
+        return self.latency + self.token_delay * max(len(content.split()) - 1, 0)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        content = self.reply(messages)
+        time.sleep(self._delay(content))
+        return self._result(messages, content)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        content = self.reply(messages)
+        await asyncio.sleep(self._delay(content))
+        return self._result(messages, content)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        words = self.reply(messages).split(" ")
+        await asyncio.sleep(self.latency)
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class ScriptedSearch:
+    """Web search replaying recorded results: the first key found in the query wins, else "*" """
+
+    def __init__(self, results: Optional[Dict[str, str]] = None, latency: float = 0.5):
+        self.results = results or DEFAULT_SCRIPT["search_results"]
+        self.latency = latency
+        self.calls = 0
+
+    def _lookup(self, query):
+        self.calls += 1
+        lowered = query.lower()
+        for key, value in self.results.items():
+            if key != "*" and key.lower() in lowered:
+                return value
+        return self.results.get("*", "[]")
+
+    def run(self, query):
+        time.sleep(self.latency)
+        return self._lookup(query)
+
+    async def arun(self, query):
+        await asyncio.sleep(self.latency)
+        return self._lookup(query)
@@ -0,0 +1,88 @@
+"""Outlet fixtures of any size: the scraped mcdonalds_outlets.json plus synthetic outlets.
+
+    python benchmarks/fixtures.py --outlets 10000 --output /tmp/outlets.jsonl
+    python benchmarks/fixtures.py --outlets 10000 --postgres   # load into the POSTGRES_* database
+
+Synthetic outlets are seeded, so the same --outlets and --seed always give
+the same rows. They are spread around the real outlets' cities (and KL most
+of all) with unique names, so name lookups, geo queries and tiles behave
+like real data. --postgres syncs the rows into mcdonalds_ai through the
+COPY loader (outlet_loader.py), so the table matches the fixture exactly.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+OUTLETS_JSON = os.path.join(ROOT, "mcdonalds_outlets.json")
+CITIES = [(3.139, 101.6869, "Kuala Lumpur"), (5.4141, 100.3288, "Penang"), (1.4927, 103.7414, "Johor"),
+          (4.5975, 101.0901, "Perak"), (1.5533, 110.3592, "Sarawak"), (5.9804, 116.0735, "Sabah")]
+
+
+def fixture_outlets(count, seed=0, path=OUTLETS_JSON):
+    """`count` outlet dicts with ids 1..count: the real outlets first, then synthetic ones"""
+    with open(path, encoding="utf-8") as f:
+        outlets = json.load(f)[:count]
+    rng = random.Random(seed)
+    for i in range(len(outlets), count):
+        # Half the synthetic outlets go to Kuala Lumpur, like the scraped data
+        lat, lng, state = CITIES[0] if rng.random() < 0.5 else rng.choice(CITIES)
+        lat, lng = round(rng.gauss(lat, 0.15), 8), round(rng.gauss(lng, 0.15), 8)
+        outlets.append({
+            "name": f"McDonald's Synthetic {state} {i:06d}",
+            "address": f"{rng.randint(1, 300)}, Jalan {rng.randint(1, 999)}, {state}, Malaysia",
+            "telephone": f"03-{rng.randint(10000000, 99999999)}",
+            "latitude": lat,
+            "longitude": lng,
+            "waze_link": f"https://www.waze.com/live-map/directions?navigate=yes&to=ll.{lat}%2C{lng}",
+            "state": state,
+        })
+    return [dict(outlet, id=i + 1) for i, outlet in enumerate(outlets)]
+
+
+def write_outlets(outlets, path):
+    """Write outlets as JSON lines (the format the COPY loader streams fastest)"""
+    with open(path, "w", encoding="utf-8") as f:
+        for outlet in outlets:
+            f.write(json.dumps(outlet, ensure_ascii=False) + "\n")
+    return path
+
+
+def load_postgres(outlets):
+    """Sync the fixture into the POSTGRES_* database's mcdonalds_ai table; returns the loader summary"""
+    sys.path.insert(0, ROOT)
+    from mcdonalds_scraper import setup_database
+    from outlet_loader import load_file
+
+    conn = setup_database()
+    if conn is None:
+        raise RuntimeError("Could not connect to Postgres; check the POSTGRES_* settings")
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_outlets(outlets, os.path.join(directory, "outlets.jsonl"))
+        try:
+            return load_file(conn, path)
+        finally:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build outlet fixtures")
+    parser.add_argument("--outlets", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the fixture as JSON lines to this path")
+    parser.add_argument("--postgres", action="store_true", help="sync the fixture into the database")
+    args = parser.parse_args()
+
+    outlets = fixture_outlets(args.outlets, args.seed)
+    if args.output:
+        write_outlets(outlets, args.output)
+        print(json.dumps({"outlets": len(outlets), "output": args.output}))
+    if args.postgres:
+        print(json.dumps(load_postgres(outlets)))
+
+
+if __name__ == "__main__":
+    main()
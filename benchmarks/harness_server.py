@@ -0,0 +1,66 @@
+"""Run the API with the scripted LLM and web search from fakes.py, fully offline.
+
+    python benchmarks/harness_server.py --port 8765 --llm-latency 1.0 --search-latency 0.5 \\
+        --outlets-file /tmp/outlets.jsonl
+
+Outlets come from --outlets-file (JSON lines from fixtures.py) instead of
+Postgres, or from the POSTGRES_* database when it is omitted (load it with
+`fixtures.py --postgres`). The job queue lives in a fresh temporary file and
+the response cache is off unless --response-cache is given, so every run
+starts cold. bench_harness.py starts this in a subprocess.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API server with scripted LLM and search")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--outlets-file", help="JSON-lines outlets; omit to read the database")
+    parser.add_argument("--script", help="JSON script for the fake LLM and search (see fakes.py)")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="seconds per LLM call")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds per generated word")
+    parser.add_argument("--search-latency", type=float, default=0.5, help="seconds per web search")
+    parser.add_argument("--response-cache", choices=["off", "memory"], default="off")
+    args = parser.parse_args()
+
+    # Configuration is read at import time, so set it before importing the API
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+    os.environ["RESPONSE_CACHE_BACKEND"] = args.response_cache
+    os.environ["CALL_CACHE_MODE"] = "off"
+    os.environ["JOB_QUEUE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="harness-"), "jobs.sqlite3")
+    if args.outlets_file:
+        os.environ["POSTGRES_POOL_MIN"] = "0"
+
+    import uvicorn
+    from langchain_core.tools import Tool
+
+    import llm_train
+    from fakes import ScriptedChatModel, ScriptedSearch, load_script
+    from outlet_snapshot import outlet_snapshot
+
+    script = load_script(args.script)
+    search = ScriptedSearch(script["search_results"], latency=args.search_latency)
+    # The pipeline is built on first use from these module globals
+    llm_train.llm = ScriptedChatModel(script=script, latency=args.llm_latency, token_delay=args.token_delay)
+    llm_train.search_tool = Tool(name="web_search", func=search.run, coroutine=search.arun,
+                                 description=llm_train.SEARCH_TOOL_DESCRIPTION)
+    if args.outlets_file:
+        with open(args.outlets_file, encoding="utf-8") as f:
+            outlets = [json.loads(line) for line in f if line.strip()]
+        outlet_snapshot.loader = lambda: outlets
+        outlet_snapshot.version_loader = lambda: 1
+
+    from main import app
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Local HTTP server with store-locator pages for offline scraper runs.
+
+    python benchmarks/scraper_fixture_server.py --port 8765 --states 16 --latency 0.5
+    python mcdonalds_scraper.py --fixtures http://127.0.0.1:8765 --states all --no-db
+
+Pages mimic the live locator's markup (a #states dropdown and one JSON-LD
+script per outlet box in #results); choosing a state in index.html loads its
+page into #results, so Selenium can drive it too. POST
+/storefinder/index.php answers like the locator's AJAX endpoint with a
+`stores` list for the posted `state`. Outlets come from mcdonalds_outlets.json,
+copied into every synthetic state with the state name appended so names stay
+unique. `--latency` delays every response to stand in for page rendering.
+"""
+import argparse
+import html
+import json
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, quote, unquote
+
+OUTLETS_PATH = os.path.join(os.path.dirname(__file__), "..", "mcdonalds_outlets.json")
+MALAYSIAN_STATES = ["Johor", "Kedah", "Kelantan", "Kuala Lumpur", "Labuan", "Melaka", "Negeri Sembilan",
+                    "Pahang", "Perak", "Perlis", "Pulau Pinang", "Putrajaya", "Sabah", "Sarawak", "Selangor",
+                    "Terengganu"]
+
+
+def state_names(count):
+    names = list(MALAYSIAN_STATES)
+    while len(names) < count:
+        names.append(f"Region {len(names) + 1}")
+    return names[:count]
+
+
+def outlet_json_ld(outlet, state):
+    address = outlet["address"] if state == "Kuala Lumpur" else outlet["address"].replace("Kuala Lumpur", state)
+    return {
+        "@context": "https://schema.org",
+        "@type": "Restaurant",
+        "name": outlet["name"] if state == "Kuala Lumpur" else f"{outlet['name']} ({state})",
+        "address": address,
+        "telephone": outlet["telephone"],
+        "geo": {"@type": "GeoCoordinates", "latitude": outlet["latitude"], "longitude": outlet["longitude"]},
+    }
+
+
+# Replaces #results with the chosen state's page, like the live locator's AJAX load
+INDEX_SCRIPT = """<script>
+document.getElementById("states").addEventListener("change", async (event) => {
+  const page = await fetch(encodeURIComponent(event.target.value) + ".html").then((r) => r.text());
+  const results = new DOMParser().parseFromString(page, "text/html").getElementById("results");
+  document.getElementById("results").innerHTML = results.innerHTML;
+});
+</script>"""
+
+
+def store_finder_response(outlets, state):
+    """The AJAX endpoint's JSON for one state"""
+    stores = []
+    for outlet in outlets:
+        item = outlet_json_ld(outlet, state)
+        stores.append({"name": item["name"], "address": item["address"], "telephone": item["telephone"],
+                       "lat": item["geo"]["latitude"], "lng": item["geo"]["longitude"]})
+    return json.dumps({"stores": stores})
+
+
+def build_pages(outlets, states):
+    """Map of URL path -> HTML for the index page and each state's results page"""
+    options = "".join(f'<option value="{html.escape(state)}">{html.escape(state)}</option>' for state in states)
+    pages = {"/index.html": f'<html><body><select id="states"><option value="">Select state</option>'
+                            f'{options}</select><div id="results"></div>{INDEX_SCRIPT}</body></html>'}
+    for state in states:
+        boxes = "".join(
+            f'<div data-v-6bf80f8c class="columns"><p>{html.escape(outlet["name"])}</p>'
+            f'<script type="application/ld+json">{json.dumps(outlet_json_ld(outlet, state))}</script></div>'
+            for outlet in outlets)
+        pages[f"/{quote(state)}.html"] = f'<html><body><div id="results">{boxes}</div></body></html>'
+        pages[f"/storefinder/{quote(state)}"] = store_finder_response(outlets, state)
+    return pages
+
+
+def serve(pages, port=0, latency=0.0, fail_first=0):
+    """Start the server on a background thread and return it; `server.server_port` is the bound port.
+
+    `fail_first` answers the first N requests for each state (page or endpoint) with a 503, to exercise retries.
+    """
+    failures = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.respond(quote(unquote(self.path)), "text/html")
+
+        def do_POST(self):
+            if self.path != "/storefinder/index.php":
+                self.send_error(404)
+                return
+            form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8"))
+            self.respond(f"/storefinder/{quote(form.get('state', [''])[0])}", "application/json")
+
+        def respond(self, path, content_type):
+            time.sleep(latency)
+            page = pages.get(path)
+            if page is None:
+                self.send_error(404)
+                return
+            with lock:
+                failures[path] = failures.get(path, 0) + 1
+                fail = path != "/index.html" and failures[path] <= fail_first
+            if fail:
+                self.send_error(503)
+                return
+            body = page.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def load_outlets(path=OUTLETS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve store-locator fixture pages")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--states", type=int, default=len(MALAYSIAN_STATES), help="number of states to serve")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each response")
+    args = parser.parse_args()
+    server = serve(build_pages(load_outlets(), state_names(args.states)), args.port, args.latency)
+    print(f"Serving {args.states} states on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
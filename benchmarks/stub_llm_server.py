@@ -0,0 +1,95 @@
+"""Minimal OpenAI-compatible chat completions server for offline load tests.
+
+    python benchmarks/stub_llm_server.py --port 9000 --latency 1.0
+
+Point the API at it with OPENAI_BASE_URL=http://localhost:9000/v1. Replies are
+picked from the system prompt of each pipeline stage, and the search agent
+answers immediately without calling any tool. `--latency` is the
+time to the first token and `--token-delay` the time per further word; with
+"stream": true the words are sent as chunks as they are "generated".
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI()
+app.state.latency = 1.0
+app.state.token_delay = 0.0
+
+# The search agent is a structured-chat agent, so its final answer is a JSON action blob
+SEARCH_ANSWER = "```\n" + json.dumps({
+    "action": "Final Answer",
+    "action_input": "- McDonald's Bukit Bintang: Offers birthday party facilities\n"
+                    "- McDonald's Pandan Mewah: Has a dedicated party room",
+}) + "\n```"
+FINAL_ANSWER = ("McDonald's Bukit Bintang offers birthday party facilities, and "
+                "McDonald's Pandan Mewah DT has a dedicated party room.")
+
+
+def stub_reply(messages):
+    """Choose a canned reply based on which pipeline stage sent the prompt"""
+    prompt = " ".join(str(m.get("content", "")) for m in messages)
+    if "query detector" in prompt:
+        question = str(messages[-1].get("content", "")).strip()
+        return question if "McDonald's" in question else f"Which McDonald's outlet in Kuala Lumpur: {question}"
+    if "modifies the original search results" in prompt:
+        return FINAL_ANSWER
+    # Anything else is the search agent's ReAct loop
+    return SEARCH_ANSWER
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    content = stub_reply(body.get("messages", []))
+    words = content.split(" ")
+    if body.get("stream"):
+        return StreamingResponse(stream_reply(body, words), media_type="text/event-stream")
+    await asyncio.sleep(app.state.latency + app.state.token_delay * (len(words) - 1))
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(content.split()), "total_tokens": len(content.split())},
+    }
+
+
+async def stream_reply(body, words):
+    await asyncio.sleep(app.state.latency)
+    for i, word in enumerate(words):
+        if i:
+            await asyncio.sleep(app.state.token_delay)
+        chunk = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    done = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": body.get("model", "stub"), "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+    yield f"data: {json.dumps(done)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI chat completions server")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds to wait before each reply")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds per word after the first")
+    args = parser.parse_args()
+    app.state.latency = args.latency
+    app.state.token_delay = args.token_delay
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+from outlet_names import normalize
+
+CALL_CACHE_MODE = os.getenv("CALL_CACHE_MODE", "off")    # off | on | replay
+CALL_CACHE_PATH = os.getenv("CALL_CACHE_PATH", "call_cache.sqlite3")
+# Web results go stale faster than completions of a temperature-0 model
+SEARCH_CACHE_MAX_AGE = float(os.getenv("SEARCH_CACHE_MAX_AGE", "86400"))
+LLM_CACHE_MAX_AGE = float(os.getenv("LLM_CACHE_MAX_AGE", "604800"))
+
+
+class ReplayMiss(LookupError):
+    """Raised in replay mode when a call was never recorded"""
+
+
+def content_key(namespace, *parts):
+    """SHA-256 of the call's inputs; identical calls share one entry"""
+    payload = json.dumps([namespace, *parts], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CallStore:
+    """Content-addressed store of external call results, persisted in SQLite.
+
+    In "replay" mode entries never go stale and a miss raises ReplayMiss, so a
+    recorded run can be repeated offline and deterministically.
+    """
+
+    def __init__(self, path=CALL_CACHE_PATH, replay=False):
+        self.replay = replay
+        self.metrics = Counter()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS call_cache (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+
+    def get(self, namespace, key, max_age):
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM call_cache WHERE key = ?", (key,)).fetchone()
+        if row is not None and (self.replay or time.time() - row[1] <= max_age):
+            self.metrics[f"{namespace}:hits"] += 1
+            return row[0]
+        if self.replay:
+            self.metrics[f"{namespace}:replay_misses"] += 1
+            raise ReplayMiss(f"No recorded {namespace} call for key {key[:12]}")
+        self.metrics[f"{namespace}:stale" if row is not None else f"{namespace}:misses"] += 1
+        return None
+
+    def put(self, namespace, key, value):
+        if self.replay:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO call_cache (key, namespace, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, namespace, value, time.time()))
+        self.metrics[f"{namespace}:stores"] += 1
+
+    def clear(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                self._conn.execute("DELETE FROM call_cache")
+            else:
+                self._conn.execute("DELETE FROM call_cache WHERE namespace = ?", (namespace,))
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT namespace, COUNT(*) FROM call_cache GROUP BY namespace"))
+        stats = dict(self.metrics)
+        for namespace, entries in counts.items():
+            stats[f"{namespace}:entries"] = entries
+        stats["mode"] = "replay" if self.replay else "on"
+        return stats
+
+
+class CachedSearch:
+    """Wraps a search tool's run/arun so identical queries hit the store instead of the API"""
+
+    namespace = "search"
+
+    def __init__(self, tool, store, max_age=SEARCH_CACHE_MAX_AGE):
+        self.tool = tool
+        self.store = store
+        self.max_age = max_age
+
+    def _key(self, query):
+        return content_key(self.namespace, type(self.tool).__name__, getattr(self.tool, "max_results", None),
+                           normalize(query))
+
+    def _lookup(self, query):
+        value = self.store.get(self.namespace, self._key(query), self.max_age)
+        return json.loads(value) if value is not None else None
+
+    def _record(self, query, results):
+        # Error strings from the tool are not cached; only result lists are
+        if isinstance(results, list):
+            self.store.put(self.namespace, self._key(query), json.dumps(results, ensure_ascii=False))
+        return results
+
+    def run(self, query):
+        cached = self._lookup(query)
+        return cached if cached is not None else self._record(query, self.tool.run(query))
+
+    async def arun(self, query):
+        # The store is SQLite; keep its reads and writes off the event loop, like BaseCache.alookup does
+        cached = await asyncio.to_thread(self._lookup, query)
+        if cached is not None:
+            return cached
+        return await asyncio.to_thread(self._record, query, await self.tool.arun(query))
+
+
+class LLMCallCache(BaseCache):
+    """LangChain cache backed by the call store, keyed on the serialized prompt and model settings"""
+
+    namespace = "llm"
+
+    def __init__(self, store, max_age=LLM_CACHE_MAX_AGE):
+        self.store = store
+        self.max_age = max_age
+
+    def lookup(self, prompt, llm_string):
+        value = self.store.get(self.namespace, content_key(self.namespace, prompt, llm_string), self.max_age)
+        return [loads(generation) for generation in json.loads(value)] if value is not None else None
+
+    def update(self, prompt, llm_string, return_val):
+        value = json.dumps([dumps(generation) for generation in return_val])
+        self.store.put(self.namespace, content_key(self.namespace, prompt, llm_string), value)
+
+    def clear(self, **kwargs):
+        self.store.clear(self.namespace)
+
+
+def create_call_store():
+    """Build the store configured by CALL_CACHE_MODE, or None when call caching is off"""
+    if CALL_CACHE_MODE == "off":
+        return None
+    return CallStore(replay=CALL_CACHE_MODE == "replay")
+
+
+call_store = create_call_store()
@@ -0,0 +1,169 @@
+import numpy as np
+
+from geo_index import GeoIndex
+from tile_index import COVERAGE_RADIUS_KM
+
+# Above this share of changed outlets an update rebuilds the graph from scratch instead
+REBUILD_FRACTION = 0.2
+
+
+def connected_components(n, first, second):
+    """Component label (smallest member position) of each of `n` nodes, for edges first[k]-second[k].
+
+    Vectorized union-find: hook every edge's larger root onto the smaller one,
+    then compress paths by pointer jumping, until no edge joins two roots.
+    """
+    parent = np.arange(n)
+    while True:
+        a, b = parent[first], parent[second]
+        differ = a != b
+        if not differ.any():
+            return parent
+        np.minimum.at(parent, np.maximum(a[differ], b[differ]), np.minimum(a[differ], b[differ]))
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+
+class CoverageGraph:
+    """Outlets whose `radius_km` catchments intersect, with connected components and overlap counts.
+
+    Nodes are outlet ids (kept sorted); an edge joins two outlets at most
+    2 * radius_km apart. Pairs come from the grid-bucketed
+    GeoIndex.overlapping_pairs, and `update` only searches pairs around
+    outlets that were added, moved or removed, so a re-scrape does not
+    repeat the all-pairs search.
+    """
+
+    def __init__(self, ids, lat, lon, first, second, distance, radius_km=COVERAGE_RADIUS_KM):
+        order = np.argsort(ids, kind="stable")
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.lat = np.asarray(lat, dtype=np.float64)[order]
+        self.lon = np.asarray(lon, dtype=np.float64)[order]
+        self.radius_km = radius_km
+        # Edges as node positions, first < second
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        first, second = rank[np.asarray(first, dtype=np.int64)], rank[np.asarray(second, dtype=np.int64)]
+        self.first, self.second = np.minimum(first, second), np.maximum(first, second)
+        self.distance = np.asarray(distance, dtype=np.float64)
+        self.overlap_counts = np.bincount(np.concatenate([self.first, self.second]), minlength=len(self.ids))
+        labels = connected_components(len(self.ids), self.first, self.second)
+        # Number components 0.. by size, largest first
+        roots, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+        by_size = np.argsort(-sizes, kind="stable")
+        renumber = np.empty(len(roots), dtype=np.int64)
+        renumber[by_size] = np.arange(len(roots))
+        self.components = renumber[inverse]
+        self.component_sizes = sizes[by_size]
+        # Adjacency lists (CSR) over both edge directions
+        source = np.concatenate([self.first, self.second])
+        target = np.concatenate([self.second, self.first])
+        adjacency = np.argsort(source, kind="stable")
+        self.neighbours = target[adjacency]
+        self.neighbour_distances = np.concatenate([self.distance, self.distance])[adjacency]
+        self.offsets = np.searchsorted(source[adjacency], np.arange(len(self.ids) + 1))
+
+    @classmethod
+    def build(cls, outlets, radius_km=COVERAGE_RADIUS_KM):
+        """Graph of outlet dicts (`id`, `latitude`, `longitude`) from scratch"""
+        ids, lat, lon = _columns(outlets)
+        first, second, distance = GeoIndex(lat, lon).overlapping_pairs(radius_km)
+        return cls(ids, lat, lon, first, second, distance, radius_km)
+
+    def update(self, outlets):
+        """Graph for a new version of the outlets, reusing every edge between unchanged outlets"""
+        if len(self.ids) == 0:
+            return CoverageGraph.build(outlets, self.radius_km)
+        ids, lat, lon = _columns(outlets)
+        position = np.searchsorted(self.ids, ids)
+        position[position == len(self.ids)] = 0
+        known = self.ids[position] == ids
+        unchanged = known & (self.lat[position] == lat) & (self.lon[position] == lon)
+        # Old nodes that were removed or moved lose all their edges
+        kept = np.zeros(len(self.ids), dtype=bool)
+        kept[position[unchanged]] = True
+        touched = ~unchanged
+        if touched.sum() + (~kept).sum() > REBUILD_FRACTION * max(len(ids), 1):
+            return CoverageGraph.build(outlets, self.radius_km)
+
+        # Edges between unchanged outlets carry over, renumbered to positions in `outlets`
+        remap = np.full(len(self.ids), -1, dtype=np.int64)
+        remap[position[unchanged]] = np.flatnonzero(unchanged)
+        keep_edges = kept[self.first] & kept[self.second]
+        # New or moved outlets: search their surroundings in the new point set, all at once
+        touched_at = np.flatnonzero(touched)
+        query, near, near_distance = GeoIndex(lat, lon).within_radius_many(
+            lat[touched_at], lon[touched_at], 2 * self.radius_km)
+        source = touched_at[query]
+        # Skip itself, and pairs of two touched outlets found from both sides
+        keep = (near != source) & (~touched[near] | (source < near))
+        first = np.concatenate([remap[self.first[keep_edges]], source[keep]])
+        second = np.concatenate([remap[self.second[keep_edges]], near[keep]])
+        distance = np.concatenate([self.distance[keep_edges], near_distance[keep]])
+        return CoverageGraph(ids, lat, lon, first, second, distance, self.radius_km)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def edge_count(self):
+        return len(self.first)
+
+    def position(self, outlet_id):
+        """Node position of an outlet id, or None"""
+        i = int(np.searchsorted(self.ids, outlet_id))
+        return i if i < len(self.ids) and self.ids[i] == outlet_id else None
+
+    def neighbours_of(self, outlet_id):
+        """(ids, distances_km) of the outlets whose catchment overlaps this one, nearest first"""
+        i = self.position(outlet_id)
+        if i is None:
+            raise KeyError(outlet_id)
+        block = slice(self.offsets[i], self.offsets[i + 1])
+        ordering = np.argsort(self.neighbour_distances[block], kind="stable")
+        return self.ids[self.neighbours[block][ordering]], self.neighbour_distances[block][ordering]
+
+    def component_members(self, component):
+        return self.ids[self.components == component]
+
+    def summary(self):
+        sizes = self.component_sizes
+        return {
+            "radius_km": self.radius_km,
+            "outlets": len(self),
+            "overlapping_pairs": self.edge_count,
+            "components": len(sizes),
+            "isolated_outlets": int((sizes == 1).sum()),
+            "largest_component": int(sizes[0]) if len(sizes) else 0,
+        }
+
+
+def _columns(outlets):
+    ids = np.fromiter((o["id"] for o in outlets), dtype=np.int64, count=len(outlets))
+    lat = np.fromiter((float(o["latitude"]) for o in outlets), dtype=np.float64, count=len(outlets))
+    lon = np.fromiter((float(o["longitude"]) for o in outlets), dtype=np.float64, count=len(outlets))
+    return ids, lat, lon
+
+
+def describe_coverage(snapshot, name, limit=10):
+    """Plain-text overlap report for the outlet named in `name`, for the LLM tool"""
+    matches = snapshot.name_index.find_in_text(name)
+    if not matches:
+        return f"No outlet matching '{name}' is in the database."
+    graph = snapshot.coverage_graph
+    names = {outlet["id"]: outlet["name"] for outlet in snapshot.outlets}
+    lines = []
+    for outlet in matches:
+        ids, distances = graph.neighbours_of(outlet["id"])
+        size = int(graph.component_sizes[graph.components[graph.position(outlet["id"])]])
+        if len(ids) == 0:
+            lines.append(f"{outlet['name']}: its {graph.radius_km:g} km radius overlaps no other outlet.")
+            continue
+        nearest = ", ".join(f"{names[i]} ({d:.1f} km away)" for i, d in zip(ids[:limit].tolist(), distances[:limit]))
+        more = f" and {len(ids) - limit} more" if len(ids) > limit else ""
+        lines.append(f"{outlet['name']}: its {graph.radius_km:g} km radius overlaps {len(ids)} outlets: "
+                     f"{nearest}{more}. It belongs to a group of {size} outlets with connected coverage.")
+    return "\n".join(lines)
@@ -0,0 +1,207 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+
+import tracing
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Database connection parameters
+DB_PARAMS = {
+    "dbname": os.getenv("POSTGRES_DB", "mcdonalds_ai"),
+    "user": os.getenv("POSTGRES_USER", "postgres"),
+    "password": os.getenv("POSTGRES_PASSWORD", "postgres"),
+    "host": os.getenv("POSTGRES_HOST", "localhost"),
+    "port": os.getenv("POSTGRES_PORT", "5432")
+}
+
+# Pool settings (all overridable from the environment)
+POOL_MIN_SIZE = int(os.getenv("POSTGRES_POOL_MIN", "1"))
+POOL_MAX_SIZE = int(os.getenv("POSTGRES_POOL_MAX", "10"))
+POOL_TIMEOUT = float(os.getenv("POSTGRES_POOL_TIMEOUT", "10"))
+POOL_RECYCLE = float(os.getenv("POSTGRES_POOL_RECYCLE", "1800"))
+POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("POSTGRES_POOL_HEALTH_CHECK", "30"))
+# First table a query reads, to name its trace span (e.g. "select mcdonalds_ai")
+QUERY_TABLE_PATTERN = re.compile(r"\b(?:from|into|update)\s+(\w+)", re.IGNORECASE)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of psycopg2 connections.
+
+    Connections idle for longer than `health_check_interval` are pinged with
+    `SELECT 1` before being handed out, and connections older than `recycle`
+    seconds are closed and replaced.
+    """
+
+    def __init__(self, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT,
+                 recycle=POOL_RECYCLE, health_check_interval=POOL_HEALTH_CHECK_INTERVAL, **conn_params):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool size must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.health_check_interval = health_check_interval
+        self.conn_params = conn_params or DB_PARAMS
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = []          # [(conn, created_at, last_used_at)]
+        self._created = {}       # id(conn) -> created_at for checked-out connections
+        self._closed = False
+
+        for _ in range(min_size):
+            conn = self._connect()
+            now = time.monotonic()
+            self._idle.append((conn, now, now))
+
+    def _connect(self):
+        return psycopg2.connect(**self.conn_params, cursor_factory=RealDictCursor)
+
+    def _is_healthy(self, conn, created_at, last_used_at):
+        now = time.monotonic()
+        if conn.closed or now - created_at > self.recycle:
+            return False
+        if now - last_used_at < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Check out a healthy connection, waiting up to `timeout` seconds for a free slot"""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No database connection available after {self.timeout}s")
+        try:
+            while True:
+                with self._lock:
+                    entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    conn, created_at = self._connect(), time.monotonic()
+                    break
+                conn, created_at, last_used_at = entry
+                if self._is_healthy(conn, created_at, last_used_at):
+                    break
+                self._discard(conn)
+            with self._lock:
+                self._created[id(conn)] = created_at
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, close=False):
+        """Return a connection to the pool, closing it if it is broken or `close` is set"""
+        with self._lock:
+            created_at = self._created.pop(id(conn), time.monotonic())
+        try:
+            if not close and not conn.closed:
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            if close or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, created_at, time.monotonic()))
+        except psycopg2.Error:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts"""
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._lock:
+            return {"idle": len(self._idle), "in_use": len(self._created), "max_size": self.max_size}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def open_pool(**kwargs):
+    """Create the shared connection pool (called from the application lifespan)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(**kwargs)
+        return _pool
+
+
+def close_pool():
+    """Close the shared connection pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def get_pool():
+    """Return the shared pool, opening it on first use outside of the API lifespan"""
+    return _pool or open_pool()
+
+
+@contextmanager
+def get_db_connection():
+    """Borrow a pooled connection; commits on success and rolls back on error"""
+    pool = get_pool()
+    conn = pool.getconn()
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception as e:
+        broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+        raise
+    finally:
+        pool.putconn(conn, close=broken)
+
+
+def query_name(query):
+    table = QUERY_TABLE_PATTERN.search(query)
+    return " ".join([query.split(None, 1)[0].lower()] + ([table.group(1)] if table else []))
+
+
+def fetch_all(query, params=None):
+    """Run a read query on a pooled connection and return all rows as dicts"""
+    with tracing.span("db", query_name(query)) as span, get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+        if span is not None:
+            span.attributes["rows"] = len(rows)
+        return rows
@@ -1,5 +1,12 @@
-import React, { useEffect, useState } from "react";
-import { MapContainer, TileLayer, Marker, Popup, Circle } from "react-leaflet";
+import React, { useCallback, useEffect, useRef, useState } from "react";
+import {
+  MapContainer,
+  TileLayer,
+  Marker,
+  Popup,
+  Circle,
+  useMapEvents,
+} from "react-leaflet";
 import "leaflet/dist/leaflet.css";
 import L from "leaflet";
 import api from "../api";
@@ -12,88 +19,164 @@ L.Icon.Default.mergeOptions({
   shadowUrl: require("leaflet/dist/images/marker-shadow.png"),
 });
 
+// Must match MAX_ZOOM in tile_index.py
+const MAX_TILE_ZOOM = 20;
+
 interface Outlet {
   id: number;
   name: string;
   address: string;
-  latitude: number;
-  longitude: number;
   telephone: string;
   waze_link: string;
 }
 
+// One server-side cluster; single outlets carry their details
+interface Cluster {
+  lat: number;
+  lng: number;
+  count: number;
+  radius_km: number;
+  outlet?: Outlet;
+}
+
+interface Tile {
+  z: number;
+  x: number;
+  y: number;
+  clusters: Cluster[];
+}
+
+const clusterIcon = (count: number) =>
+  L.divIcon({
+    html: `<div style="background:#ffbc0d;border:2px solid #da291c;border-radius:50%;width:36px;height:36px;line-height:32px;text-align:center;font-weight:bold">${count}</div>`,
+    className: "outlet-cluster",
+    iconSize: [36, 36],
+  });
+
+// Tiles (z/x/y) covering the visible map area
+const visibleTiles = (map: L.Map) => {
+  const zoom = Math.min(Math.max(Math.round(map.getZoom()), 0), MAX_TILE_ZOOM);
+  const bounds = map.getPixelBounds();
+  const size = 256 * Math.pow(2, map.getZoom() - zoom);
+  const count = Math.pow(2, zoom);
+  const tiles: string[] = [];
+  const minX = Math.max(Math.floor(bounds.min!.x / size), 0);
+  const maxX = Math.min(Math.floor(bounds.max!.x / size), count - 1);
+  const minY = Math.max(Math.floor(bounds.min!.y / size), 0);
+  const maxY = Math.min(Math.floor(bounds.max!.y / size), count - 1);
+  for (let x = minX; x <= maxX; x++) {
+    for (let y = minY; y <= maxY; y++) {
+      tiles.push(`${zoom}/${x}/${y}`);
+    }
+  }
+  return tiles;
+};
+
+const ViewportClusters: React.FC<{
+  onTiles: (tiles: string[]) => void;
+}> = ({ onTiles }) => {
+  const map = useMapEvents({
+    moveend: () => onTiles(visibleTiles(map)),
+  });
+  useEffect(() => {
+    onTiles(visibleTiles(map));
+  }, [map, onTiles]);
+  return null;
+};
+
 const Map: React.FC = () => {
-  const [outlets, setOutlets] = useState<Outlet[]>([]);
-  const [loading, setLoading] = useState(true);
+  const [clusters, setClusters] = useState<Cluster[]>([]);
   const [error, setError] = useState<string | null>(null);
+  // Tiles already fetched on this page load, by z/x/y
+  const tileCache = useRef<Record<string, Tile>>({});
+  const latestRequest = useRef(0);
 
-  useEffect(() => {
-    const fetchOutlets = async () => {
-      try {
-        const response = await api.get<Outlet[]>("/outlets");
-        setOutlets(response.data);
-      } catch (err) {
-        setError("Failed to fetch outlets data");
-        console.error("Error fetching outlets:", err);
-      } finally {
-        setLoading(false);
+  const loadTiles = useCallback(async (keys: string[]) => {
+    const request = ++latestRequest.current;
+    try {
+      const tiles = await Promise.all(
+        keys.map(async (key) => {
+          if (!tileCache.current[key]) {
+            const response = await api.get<Tile>(`/tiles/${key}`);
+            tileCache.current[key] = response.data;
+          }
+          return tileCache.current[key];
+        })
+      );
+      // Ignore responses for a viewport the user has already left
+      if (request === latestRequest.current) {
+        setClusters(tiles.flatMap((tile) => tile.clusters));
+        setError(null);
       }
-    };
-
-    fetchOutlets();
+    } catch (err) {
+      setError("Failed to fetch outlets data");
+      console.error("Error fetching outlet tiles:", err);
+    }
   }, []);
 
-  const center =
-    outlets.length > 0
-      ? [outlets[0].latitude, outlets[0].longitude]
-      : [3.139, 101.6869]; // Default to Kuala Lumpur coordinates
-
-  if (loading) return <div className="map-loading">Loading map...</div>;
-  if (error) return <div className="map-error">Error: {error}</div>;
+  const center: [number, number] = [3.139, 101.6869]; // Default to Kuala Lumpur coordinates
 
   return (
-    <MapContainer
-      center={center as [number, number]}
-      zoom={11}
-      style={{ height: "100%", width: "100%" }}
-    >
-      <TileLayer
-        url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
-        attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
-      />
-      {outlets.map((outlet) => (
-        <React.Fragment key={outlet.id}>
-          <Marker position={[outlet.latitude, outlet.longitude]}>
-            <Popup>
-              <div>
-                <h3>{outlet.name}</h3>
-                <p>{outlet.address}</p>
-                <br></br>
-                <p>{outlet.telephone}</p>
-                <br></br>
-                <a
-                  href={outlet.waze_link}
-                  target="_blank"
-                  rel="noopener noreferrer"
-                >
-                  <p>Waze</p>
-                </a>
-              </div>
-            </Popup>
-          </Marker>
-          <Circle
-            center={[outlet.latitude, outlet.longitude]}
-            radius={5000} // 5KM in meters
-            pathOptions={{
-              color: "blue",
-              fillColor: "blue",
-              fillOpacity: 0.1,
-              weight: 1,
-            }}
-          />
-        </React.Fragment>
-      ))}
-    </MapContainer>
+    <>
+      {error && <div className="map-error">Error: {error}</div>}
+      <MapContainer
+        center={center}
+        zoom={11}
+        maxZoom={MAX_TILE_ZOOM}
+        style={{ height: "100%", width: "100%" }}
+      >
+        <TileLayer
+          url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
+          attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+        />
+        <ViewportClusters onTiles={loadTiles} />
+        {clusters.map((cluster) => (
+          <React.Fragment
+            key={
+              cluster.outlet
+                ? `outlet-${cluster.outlet.id}`
+                : `${cluster.lat},${cluster.lng},${cluster.count}`
+            }
+          >
+            {cluster.outlet ? (
+              <Marker position={[cluster.lat, cluster.lng]}>
+                <Popup>
+                  <div>
+                    <h3>{cluster.outlet.name}</h3>
+                    <p>{cluster.outlet.address}</p>
+                    <br></br>
+                    <p>{cluster.outlet.telephone}</p>
+                    <br></br>
+                    <a
+                      href={cluster.outlet.waze_link}
+                      target="_blank"
+                      rel="noopener noreferrer"
+                    >
+                      <p>Waze</p>
+                    </a>
+                  </div>
+                </Popup>
+              </Marker>
+            ) : (
+              <Marker
+                position={[cluster.lat, cluster.lng]}
+                icon={clusterIcon(cluster.count)}
+              />
+            )}
+            <Circle
+              center={[cluster.lat, cluster.lng]}
+              radius={cluster.radius_km * 1000} // 5KM coverage, widened to span the cluster
+              pathOptions={{
+                color: "blue",
+                fillColor: "blue",
+                fillOpacity: 0.1,
+                weight: 1,
+              }}
+            />
+          </React.Fragment>
+        ))}
+      </MapContainer>
+    </>
   );
 };
 
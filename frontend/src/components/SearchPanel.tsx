@@ -1,48 +1,106 @@
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import api from "../api";
 import LlmSearchForm from "./LlmSearchForm";
 
-interface LlmResponse {
-  llmresponse: string;
-}
+// Progress text shown while a pipeline stage is running
+const STAGE_LABELS: Record<string, string> = {
+  follow_up: "Recalling the conversation...",
+  detect: "Understanding your question...",
+  speculative_search: "Searching the web...",
+  search: "Searching the web...",
+  validate: "Checking outlets...",
+  compile: "Writing the answer...",
+};
+
+const parseEvent = (block: string) => {
+  let event = "message";
+  let data = "";
+  for (const line of block.split("\n")) {
+    if (line.startsWith("event: ")) event = line.slice(7);
+    else if (line.startsWith("data: ")) data += line.slice(6);
+  }
+  return { event, data: data ? JSON.parse(data) : null };
+};
 
 const SearchPanel: React.FC = () => {
   const [llmresponse, setLlmResponse] = useState<string>("");
+  const [stage, setStage] = useState<string>("");
+  const controllerRef = useRef<AbortController | null>(null);
+  // One conversation per page load, so follow-up questions ("is it open 24 hours?") keep their context
+  const sessionIdRef = useRef<string>(
+    Math.random().toString(36).slice(2) + Date.now().toString(36)
+  );
 
-  const getLlmResponse = async () => {
-    try {
-      const response = await api.get<LlmResponse>("/llmresponses");
-      setLlmResponse(response.data.llmresponse);
-    } catch (error) {
-      console.error("Error fetching response:", error);
-    }
-  };
+  useEffect(() => () => controllerRef.current?.abort(), []);
 
   const addLlmResponse = async (query: string) => {
+    // A new question cancels the one still streaming
+    controllerRef.current?.abort();
+    const controller = new AbortController();
+    controllerRef.current = controller;
+    setLlmResponse("");
+    setStage("");
+
     try {
-      await api.post("/llmresponses", { llmresponse: query });
-      await getLlmResponse();
+      const response = await fetch(`${api.defaults.baseURL}/llmresponses/stream`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ llmresponse: query, session_id: sessionIdRef.current }),
+        signal: controller.signal,
+      });
+      if (!response.ok || !response.body) {
+        throw new Error(`Request failed with status ${response.status}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const blocks = buffer.split("\n\n");
+        buffer = blocks.pop() ?? "";
+        for (const block of blocks) {
+          const { event, data } = parseEvent(block);
+          if (event === "stage" && data.status === "running" && STAGE_LABELS[data.stage]) {
+            setStage(STAGE_LABELS[data.stage]);
+          } else if (event === "token") {
+            setStage("");
+            setLlmResponse((current) => current + data.text);
+          } else if (event === "done") {
+            setStage("");
+            setLlmResponse(data.llmresponse);
+          } else if (event === "error") {
+            setStage("");
+            setLlmResponse("Sorry, something went wrong. Please try again.");
+            console.error("Error streaming response:", data.detail);
+          }
+        }
+      }
     } catch (error) {
-      console.error("Error adding response:", error);
+      if (!controller.signal.aborted) {
+        setStage("");
+        console.error("Error adding response:", error);
+      }
     }
   };
 
-  useEffect(() => {
-    getLlmResponse();
-  }, []);
+  const text = llmresponse || stage;
 
   return (
     <div style={{ display: "flex", flexDirection: "column", gap: "1rem" }}>
       <LlmSearchForm addLlmResponse={addLlmResponse} />
-      {llmresponse && (
+      {text && (
         <div
           style={{
             paddingLeft: "1rem",
             paddingRight: "1rem",
             borderRadius: "8px",
+            color: llmresponse ? undefined : "#666",
           }}
         >
-          {llmresponse}
+          {text}
         </div>
       )}
     </div>
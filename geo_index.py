@@ -0,0 +1,202 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+# Default grid cell size in degrees (~5.5 km), sized for the 5 km map radius
+DEFAULT_CELL_DEG = 0.05
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; accepts scalars or numpy arrays (degrees) and broadcasts"""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GeoIndex:
+    """Uniform lat/long grid over a set of points.
+
+    Points are sorted by grid cell so every cell is a contiguous slice of the
+    coordinate arrays. Queries collect the cells overlapping a bounding box
+    and then filter the candidates with a vectorized haversine.
+    """
+
+    def __init__(self, latitudes, longitudes, cell_deg=DEFAULT_CELL_DEG):
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        if lat.shape != lon.shape or lat.ndim != 1:
+            raise ValueError("latitudes and longitudes must be 1-D arrays of the same length")
+        self.cell_deg = cell_deg
+        self.n_rows = int(math.ceil(180 / cell_deg)) + 1
+        self.n_cols = int(math.ceil(360 / cell_deg)) + 1
+
+        keys = self._cell_keys(lat, lon)
+        self.order = np.argsort(keys, kind="stable")   # sorted position -> original index
+        self.lat = lat[self.order]
+        self.lon = lon[self.order]
+        self.cell_keys, self.cell_starts, self.cell_counts = np.unique(
+            keys[self.order], return_index=True, return_counts=True)
+
+    @classmethod
+    def from_outlets(cls, outlets, cell_deg=DEFAULT_CELL_DEG):
+        """Build an index from outlet dicts with `latitude`/`longitude` keys"""
+        return cls([float(o["latitude"]) for o in outlets],
+                   [float(o["longitude"]) for o in outlets], cell_deg)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _rows(self, lat):
+        return np.clip(np.floor((np.asarray(lat) + 90) / self.cell_deg), 0, self.n_rows - 1).astype(np.int64)
+
+    def _cols(self, lon):
+        return np.clip(np.floor((np.asarray(lon) + 180) / self.cell_deg), 0, self.n_cols - 1).astype(np.int64)
+
+    def _cell_keys(self, lat, lon):
+        return self._rows(lat) * self.n_cols + self._cols(lon)
+
+    def _candidates(self, min_lat, max_lat, min_lon, max_lon):
+        """Sorted positions of every point in the grid cells overlapping a bbox"""
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64)
+        rows = np.arange(self._rows(max(min_lat, -90.0)), self._rows(min(max_lat, 90.0)) + 1)
+        # Split longitude ranges that cross the antimeridian
+        if max_lon - min_lon >= 360:
+            lon_ranges = [(-180.0, 180.0)]
+        elif min_lon < -180:
+            lon_ranges = [(min_lon + 360, 180.0), (-180.0, max_lon)]
+        elif max_lon > 180:
+            lon_ranges = [(min_lon, 180.0), (-180.0, max_lon - 360)]
+        else:
+            lon_ranges = [(min_lon, max_lon)]
+        cols = np.concatenate([np.arange(self._cols(lo), self._cols(hi) + 1) for lo, hi in lon_ranges])
+
+        keys = (rows[:, None] * self.n_cols + cols[None, :]).ravel()
+        pos = np.searchsorted(self.cell_keys, keys)
+        found = pos < len(self.cell_keys)
+        found[found] = self.cell_keys[pos[found]] == keys[found]
+        pos = np.unique(pos[found])
+        starts, counts = self.cell_starts[pos], self.cell_counts[pos]
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        # Expand [start, start + count) ranges without a Python loop
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+        return offsets + np.arange(total)
+
+    @staticmethod
+    def _radius_bbox(lat, lon, radius_km):
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 90.0)))
+        dlon = 360.0 if cos_lat < 1e-6 else min(360.0, dlat / cos_lat)
+        return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+    def within_radius(self, lat, lon, radius_km):
+        """(indices, distances_km) of points within `radius_km`, nearest first"""
+        candidates = self._candidates(*self._radius_bbox(lat, lon, radius_km))
+        distances = haversine_km(lat, lon, self.lat[candidates], self.lon[candidates])
+        keep = distances <= radius_km
+        candidates, distances = candidates[keep], distances[keep]
+        ordering = np.argsort(distances, kind="stable")
+        return self.order[candidates[ordering]], distances[ordering]
+
+    def within_radius_many(self, lat, lon, radius_km):
+        """(query, indices, distances_km) of every point within `radius_km` of each query point.
+
+        Batched within_radius: the grid cells around all query points are
+        expanded and filtered in one vectorized pass, on a grid regridded like
+        overlapping_pairs so each query covers a few cells only.
+        """
+        lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        empty = np.empty(0, dtype=np.int64)
+        if len(self) == 0 or len(lat) == 0:
+            return empty, empty, np.empty(0)
+        if self.cell_deg < radius_km / KM_PER_DEGREE_LAT:
+            coarse = GeoIndex(self.lat, self.lon, cell_deg=radius_km / KM_PER_DEGREE_LAT)
+            query, near, distances = coarse.within_radius_many(lat, lon, radius_km)
+            return query, self.order[near], distances
+        # Bounding box of every query, in grid rows and (unclipped, wrapping) columns
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        cos_lat = np.cos(np.radians(np.minimum(np.abs(lat) + dlat, 90.0)))
+        dlon = np.where(cos_lat < 1e-6, 360.0, np.minimum(360.0, dlat / np.maximum(cos_lat, 1e-6)))
+        wrap = self.n_cols - 1
+        row0, row1 = self._rows(lat - dlat), self._rows(lat + dlat)
+        col0 = np.floor((lon - dlon + 180) / self.cell_deg).astype(np.int64)
+        width = np.minimum(np.floor((lon + dlon + 180) / self.cell_deg).astype(np.int64) - col0 + 1, wrap)
+        cells = (row1 - row0 + 1) * width
+        # One entry per (query, cell) of its box
+        query = np.repeat(np.arange(len(lat)), cells)
+        local = np.arange(int(cells.sum())) - np.repeat(np.cumsum(cells) - cells, cells)
+        keys = (row0[query] + local // width[query]) * self.n_cols + (col0[query] + local % width[query]) % wrap
+        pos = np.searchsorted(self.cell_keys, keys)
+        found = pos < len(self.cell_keys)
+        found[found] = self.cell_keys[pos[found]] == keys[found]
+        query, pos = query[found], pos[found]
+        # One entry per (query, point in one of its cells)
+        counts = self.cell_counts[pos]
+        total = int(counts.sum())
+        query = np.repeat(query, counts)
+        candidates = np.repeat(self.cell_starts[pos] - (np.cumsum(counts) - counts), counts) + np.arange(total)
+        distances = haversine_km(lat[query], lon[query], self.lat[candidates], self.lon[candidates])
+        keep = distances <= radius_km
+        return query[keep], self.order[candidates[keep]], distances[keep]
+
+    def nearest(self, lat, lon, k=5, max_km=None):
+        """(indices, distances_km) of the `k` nearest points, optionally capped at `max_km`"""
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        # Grow the search radius until it holds k points; every point inside it was considered
+        radius = self.cell_deg * KM_PER_DEGREE_LAT
+        limit = max_km if max_km is not None else math.pi * EARTH_RADIUS_KM
+        while True:
+            radius = min(radius, limit)
+            indices, distances = self.within_radius(lat, lon, radius)
+            if len(indices) >= k or radius >= limit:
+                return indices[:k], distances[:k]
+            radius *= 2
+
+    def within_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """Indices of points inside a lat/long bounding box (min_lon > max_lon wraps the antimeridian)"""
+        if min_lon > max_lon:
+            max_lon += 360
+        candidates = self._candidates(min_lat, max_lat, min_lon, max_lon)
+        lat, lon = self.lat[candidates], self.lon[candidates]
+        lon = np.where(lon < min_lon, lon + 360, lon)
+        keep = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+        return np.sort(self.order[candidates[keep]])
+
+    def overlapping_pairs(self, radius_km=5.0):
+        """(i, j, distance_km) for every pair i < j whose `radius_km` circles intersect"""
+        reach = 2 * radius_km
+        if self.cell_deg * KM_PER_DEGREE_LAT < reach:
+            # Regrid so each cell only needs its immediate neighbours; fewer, fuller cells vectorize better
+            coarse = GeoIndex(self.lat, self.lon, cell_deg=reach / KM_PER_DEGREE_LAT)
+            i, j, d = coarse.overlapping_pairs(radius_km)
+            i, j = self.order[i], self.order[j]
+            return np.minimum(i, j), np.maximum(i, j), d
+        pairs_i, pairs_j, pairs_d = [], [], []
+        for start, count in zip(self.cell_starts, self.cell_counts):
+            block = np.arange(start, start + count)
+            lat, lon = self.lat[block], self.lon[block]
+            # One bbox around the whole cell covers every point in it
+            dlat = reach / KM_PER_DEGREE_LAT
+            cos_lat = math.cos(math.radians(min(float(np.abs(lat).max()) + dlat, 90.0)))
+            dlon = 360.0 if cos_lat < 1e-6 else min(360.0, dlat / cos_lat)
+            others = self._candidates(lat.min() - dlat, lat.max() + dlat, lon.min() - dlon, lon.max() + dlon)
+            others = others[others > block[0]]
+            if len(others) == 0:
+                continue
+            distances = haversine_km(lat[:, None], lon[:, None], self.lat[others][None, :], self.lon[others][None, :])
+            a, b = np.nonzero((distances <= reach) & (others[None, :] > block[:, None]))
+            pairs_i.append(block[a])
+            pairs_j.append(others[b])
+            pairs_d.append(distances[a, b])
+        if not pairs_i:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        i, j = self.order[np.concatenate(pairs_i)], self.order[np.concatenate(pairs_j)]
+        low, high = np.minimum(i, j), np.maximum(i, j)
+        return low, high, np.concatenate(pairs_d)
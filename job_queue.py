@@ -0,0 +1,217 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from query_router import request_key
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "job_queue.sqlite3")
+# Enqueueing fails with QueueFull once this many jobs are waiting
+JOB_QUEUE_MAX_DEPTH = int(os.getenv("JOB_QUEUE_MAX_DEPTH", "500"))
+# A running job whose worker has not finished it after this many seconds is handed out again
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Finished jobs are kept this long for retrieval by id
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "86400"))
+
+QUEUED, RUNNING, DONE, ERROR = "queued", "running", "done", "error"
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS llm_jobs (
+        job_id TEXT PRIMARY KEY,
+        query TEXT NOT NULL,
+        session_id TEXT,
+        dedup_key TEXT NOT NULL,
+        priority INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL,
+        response TEXT,
+        detail TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        worker TEXT,
+        enqueued_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS llm_jobs_pending ON llm_jobs (status, priority DESC, enqueued_at)",
+    "CREATE INDEX IF NOT EXISTS llm_jobs_dedup ON llm_jobs (dedup_key, status)",
+    "CREATE INDEX IF NOT EXISTS llm_jobs_finished ON llm_jobs (finished_at)",
+]
+
+
+class QueueFull(Exception):
+    """Raised when JOB_QUEUE_MAX_DEPTH jobs are already waiting"""
+
+
+class JobQueue:
+    """Durable priority queue of LLM queries in SQLite, shared by the API and worker processes.
+
+    Identical in-flight queries (same request_key) share one job. Workers claim
+    jobs atomically; a job whose worker died is re-queued after
+    JOB_VISIBILITY_TIMEOUT, up to JOB_MAX_ATTEMPTS times.
+    """
+
+    def __init__(self, path=JOB_QUEUE_PATH, max_depth=JOB_QUEUE_MAX_DEPTH):
+        self.path = path
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        # Queue files created before sessions existed lack the column
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(llm_jobs)")}
+        if "session_id" not in columns:
+            self._conn.execute("ALTER TABLE llm_jobs ADD COLUMN session_id TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_jobs_session ON llm_jobs (session_id, finished_at)")
+
+    def _transaction(self, func):
+        # BEGIN IMMEDIATE takes the write lock up front, so claims never race between processes
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, query, priority=0, session_id=None):
+        """Add a query and return (job_id, status, deduplicated); raises QueueFull when the queue is saturated.
+
+        Queries of a session are answered in its context, so they are only
+        deduplicated within that session.
+        """
+        key = f"{session_id}:{request_key(query)}" if session_id else request_key(query)
+
+        def insert(conn):
+            existing = conn.execute(
+                "SELECT job_id, status, priority FROM llm_jobs WHERE dedup_key = ? AND status IN (?, ?) LIMIT 1",
+                (key, QUEUED, RUNNING)).fetchone()
+            if existing is not None:
+                if priority > existing["priority"]:
+                    conn.execute("UPDATE llm_jobs SET priority = ? WHERE job_id = ?", (priority, existing["job_id"]))
+                return existing["job_id"], existing["status"], True
+            depth = conn.execute("SELECT COUNT(*) FROM llm_jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if depth >= self.max_depth:
+                raise QueueFull(f"{depth} queries are already waiting")
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO llm_jobs (job_id, query, session_id, dedup_key, priority, status, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (job_id, query, session_id, key, priority, QUEUED, time.time()))
+            return job_id, QUEUED, False
+
+        return self._transaction(insert)
+
+    def claim(self, worker):
+        """Mark the highest-priority, oldest queued job as running and return it, or None"""
+        # Idle workers poll often; a plain read avoids taking the write lock when nothing is queued
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM llm_jobs WHERE status = ? LIMIT 1", (QUEUED,)).fetchone() is None:
+                return None
+
+        def take(conn):
+            row = conn.execute(
+                "SELECT * FROM llm_jobs WHERE status = ? ORDER BY priority DESC, enqueued_at LIMIT 1",
+                (QUEUED,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE llm_jobs SET status = ?, worker = ?, started_at = ?, attempts = attempts + 1 "
+                "WHERE job_id = ?", (RUNNING, worker, time.time(), row["job_id"]))
+            return dict(row)
+
+        return self._transaction(take)
+
+    def _finish(self, job_id, status, response=None, detail=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE llm_jobs SET status = ?, response = ?, detail = ?, finished_at = ? WHERE job_id = ?",
+                (status, response, detail, time.time(), job_id))
+
+    def complete(self, job_id, response):
+        self._finish(job_id, DONE, response=response)
+
+    def fail(self, job_id, detail):
+        self._finish(job_id, ERROR, detail=detail)
+
+    def release(self, job_id):
+        """Put a claimed job back in the queue without counting the attempt"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE llm_jobs SET status = ?, worker = NULL, started_at = NULL, attempts = attempts - 1 "
+                "WHERE job_id = ? AND status = ?", (QUEUED, job_id, RUNNING))
+
+    def requeue_stale(self, timeout=JOB_VISIBILITY_TIMEOUT, max_attempts=JOB_MAX_ATTEMPTS):
+        """Re-queue jobs whose worker stopped responding; give up after `max_attempts`"""
+        cutoff = time.time() - timeout
+
+        def sweep(conn):
+            conn.execute(
+                "UPDATE llm_jobs SET status = ?, detail = 'Worker did not finish the job', finished_at = ? "
+                "WHERE status = ? AND started_at < ? AND attempts >= ?", (ERROR, time.time(), RUNNING, cutoff, max_attempts))
+            return conn.execute(
+                "UPDATE llm_jobs SET status = ?, worker = NULL, started_at = NULL "
+                "WHERE status = ? AND started_at < ?", (QUEUED, RUNNING, cutoff)).rowcount
+
+        return self._transaction(sweep)
+
+    def purge(self, retention=JOB_RETENTION):
+        """Delete finished jobs older than `retention` seconds"""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM llm_jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, ERROR, time.time() - retention)).rowcount
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM llm_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def latest(self, session_id):
+        """The most recently completed job of a session, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM llm_jobs WHERE session_id = ? AND status = ? ORDER BY finished_at DESC LIMIT 1",
+                (session_id, DONE)).fetchone()
+        return dict(row) if row is not None else None
+
+    def metrics(self):
+        """Jobs per status, queue depth and age, and average wait/run times of the last 1000 jobs"""
+        now = time.time()
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM llm_jobs GROUP BY status").fetchall())
+            oldest = self._conn.execute(
+                "SELECT MIN(enqueued_at) FROM llm_jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            timings = self._conn.execute("""
+                SELECT AVG(started_at - enqueued_at), AVG(finished_at - started_at) FROM (
+                    SELECT enqueued_at, started_at, finished_at FROM llm_jobs
+                    WHERE status = ? ORDER BY finished_at DESC LIMIT 1000
+                )
+            """, (DONE,)).fetchone()
+        return {
+            "jobs": {status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, ERROR)},
+            "queue_depth": counts.get(QUEUED, 0),
+            "max_depth": self.max_depth,
+            "oldest_queued_age_s": round(now - oldest, 3) if oldest else 0.0,
+            "avg_wait_s": round(timings[0], 3) if timings[0] is not None else None,
+            "avg_run_s": round(timings[1], 3) if timings[1] is not None else None,
+        }
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return this process's queue connection, opening it on first use"""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue()
+    return _job_queue
@@ -1,330 +1,564 @@
-from langchain.chains import LLMChain
-from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
-from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain.agents import Tool, initialize_agent
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from sqlalchemy import create_engine
-from langchain_community.utilities.sql_database import SQLDatabase
+import asyncio
 import os
+import threading
+import weakref
+from collections import Counter
 from dotenv import load_dotenv
-
-# Load environment variables from .env file
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.prompts import ChatPromptTemplate
+from outlet_snapshot import outlet_snapshot
+from query_router import route_query, contextualize, same_request
+from pipeline_dag import PipelineRun, StageTimeout
+from outlet_names import validate_outlet_mentions
+from response_cache import response_cache
+from session_memory import session_memory, resolve_follow_up
+from call_cache import call_store, CachedSearch, LLMCallCache
+from coverage_graph import describe_coverage
+from outlet_query import OutletQuery, run_outlet_query
+import tracing
+
+# Load environment variables from .env file; ChatOpenAI and Tavily read their API keys from it
 load_dotenv()
 
-# Set environment variables after loading from .env
-os.environ['TAVILY_API_KEY'] = os.getenv('TAVILY_API_KEY')
-os.environ['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY')
-
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-
-# Connect to the database using environment variables
-db_url = f"postgresql+psycopg2://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}/{os.getenv('POSTGRES_DB')}"
-engine = create_engine(db_url)
-database = SQLDatabase(engine)
-
-# SQL tools
-sql_toolkit = SQLDatabaseToolkit(db=database, llm=llm)
-sql_tools = sql_toolkit.get_tools()
-for tool in sql_tools:
-    if tool.name == "sql_db_query":
-        tool.description = "Use this tool FIRST to query the McDonald's database for outlet information including addresses, names, and other details"
-    elif tool.name == "sql_db_schema":
-        tool.description = "Use this to get the database schema to help form your SQL queries"
-
-# TavilySearchResults for search
-search_tool = TavilySearchResults(max_results=3)
-search_tool = Tool(
-    name="web_search",
-    func=search_tool.run,
-    description="ONLY use this tool if the information cannot be found in the database first"
-)
+# The model, web search and agents are built on first use (or by the API's warm-up task),
+# so importing this module stays cheap and needs no network. The langchain_openai,
+# langchain_community and langchain.agents imports alone take seconds, so they are
+# imported inside the builders too. Assign `llm` / `search_tool` before first use to replace them.
+llm = None
+search_tool = None
+_resource_lock = threading.Lock()
+
+def get_llm():
+    """Return the shared chat model, creating it on first use"""
+    global llm
+    with _resource_lock:
+        if llm is None:
+            from langchain_openai import ChatOpenAI
+            # OPENAI_BASE_URL lets the pipeline point at a local stub server for load tests;
+            # with CALL_CACHE_MODE set, completions and web searches are memoized on disk
+            llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, base_url=os.getenv("OPENAI_BASE_URL"),
+                             cache=LLMCallCache(call_store) if call_store else None)
+        return llm
+
+SEARCH_TOOL_DESCRIPTION = ("Search the web. ONLY use this tool for information outlet_query cannot give, "
+                           "such as opening hours or facilities")
+
+def get_search_tool():
+    """Return the shared web search tool (Tavily), creating it on first use"""
+    global search_tool
+    with _resource_lock:
+        if search_tool is None:
+            from langchain.agents import Tool
+            from langchain_community.tools.tavily_search import TavilySearchResults
+            search = TavilySearchResults(max_results=3)
+            if call_store:
+                search = CachedSearch(search, call_store)
+            search_tool = Tool(
+                name="web_search",
+                func=search.run,
+                coroutine=search.arun,
+                description=SEARCH_TOOL_DESCRIPTION
+            )
+        return search_tool
+
+# Catchment overlaps come from the precomputed coverage graph, not the web
+def outlet_coverage(name: str):
+    snapshot = get_outlet_snapshot()
+    if snapshot is None:
+        return "Outlet data is unavailable right now."
+    return describe_coverage(snapshot, name)
+
+async def aoutlet_coverage(name: str):
+    return await asyncio.to_thread(outlet_coverage, name)
+
+def build_coverage_tool():
+    from langchain.agents import Tool
+    return Tool(
+        name="outlet_coverage",
+        func=outlet_coverage,
+        coroutine=aoutlet_coverage,
+        description="Look up which McDonald's outlets in the database have 5 km radius areas that overlap "
+                    "(intersect) a given outlet's. Input: the outlet name."
+    )
+
+# Typed outlet lookups answered from the in-memory snapshot: one cheap call, no SQL to write
+def outlet_query(**arguments):
+    snapshot = get_outlet_snapshot()
+    if snapshot is None:
+        return "Outlet data is unavailable right now."
+    return run_outlet_query(snapshot, **arguments)
+
+async def aoutlet_query(**arguments):
+    return await asyncio.to_thread(outlet_query, **arguments)
+
+def build_outlet_query_tool():
+    from langchain_core.tools import StructuredTool
+    return StructuredTool.from_function(
+        func=outlet_query,
+        coroutine=aoutlet_query,
+        name="outlet_query",
+        args_schema=OutletQuery,
+        description="Look up McDonald's outlets in the database by name, by distance from a place, by address "
+                    "or by facility (drive-thru, 24 hours, birthday parties, ...). Returns names, addresses, "
+                    "phone numbers, distances and known facilities. Use this first."
+    )
+
+def build_tools():
+    """The search agent's tools: typed outlet lookups first, the web last"""
+    return [build_outlet_query_tool(), build_coverage_tool(), get_search_tool()]
+
 # Create a default response for non-McDonald's queries
 def default_response():
     return "I apologize, but I can only answer questions about McDonald's outlets in Kuala Lumpur. Please ask me about McDonald's outlet locations, operating hours, or other outlet-related information in KL."
 
 #====================================
 # First agent (Detection agent) 
-def detect_and_transform_query(query: str):
-    """Detect and transform queries about McDonald's outlets in Kuala Lumpur"""
-    detection_prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a query detector that transforms questions about outlets in Kuala Lumpur.
-        DO NOT USE OR MENTION ANY TOOLS. Simply transform or reject the query based on the rules below.
-
-        TRANSFORMATION RULES:
-        1. When a query contains "outlet" WITHOUT mentioning any restaurant name:
-           RETURN THE TRANSFORMED QUERY:
-           - Add "McDonald's" and "in Kuala Lumpur" to the query
-           Example: "Which outlet allows birthday parties?" -> "Which McDonald's outlet in Kuala Lumpur allows birthday parties?"
-
-        2. When a query explicitly mentions "McDonald's":
-           RETURN THE TRANSFORMED QUERY:
-           - Add "in Kuala Lumpur" if needed
-           Example: "What are McDonald's outlet hours?" -> "What are McDonald's outlet hours in Kuala Lumpur?"
-
-        3. For invalid queries (other restaurants or unrelated topics):
-           RETURN EXACTLY: "INVALID"
-
-        DO NOT return any other messages or mention any tools.
-        """),
-        
-        ("human", """{input}""")
-    ])
-
-    detection_chain = LLMChain(
+DETECTION_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a query detector that transforms questions about outlets in Kuala Lumpur.
+    DO NOT USE OR MENTION ANY TOOLS. Simply transform or reject the query based on the rules below.
+
+    TRANSFORMATION RULES:
+    1. When a query contains "outlet" WITHOUT mentioning any restaurant name:
+       RETURN THE TRANSFORMED QUERY:
+       - Add "McDonald's" and "in Kuala Lumpur" to the query
+       Example: "Which outlet allows birthday parties?" -> "Which McDonald's outlet in Kuala Lumpur allows birthday parties?"
+
+    2. When a query explicitly mentions "McDonald's":
+       RETURN THE TRANSFORMED QUERY:
+       - Add "in Kuala Lumpur" if needed
+       Example: "What are McDonald's outlet hours?" -> "What are McDonald's outlet hours in Kuala Lumpur?"
+
+    3. For invalid queries (other restaurants or unrelated topics):
+       RETURN EXACTLY: "INVALID"
+
+    DO NOT return any other messages or mention any tools.
+    """),
+
+    ("human", """{input}""")
+])
+
+def build_detection_chain(llm):
+    from langchain.chains import LLMChain
+    return LLMChain(
         llm=llm,
-        prompt=detection_prompt
+        prompt=DETECTION_PROMPT
     )
 
-    return detection_chain.run(query).strip()
+def detect_and_transform_query(query: str):
+    """Detect and transform queries about McDonald's outlets in Kuala Lumpur"""
+    return get_pipeline().detection_chain.run(query, callbacks=tracing.callbacks()).strip()
+
+async def adetect_and_transform_query(query: str):
+    """Async version of detect_and_transform_query"""
+    return (await get_pipeline().detection_chain.arun(query, callbacks=tracing.callbacks())).strip()
 
 #====================================
 # Second agent (Search agent)
-def search_mcdonalds_outlets(query: str):
-    """Search for specific McDonald's outlets in Kuala Lumpur based on user query"""
-    custom_prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a McDonald's Kuala Lumpur outlets expert. Your task is to search for SPECIFIC McDonald's outlets in Kuala Lumpur based on what the user asks.
-
-        SEARCH GUIDELINES:
-        - ALWAYS include "McDonald's" in your search query, even if the user doesn't mention it
-        - Search specifically for outlet names that match the user's criteria
-        - Only return specific outlet names and their relevant information
-        - If no specific outlets can be found, respond with "I cannot find specific McDonald's outlets in Kuala Lumpur that match your criteria."
-        - DO NOT provide general information or website links
-        - DO NOT make assumptions or provide alternative information
-        - Format responses with bullet points when listing multiple outlets
-        Example Searches and Responses:
-        User: "Which outlet allows birthday parties?"
-        Good Response:
-        - McDonald's Bukit Bintang: Offers birthday party facilities
-        - McDonald's KLCC: Has dedicated party room
-        
-        Bad Response (DO NOT DO THIS):
-        - "You can host birthday parties at McDonald's outlets..."
-        - "Visit McDonald's website for party bookings..."
-        - "McDonald's offers party packages..."
-        
-        Response Format:
-        - McDonald's [Outlet Name]: [Specific information about this outlet]
-        OR
-        "I cannot find specific McDonald's outlets in Kuala Lumpur that match your criteria."
-        """),
-        
-        ("human", """ALWAYS search for at least 3 times before giving the response, if still cannot find, then give the response. {input}""")
-    ])
-
-    search_agent = initialize_agent(
-        tools=[search_tool], 
+SEARCH_PREFIX = """You are a McDonald's Kuala Lumpur outlets expert. Your task is to find SPECIFIC McDonald's outlets in Kuala Lumpur based on what the user asks.
+
+    TOOL GUIDELINES:
+    - Use outlet_query FIRST for anything the database holds: outlet names, addresses, phone numbers,
+      outlets near a place and facilities (drive-thru, open 24 hours, birthday parties, McCafé, McDelivery,
+      breakfast, WiFi). One call with the right arguments is enough
+    - Use outlet_coverage for questions about overlapping 5 km outlet areas
+    - Use web_search ONLY for facts the database does not hold (exact opening hours, menus, promotions, or a
+      facility outlet_query says it has no data for), and ALWAYS include "McDonald's" in the search query
+
+    ANSWER GUIDELINES:
+    - Only return specific outlet names and their relevant information
+    - If no specific outlets can be found, respond with "I cannot find specific McDonald's outlets in Kuala Lumpur that match your criteria."
+    - DO NOT provide general information or website links
+    - DO NOT make assumptions or provide alternative information
+    - Format responses with bullet points when listing multiple outlets
+    Example Searches and Responses:
+    User: "Which outlet allows birthday parties?"
+    Good Response:
+    - McDonald's Bukit Bintang: Offers birthday party facilities
+    - McDonald's KLCC: Has dedicated party room
+
+    Bad Response (DO NOT DO THIS):
+    - "You can host birthday parties at McDonald's outlets..."
+    - "Visit McDonald's website for party bookings..."
+    - "McDonald's offers party packages..."
+
+    Response Format:
+    - McDonald's [Outlet Name]: [Specific information about this outlet]
+    OR
+    "I cannot find specific McDonald's outlets in Kuala Lumpur that match your criteria."
+
+    You have access to the following tools:"""
+
+class ToolUsage(BaseCallbackHandler):
+    """Counts search agent runs and the tool calls they make"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def on_chain_start(self, serialized, inputs, *, parent_run_id=None, **kwargs):
+        # Only the agent executor's own run, not the LLM chain nested in it
+        if parent_run_id is None:
+            with self.lock:
+                self.counts["searches"] += 1
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        with self.lock:
+            self.counts[f"tool:{(serialized or {}).get('name') or kwargs.get('name', 'unknown')}"] += 1
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.counts)
+        searches = counts.pop("searches", 0)
+        calls = sum(counts.values())
+        return {
+            "searches": searches,
+            "tool_calls": calls,
+            "tool_calls_per_search": round(calls / searches, 3) if searches else 0.0,
+            "per_tool": {name.split(":", 1)[1]: count for name, count in counts.items()},
+        }
+
+tool_usage = ToolUsage()
+
+def tool_metrics():
+    """Search agent runs and tool calls per tool, for /llmresponses/tool-metrics"""
+    return tool_usage.stats()
+
+def build_search_agent(llm, tools):
+    from langchain.agents import AgentType, initialize_agent
+    # The structured-chat agent accepts outlet_query's typed, multi-field arguments
+    return initialize_agent(
+        tools=tools,
         llm=llm,
-        agent_type="zero-shot-react-description",
+        agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
         verbose=True,
-        agent_kwargs={'prompt': custom_prompt}
+        agent_kwargs={'prefix': SEARCH_PREFIX}
     )
 
-    return search_agent.run(query)
+def search_input(query, context=""):
+    """The agent's input; a follow-up also gets the search results of the turn it refers to"""
+    if not context:
+        return query
+    return (f"{query}\n\nResults found earlier in this conversation (answer from them when they cover "
+            f"the question; only use tools for what they do not cover):\n{context}")
 
-#====================================
-# Third agent (Transform agent)
-def transform_response_to_query(response):
-    transform_prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a helper that transforms statements about SPECIFIC McDonald's locations into database validation questions.
-        
-        RULES:
-        1. IF SPECIFIC McDonald's outlet names are detected in the input:
-           - For EACH specific outlet, create TWO questions:
-             a. One with the original name EXACTLY AS IS (preserve all numbers and special characters)
-             b. One with DT added (if no DT) or removed (if has DT)
-           - ALWAYS include "McDonald's" in the outlet name
-           - NEVER remove or modify numbers in outlet names
-           - If name ends with DT, create version without DT
-           - If name doesn't end with DT, create version with DT added at the end
-        
-        2. Return EXACTLY "INVALID" if:
-           - No specific outlet names are mentioned
-           - Only general references to "McDonald's" or "McDonald's outlets"
-           - Information about McDonald's services/facilities in general
-        
-        Examples:
-        Input: "McDonald's Mid Valley 3 is open 24 hours"
-        Output:
-        Is McDonald's Mid Valley 3 exist in mcdonalds_outlets table?
-        Is McDonald's Mid Valley 3 DT exist in mcdonalds_outlets table?
-        
-        Input: "McDonald's KLCC 2 DT and McDonald's Pandan Mewah are open"
-        Output:
-        Is McDonald's KLCC 2 DT exist in mcdonalds_outlets table?
-        Is McDonald's KLCC 2 exist in mcdonalds_outlets table?
-        Is McDonald's Pandan Mewah exist in mcdonalds_outlets table?
-        Is McDonald's Pandan Mewah DT exist in mcdonalds_outlets table?
-
-        Input: "You can host a birthday party at McDonald's outlets"
-        Output: "INVALID"
-
-        [IMPORTANT] If the output is found, append this sql query at the end of the output:
-        Please use this query to get the information of the outlet: SELECT * FROM mcdonalds_outlets WHERE name IN ('McDonald's [outlet1]', 'McDonald's [outlet2]', ...)
-        """),
-        
-        ("human", """Transform this statement ONLY if it contains specific McDonald's outlet names:
-        {response}""")
-    ])
-    
-    # Create a chain for the transformation
-    transform_chain = LLMChain(
-        llm=llm,  # Using the same LLM we defined earlier
-        prompt=transform_prompt,
-    )
-    
-    # Transform the response
-    transformed_query = transform_chain.run(response=response)
-    
-    return transformed_query.strip()
+def search_mcdonalds_outlets(query: str, context=""):
+    """Search for specific McDonald's outlets in Kuala Lumpur based on user query"""
+    return get_pipeline().search_agent.run(search_input(query, context), callbacks=tracing.callbacks(tool_usage))
 
-#====================================
-# Fourth agent (Validation agent)
-def evaluate_response(query: str):
-    """Evaluate if a McDonald's outlet exists in Kuala Lumpur"""
-    system = """ You are an expert at identifying valid McDonald's outlets in Kuala Lumpur.
-
-    Your task is to check if each outlet name exists in the mcdonalds_outlets table:
-    1. FIRST, run this SQL query:
-       SELECT name FROM mcdonalds_outlets;
-
-    2. Then for each outlet name in the input:
-       - Check if it exists in the query results
-       - If exists: Return the exact name as found in the results
-       - If not found: Return "The outlet is not in Kuala Lumpur"
-
-    Example Process:
-    Input: "Is McDonald's BHP Jalan Kepong DT in Kuala Lumpur?"
-    1. Run SELECT name FROM mcdonalds_outlets query
-    2. Check results -> If found: "Yes, McDonald's BHP Jalan Kepong is in Kuala Lumpur"
-                     -> If not found: "The outlet is not in Kuala Lumpur"
-
-    Input: "Is McDonald's XYZ in Kuala Lumpur?"
-    1. Run SELECT name FROM mcdonalds_outlets query
-    2. Check results -> "The outlet is not in Kuala Lumpur"
-
-    IMPORTANT: Always run the SELECT name FROM mcdonalds_outlets query to check any outlets.
-    """
+async def asearch_mcdonalds_outlets(query: str, context=""):
+    """Async version of search_mcdonalds_outlets"""
+    return await get_pipeline().search_agent.arun(search_input(query, context),
+                                                  callbacks=tracing.callbacks(tool_usage))
 
-    evaluation_prompt = ChatPromptTemplate.from_messages([
-        ("system", system),
-        ("human", """Please check if these outlets exist in the mcdonalds_outlets table:
-        {input}""")
-    ])
+#====================================
+# Outlet validation (replaces the Transform and Validation agents)
+def validate_outlets(response, snapshot):
+    """Check outlet names in the search agent's response against the local name index"""
+    return validate_outlet_mentions(response, snapshot.name_index)
 
-    evaluation_chain = initialize_agent(
-        tools=sql_tools,
+#====================================
+# Third agent (Compile agent)
+CONCLUSION_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a helper that modifies the original search results based on the user's question while ensuring all outlets pass location validation.
+
+    Your main tasks:
+    1. Take the original search results
+    2. Check the location validation results for both DT and non-DT versions of each outlet
+    3. Update outlet names to match the database version (with or without DT)
+    4. Ensure the modified results directly answer the user's original question
+
+    Format Rules:
+    1. Respond in complete, natural sentences instead of bullet points
+    2. For outlet names:
+       - If either version (with/without DT) exists in database:
+         * Use the exact name from database validation results
+         * Keep the original information but update the outlet name
+       Example: 
+       Original: "McDonald's BHP Jalan Kepong DT is open 24 hours"
+       Database name: "McDonald's BHP Jalan Kepong"
+       Final: "McDonald's BHP Jalan Kepong is open 24 hours."
+
+    3. For non-existent outlets:
+       - If neither version exists in database:
+         * If outlet was specifically mentioned in original query:
+             Include "I cannot provide information about [Original Outlet Name] as it is not in Kuala Lumpur."
+         * If outlet was NOT specifically mentioned in original query:
+             Simply exclude it from the final response
+
+    Example:
+    Original Results:
+    - McDonald's Pandan Mewah: Open 24 hours
+    - McDonald's BHP Jalan Kepong DT: Drive-thru available
+
+    Validation Results:
+    Is McDonald's Pandan Mewah in Kuala Lumpur? No
+    Is McDonald's Pandan Mewah DT in Kuala Lumpur? Yes, as McDonald's Pandan Mewah DT
+    Is McDonald's BHP Jalan Kepong DT in Kuala Lumpur? No
+    Is McDonald's BHP Jalan Kepong in Kuala Lumpur? Yes, as McDonald's BHP Jalan Kepong
+
+    Final Output:
+    McDonald's Pandan Mewah DT is open 24 hours, and McDonald's BHP Jalan Kepong offers drive-thru service."""),
+
+    ("human", """Original user question:
+    {original_query}
+
+    Original search results:
+    {first_response}
+
+    Location validation results:
+    {second_response}
+
+    Please modify the original search results based on the validation results, updating outlet names to match the database version and ensure it answers the original question in complete sentences.""")
+])
+
+def build_conclusion_chain(llm):
+    from langchain.chains import LLMChain
+    return LLMChain(
         llm=llm,
-        agent_type="zero-shot-react-description",
-        verbose=True,
-        agent_kwargs={'prompt': evaluation_prompt}
+        prompt=CONCLUSION_PROMPT
     )
 
-    evaluation_input = {'input': query}
-    return evaluation_chain.run(evaluation_input)
-
-#====================================
-# Fifth agent (Compile agent)
 def create_final_response(original_query, first_agent_response, second_agent_response):
-    conclusion_prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a helper that modifies the original search results based on the user's question while ensuring all outlets pass location validation.
-
-        Your main tasks:
-        1. Take the original search results
-        2. Check the location validation results for both DT and non-DT versions of each outlet
-        3. Update outlet names to match the database version (with or without DT)
-        4. Ensure the modified results directly answer the user's original question
-
-        Format Rules:
-        1. Respond in complete, natural sentences instead of bullet points
-        2. For outlet names:
-           - If either version (with/without DT) exists in database:
-             * Use the exact name from database validation results
-             * Keep the original information but update the outlet name
-           Example: 
-           Original: "McDonald's BHP Jalan Kepong DT is open 24 hours"
-           Database name: "McDonald's BHP Jalan Kepong"
-           Final: "McDonald's BHP Jalan Kepong is open 24 hours."
-
-        3. For non-existent outlets:
-           - If neither version exists in database:
-             * If outlet was specifically mentioned in original query:
-                 Include "I cannot provide information about [Original Outlet Name] as it is not in Kuala Lumpur."
-             * If outlet was NOT specifically mentioned in original query:
-                 Simply exclude it from the final response
-        
-        Example:
-        Original Results:
-        - McDonald's Pandan Mewah: Open 24 hours
-        - McDonald's BHP Jalan Kepong DT: Drive-thru available
-
-        Validation Results:
-        Is McDonald's Pandan Mewah in Kuala Lumpur? No
-        Is McDonald's Pandan Mewah DT in Kuala Lumpur? Yes, as McDonald's Pandan Mewah DT
-        Is McDonald's BHP Jalan Kepong DT in Kuala Lumpur? No
-        Is McDonald's BHP Jalan Kepong in Kuala Lumpur? Yes, as McDonald's BHP Jalan Kepong
-
-        Final Output:
-        McDonald's Pandan Mewah DT is open 24 hours, and McDonald's BHP Jalan Kepong offers drive-thru service."""),
-        
-        ("human", """Original user question:
-        {original_query}
-
-        Original search results:
-        {first_response}
-        
-        Location validation results:
-        {second_response}
-        
-        Please modify the original search results based on the validation results, updating outlet names to match the database version and ensure it answers the original question in complete sentences.""")
-    ])
-    
-    # Create a chain for the conclusion
-    conclusion_chain = LLMChain(
-        llm=llm,
-        prompt=conclusion_prompt
-    )
-    
     # Generate the final response
-    final_response = conclusion_chain.run(
+    final_response = get_pipeline().conclusion_chain.run(
         original_query=original_query,
         first_response=first_agent_response,
-        second_response=second_agent_response
+        second_response=second_agent_response,
+        callbacks=tracing.callbacks()
     )
     
     return final_response.strip()
 
+async def acreate_final_response(original_query, first_agent_response, second_agent_response):
+    """Async version of create_final_response"""
+    final_response = await get_pipeline().conclusion_chain.arun(
+        original_query=original_query,
+        first_response=first_agent_response,
+        second_response=second_agent_response,
+        callbacks=tracing.callbacks()
+    )
+    return final_response.strip()
+
+async def astream_final_response(original_query, first_agent_response, second_agent_response, on_token):
+    """Like acreate_final_response, but passes each token to `on_token` as the model produces it"""
+    chunks = []
+    async for chunk in get_pipeline().conclusion_stream.astream({
+        "original_query": original_query,
+        "first_response": first_agent_response,
+        "second_response": second_agent_response,
+    }, config={"callbacks": tracing.callbacks()}):
+        chunks.append(chunk.content)
+        on_token(chunk.content)
+    return "".join(chunks).strip()
+
+#====================================
+# Pipeline (built once, shared by every request)
+class OutletPipeline:
+    """Chains and agents for process_query, constructed once and reused across requests.
+
+    Nothing here holds per-query state (no agent memory), so one instance is
+    safe to share between concurrent requests; the ChatOpenAI client keeps its
+    HTTP connection pool warm between them.
+    """
+
+    def __init__(self, llm, tools):
+        self.llm = llm
+        self.tools = tools
+        self.detection_chain = build_detection_chain(llm)
+        self.search_agent = build_search_agent(llm, tools)
+        self.conclusion_chain = build_conclusion_chain(llm)
+        # Same prompt without the LLMChain wrapper, so the answer can be streamed token by token
+        self.conclusion_stream = CONCLUSION_PROMPT | llm
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def get_pipeline():
+    """Return the shared pipeline, building it on first use"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = OutletPipeline(get_llm(), build_tools())
+    return _pipeline
+
+def pipeline_ready():
+    return _pipeline is not None
 
 #====================================
 # Main process function
-def process_query(query):
-    # First, detect and transform if valid
-    detection_result = detect_and_transform_query(query)
-    print("Detection result:", detection_result)
-    
-    # If detection returns "INVALID", use default_response
+def get_outlet_snapshot():
+    """Return the outlet snapshot, or None if the database is unavailable"""
+    try:
+        return outlet_snapshot.get()
+    except Exception as e:
+        tracing.annotate(snapshot_error=str(e))
+        tracing.count("outlet_snapshot_errors_total")
+        return None
+
+# Per-stage timeouts (seconds) and the number of queries one worker runs at once
+STAGE_TIMEOUTS = {
+    "detect": float(os.getenv("LLM_DETECT_TIMEOUT", "20")),
+    "search": float(os.getenv("LLM_SEARCH_TIMEOUT", "90")),
+    "compile": float(os.getenv("LLM_COMPILE_TIMEOUT", "30")),
+}
+MAX_CONCURRENT_QUERIES = int(os.getenv("LLM_MAX_CONCURRENT_QUERIES", "32"))
+# How long a query may wait for a free slot before it is turned away
+QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+
+class PipelineBusy(Exception):
+    """Raised when all query slots stay busy for longer than QUEUE_TIMEOUT"""
+
+# One semaphore per event loop, since process_query may run on short-lived loops
+_query_slots = weakref.WeakKeyDictionary()
+
+def get_query_slots():
+    loop = asyncio.get_running_loop()
+    if loop not in _query_slots:
+        _query_slots[loop] = asyncio.Semaphore(MAX_CONCURRENT_QUERIES)
+    return _query_slots[loop]
+
+async def aprocess_query(query, report=None, emit=None, session_id=None):
+    """Run the query pipeline without blocking the event loop.
+
+    Stages run as a DAG: the web search starts speculatively on a locally
+    contextualized query while the detection agent is still running, and is
+    only restarted if detection rewrote the query into something else. Pass a
+    dict as `report` to receive per-stage timings, and an `emit(event, data)`
+    callback to receive stage progress and the tokens of the final answer.
+    With a `session_id`, follow-up questions reuse the outlets and search
+    results of the session's earlier turns (see session_memory.py).
+    """
+    with tracing.trace("query", query=query) as trace:
+        if trace is not None and report is not None:
+            report["trace_id"] = trace.trace_id
+        if session_id is None or session_memory is None:
+            return await _aprocess_query(query, report, emit)
+        turns = await asyncio.to_thread(session_memory.turns, session_id)
+        turn = {"query": query}
+        response = await _aprocess_query(query, report, emit, turns, turn)
+        turn["response"] = response
+        await asyncio.to_thread(session_memory.record, session_id, turn, get_outlet_snapshot())
+        return response
+
+async def _aprocess_query(query, report, emit, turns=None, turn=None):
+    listener = (lambda stage, status: emit("stage", {"stage": stage, "status": status})) if emit else None
+    run = PipelineRun(listener)
+    try:
+        run.start("snapshot", lambda: asyncio.to_thread(get_outlet_snapshot))
+        context = ""
+        if turns:
+            run.start("follow_up", lambda snapshot: resolve_follow_up(query, turns, snapshot), deps=["snapshot"])
+            follow_up = await run.result("follow_up")
+            if follow_up is not None:
+                session_memory.metrics["follow_ups"] += 1
+                tracing.annotate(follow_up=len(follow_up.outlets))
+                # Carried forward, so a later follow-up still finds the results this one relied on
+                turn["search"] = follow_up.search
+                if follow_up.response is not None:
+                    # Telephone, address and Waze questions about outlets named earlier need no lookup at all
+                    session_memory.metrics["follow_ups_answered_locally"] += 1
+                    return follow_up.response
+                query, context = follow_up.query, follow_up.search
+                turn["resolved"] = query
+
+        # Answer or reject locally when rules are enough; only ambiguous queries reach the LLM
+        run.start("route", lambda snapshot: route_query(query, snapshot), deps=["snapshot"])
+        route = await run.result("route")
+        tracing.annotate(route=route.kind, route_reason=route.reason)
+        if route.kind == "reject":
+            return default_response()
+        if route.kind == "answer":
+            return route.response
+
+        # Repeated questions are answered from the response cache while the outlet data is unchanged;
+        # lookups run off the event loop (SQLite reads, embedding calls for the semantic tier)
+        snapshot = await run.result("snapshot")
+        cacheable = response_cache is not None and snapshot is not None
+        if cacheable:
+            cached = await asyncio.to_thread(response_cache.get, query, snapshot.etag)
+            if cached is not None:
+                tracing.annotate(response_cache="hit")
+                return cached
+
+        slots = get_query_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise PipelineBusy(f"All {MAX_CONCURRENT_QUERIES} query slots are busy") from None
+        try:
+            response = await run_llm_stages(run, query, emit, context, turn)
+        finally:
+            slots.release()
+        if cacheable:
+            await asyncio.to_thread(response_cache.put, query, snapshot.etag, response)
+        return response
+    finally:
+        await run.close()
+        if report is not None:
+            report.update(run.report())
+
+async def run_llm_stages(run, query, emit=None, context="", turn=None):
+    speculative_query = contextualize(query)
+    if _pipeline is None:
+        # The first query after a cold start builds the pipeline off the event loop
+        await asyncio.to_thread(get_pipeline)
+
+    # First, detect and transform if valid; the search starts alongside it
+    run.start("detect", lambda: adetect_and_transform_query(query), timeout=STAGE_TIMEOUTS["detect"])
+    run.start("speculative_search", lambda: asearch_mcdonalds_outlets(speculative_query, context),
+              timeout=STAGE_TIMEOUTS["search"])
+
+    async def search(detect):
+        # If detection returns "INVALID", the speculative search is wasted work
+        if detect == "INVALID":
+            run.cancel("speculative_search")
+            return None
+        if same_request(detect, speculative_query):
+            return await run.result("speculative_search")
+        run.cancel("speculative_search")
+        tracing.count("pipeline_retries_total", reason="search_restart")
+        return await asearch_mcdonalds_outlets(detect, context)
+
+    def validate(search, candidates, snapshot):
+        # Validate outlets named in the search results locally, without an LLM
+        if search is None or snapshot is None:
+            return ""
+        validation = validate_outlets(search, snapshot)
+        # Outlets the user named themselves help the compile agent explain what is missing
+        extra = [line for line in candidates.splitlines() if line not in validation]
+        return "\n".join([validation] + extra) if validation else ""
+
+    run.start("search", search, deps=["detect"], timeout=STAGE_TIMEOUTS["search"])
+    # Outlet names in the question are resolved while the agents are still running
+    run.start("candidates", lambda snapshot: validate_outlets(query, snapshot) if snapshot else "", deps=["snapshot"])
+    run.start("validate", validate, deps=["search", "candidates", "snapshot"])
+
+    detection_result = await run.result("detect")
+    tracing.annotate(detection=detection_result)
     if detection_result == "INVALID":
         return default_response()
-    
-    # Otherwise, use the transformed query with the research chain
-    first_agent_response = search_mcdonalds_outlets(detection_result)
-    # print("First agent response:", first_agent_response)
-    # first_agent_response = "The McDonald's outlets in Kuala Lumpur that allow birthday parties include McDonald's Bandar Sri Damansara DT, McDonald's BHP Jalan Kepong DT, McDonald's Danau Kota DT, McDonald's Pandan Mewah, and McDonald's Pantai Sentral Park DT."
-
-    transformed_response = transform_response_to_query(first_agent_response)
-    print("Transformed response:", transformed_response)
-    # If transformed response is exactly the same as first_agent_response, stop the chain
-    if transformed_response == "INVALID" or transformed_response == first_agent_response:
+
+    first_agent_response = await run.result("search")
+    if turn is not None:
+        turn.update(resolved=detection_result, search=first_agent_response)
+    validation_result = await run.result("validate")
+    tracing.annotate(validated_outlets=len(validation_result.splitlines()))
+    # Stop the chain if the search results name no specific outlets
+    if not validation_result:
         return first_agent_response
-    
-    # Only continue if transformation occurred (meaning McDonald's locations were found)
-    evaluated_response = evaluate_response(transformed_response)
-    print("Evaluated response:", evaluated_response)
-    print("--------------------------------")
-    final_response = create_final_response(detection_result,first_agent_response, evaluated_response)
-    # print("Final response:", final_response)
-    return final_response
+
+    if emit:
+        on_token = lambda text: emit("token", {"text": text})
+        compile_stage = lambda: astream_final_response(detection_result, first_agent_response, validation_result, on_token)
+    else:
+        compile_stage = lambda: acreate_final_response(detection_result, first_agent_response, validation_result)
+    run.start("compile", compile_stage, timeout=STAGE_TIMEOUTS["compile"])
+    return await run.result("compile")
+
+def process_query(query):
+    """Blocking entry point for scripts; runs aprocess_query on a fresh event loop"""
+    return asyncio.run(aprocess_query(query))
 
 #====================================
 # Usage example
@@ -0,0 +1,138 @@
+"""Worker processes that run queued LLM queries.
+
+    python llm_worker.py --processes 2 --concurrency 8
+
+Each process claims jobs from the SQLite job queue (see job_queue.py) and runs
+up to `--concurrency` of them at once on its event loop. Set
+LLM_EMBEDDED_WORKERS=0 on the API when the queue is served by these workers
+only.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+
+from job_queue import JobQueue
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "8"))
+# Seconds an idle worker waits before polling the queue again
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "0.2"))
+MAINTENANCE_INTERVAL = 30
+
+
+async def _sleep_unless(stop, seconds):
+    try:
+        await asyncio.wait_for(stop.wait(), seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def claim_job(queue, worker):
+    """Claim a job off the event loop; a job claimed after the caller was cancelled goes back to the queue"""
+    claiming = asyncio.ensure_future(asyncio.to_thread(queue.claim, worker))
+    try:
+        return await asyncio.shield(claiming)
+    except asyncio.CancelledError:
+        # The claim's thread cannot be interrupted; wait for it so its job is not left running
+        job = await claiming
+        if job is not None:
+            await asyncio.to_thread(queue.release, job["job_id"])
+        raise
+
+
+async def run_job(queue, process, job, retryable=()):
+    """Run one claimed job and record its outcome"""
+    try:
+        if job.get("session_id"):
+            response = await process(job["query"], session_id=job["session_id"])
+        else:
+            response = await process(job["query"])
+    except retryable:
+        # Transient overload: hand the job back to the queue
+        await asyncio.to_thread(queue.release, job["job_id"])
+    except asyncio.CancelledError:
+        await asyncio.to_thread(queue.release, job["job_id"])
+        raise
+    except Exception as e:
+        print(f"Job {job['job_id']} failed: {str(e)}")
+        await asyncio.to_thread(queue.fail, job["job_id"], str(e))
+    else:
+        await asyncio.to_thread(queue.complete, job["job_id"], response)
+
+
+async def run_worker(queue, process, concurrency=WORKER_CONCURRENCY, stop=None, name=None, retryable=()):
+    """Claim and run jobs with up to `concurrency` queries in flight until `stop` is set.
+
+    `process` is an async function from query to response; exceptions listed in
+    `retryable` put the job back in the queue instead of failing it.
+    """
+    stop = stop or asyncio.Event()
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+
+    async def consume(slot):
+        while not stop.is_set():
+            job = await claim_job(queue, f"{name}/{slot}")
+            if job is None:
+                await _sleep_unless(stop, WORKER_POLL_INTERVAL)
+                continue
+            await run_job(queue, process, job, retryable)
+
+    async def maintain():
+        while not stop.is_set():
+            await asyncio.to_thread(queue.requeue_stale)
+            await asyncio.to_thread(queue.purge)
+            await _sleep_unless(stop, MAINTENANCE_INTERVAL)
+
+    tasks = [asyncio.ensure_future(maintain()), *(asyncio.ensure_future(consume(slot)) for slot in range(concurrency))]
+    try:
+        await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        # Cancelling gather cancels every task but returns on the first; wait until each consumer
+        # has handed back the job it holds
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def worker_process(concurrency):
+    """Entry point of one worker process; stops cleanly on SIGTERM/SIGINT"""
+    # This process is an out-of-process worker whatever the API runs, so per-process
+    # stores (session memory) pick their shared backend
+    os.environ["LLM_EMBEDDED_WORKERS"] = "0"
+    from llm_train import aprocess_query, PipelineBusy
+
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop.set)
+        await run_worker(JobQueue(), aprocess_query, concurrency, stop, retryable=(PipelineBusy,))
+
+    asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run LLM query workers")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="queries in flight per process")
+    args = parser.parse_args()
+
+    if args.processes == 1:
+        worker_process(args.concurrency)
+        return
+    processes = [multiprocessing.Process(target=worker_process, args=(args.concurrency,))
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,95 @@
-from fastapi import FastAPI, HTTPException, Body
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Body, Path, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
-import os
+from datetime import datetime
 import uvicorn
-from llm_train import process_query  
+import numpy as np
+from database import open_pool, close_pool
+from outlet_snapshot import outlet_snapshot, load_changes, load_version, SNAPSHOT_MAX_AGE
+from tile_index import MAX_ZOOM, COVERAGE_RADIUS_KM
+from outlet_pages import (available_formats, decode_cursor, encode_cursor, encode_page, negotiate_format,
+                          page_etag, parse_fields, select_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+from llm_train import aprocess_query, get_pipeline, tool_metrics, StageTimeout, PipelineBusy
+import tracing
+from query_router import router_metrics
+from response_cache import response_cache
+from session_memory import session_memory
+from call_cache import call_store
+from job_queue import get_job_queue, QueueFull
+from llm_worker import run_worker
+
+# Queries the API process runs itself; set to 0 when llm_worker.py processes serve the queue
+LLM_EMBEDDED_WORKERS = int(os.getenv("LLM_EMBEDDED_WORKERS", "8"))
+QUEUE_RETRY_AFTER = 5
+JOB_POLL_INTERVAL = 0.1
+# Seconds between attempts of a warm-up step that failed (e.g. the database is still starting)
+WARMUP_RETRY_INTERVAL = float(os.getenv("WARMUP_RETRY_INTERVAL", "5"))
+
+
+class Warmup:
+    """Initializes the resources requests need in the background, for the readiness probe.
+
+    The server accepts connections immediately; each step runs on the
+    threadpool and is retried until it succeeds. Requests that arrive first
+    build whatever they need on first use.
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.status = {name: {"ready": False, "seconds": None, "error": None} for name in steps}
+
+    @property
+    def ready(self):
+        return all(status["ready"] for status in self.status.values())
+
+    async def _run_step(self, name):
+        started = time.monotonic()
+        while True:
+            try:
+                await run_in_threadpool(self.steps[name])
+            except Exception as e:
+                self.status[name]["error"] = str(e).strip()
+                print(f"Warm-up step {name} failed, retrying in {WARMUP_RETRY_INTERVAL}s: {str(e)}")
+                await asyncio.sleep(WARMUP_RETRY_INTERVAL)
+            else:
+                self.status[name].update(ready=True, seconds=round(time.monotonic() - started, 3), error=None)
+                return
 
-app = FastAPI()
+    async def run(self):
+        await asyncio.gather(*(self._run_step(name) for name in self.steps))
+
+warmup = Warmup({"database": open_pool, "outlets": outlet_snapshot.get, "pipeline": get_pipeline})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start warming up the database pool, outlets and LLM pipeline, and the embedded LLM workers"""
+    warming = asyncio.ensure_future(warmup.run())
+    stop = asyncio.Event()
+    workers = None
+    if LLM_EMBEDDED_WORKERS > 0:
+        workers = asyncio.ensure_future(
+            run_worker(get_job_queue(), aprocess_query, LLM_EMBEDDED_WORKERS, stop, retryable=(PipelineBusy,)))
+    yield
+    warming.cancel()
+    stop.set()
+    if workers is not None:
+        # In-flight jobs go back to the queue for the next worker
+        workers.cancel()
+        await asyncio.gather(workers, return_exceptions=True)
+    await run_in_threadpool(close_pool)
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",
@@ -26,15 +107,6 @@ app.add_middleware(
     allow_headers=["*"],  
 )
 
-# Database connection parameters
-DB_PARAMS = {
-    "dbname": os.getenv("POSTGRES_DB", "mcdonalds_ai"),
-    "user": os.getenv("POSTGRES_USER", "postgres"),
-    "password": os.getenv("POSTGRES_PASSWORD", "postgres"),
-    "host": os.getenv("POSTGRES_HOST", "localhost"),
-    "port": os.getenv("POSTGRES_PORT", "5432")
-}
-
 # Pydantic model for outlet data
 class Outlet(BaseModel):
     id: int
@@ -44,52 +116,448 @@ class Outlet(BaseModel):
     latitude: float
     longitude: float
     waze_link: str
+    state: Optional[str] = None
 
     class Config:
         from_attributes = True
-        
 
-def get_db_connection():
-    """Create and return a database connection"""
-    return psycopg2.connect(**DB_PARAMS, cursor_factory=RealDictCursor)
 
 @app.get("/")
 async def root():
     """Root endpoint"""
     return {"message": "Welcome to McDonald's Outlets API"}
 
+@app.get("/healthz")
+async def liveness():
+    """Liveness probe: the process is up and its event loop is responsive"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readiness(response: Response):
+    """Readiness probe: 503 until the database pool, outlet snapshot and LLM pipeline are warm"""
+    if not warmup.ready:
+        response.status_code = 503
+    return {"ready": warmup.ready, "components": warmup.status}
+
+async def get_outlet_snapshot():
+    """Return the in-memory outlet snapshot, reloading it off the event loop when stale"""
+    if outlet_snapshot.is_fresh():
+        return outlet_snapshot.current
+    try:
+        # Run the blocking version check on the threadpool so the event loop stays free
+        return await run_in_threadpool(outlet_snapshot.get)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/outlets", response_model=List[Outlet])
-async def get_all_outlets():
-    """Get all McDonald's outlets"""
+async def get_all_outlets(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    name_prefix: Optional[str] = Query(None, min_length=1),
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lng: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lng: Optional[float] = Query(None, ge=-180, le=180),
+    format: Optional[str] = Query(None, pattern="^(json|msgpack|arrow)$"),
+):
+    """Get all McDonald's outlets, or one page of them with optional projection, filters and encoding"""
+    snapshot = await get_outlet_snapshot()
+    fmt = negotiate_format(format, request.headers.get("accept"))
+    if fmt is None:
+        raise HTTPException(status_code=406, detail=f"Available formats: {', '.join(available_formats())}")
+    if not request.query_params and fmt == "json":
+        return full_outlet_list(request, snapshot)
+
+    bbox = (min_lat, min_lng, max_lat, max_lng)
+    if any(value is not None for value in bbox):
+        if None in bbox:
+            raise HTTPException(status_code=422, detail="Provide all of min_lat, min_lng, max_lat and max_lng")
+        if min_lat > max_lat:
+            raise HTTPException(status_code=422, detail="min_lat must not exceed max_lat")
+    else:
+        bbox = None
     try:
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("SELECT * FROM mcdonalds_ai")
-            outlets = cur.fetchall()
-        return outlets
+        fields = parse_fields(fields)
+        after = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    etag = page_etag(snapshot, f"{request.url.query}|{fmt}")
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={SNAPSHOT_MAX_AGE}", "Vary": "Accept"}
+    if etag in {tag.strip() for tag in request.headers.get("if-none-match", "").split(",")}:
+        return Response(status_code=304, headers=headers)
+
+    def render():
+        indices, next_after = select_page(snapshot, limit or DEFAULT_PAGE_SIZE, after, name_prefix, bbox)
+        return encode_page(snapshot, indices, fields, fmt), next_after
+
+    (body, media_type), next_after = await run_in_threadpool(render)
+    if next_after is not None:
+        next_cursor = encode_cursor(next_after)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return Response(content=body, media_type=media_type, headers=headers)
+
+def full_outlet_list(request, snapshot):
+    """The whole snapshot as pre-encoded JSON, revalidated by ETag"""
+    encoding, body, etag = snapshot.negotiate(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={SNAPSHOT_MAX_AGE}",
+        # The same URL serves a binary page when Accept asks for one
+        "Vary": "Accept, Accept-Encoding",
+    }
+    if snapshot.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+class NearbyOutlet(Outlet):
+    distance_km: Optional[float] = None
+
+class OutletOverlap(BaseModel):
+    outlet_id: int
+    other_outlet_id: int
+    distance_km: float
+
+class OutletChange(BaseModel):
+    version: int
+    op: str
+    name: str
+    changed_at: datetime
+
+class OutletChanges(BaseModel):
+    since: int
+    version: int
+    changes: List[OutletChange]
+
+@app.get("/outlets/changes", response_model=OutletChanges)
+async def get_outlet_changes(since: int = Query(..., ge=0)):
+    """Outlet inserts, updates and deletes after table version `since`, for caches that sync incrementally"""
+    try:
+        version = await run_in_threadpool(load_version)
+        changes, oldest = await run_in_threadpool(load_changes, since)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'conn' in locals():
-            conn.close()
+    # Versions before the oldest feed entry were pruned (or written before the feed existed)
+    if version is None or (since < version and (oldest is None or oldest > since + 1)):
+        raise HTTPException(status_code=410, detail=f"Change feed does not cover version {since}; reload /outlets")
+    return {"since": since, "version": version, "changes": changes}
+
+@app.get("/tiles/{z}/{x}/{y}")
+async def get_tile(request: Request, z: int = Path(..., ge=0, le=MAX_ZOOM), x: int = Path(..., ge=0),
+                   y: int = Path(..., ge=0)):
+    """Outlet clusters (centroid, count, coverage radius) inside one web-mercator XYZ tile"""
+    if x >= 1 << z or y >= 1 << z:
+        raise HTTPException(status_code=404, detail=f"Tile {z}/{x}/{y} does not exist")
+    snapshot = await get_outlet_snapshot()
+    etag = f'"{snapshot.etag.strip(chr(34))}-{z}-{x}-{y}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={SNAPSHOT_MAX_AGE}"}
+    if etag in {tag.strip() for tag in request.headers.get("if-none-match", "").split(",")}:
+        return Response(status_code=304, headers=headers)
+    body = await run_in_threadpool(snapshot.tile_index.render, z, x, y)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def outlets_with_distance(snapshot, indices, distances):
+    """Attach distances to the outlets at the given snapshot indices"""
+    return [dict(snapshot.outlets[i], distance_km=round(float(d), 3)) for i, d in zip(indices, distances)]
+
+@app.get("/outlets/nearby", response_model=List[NearbyOutlet])
+async def get_nearby_outlets(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    k: int = Query(5, ge=1, le=1000),
+    max_km: Optional[float] = Query(None, gt=0),
+):
+    """Get the k outlets nearest to a point"""
+    snapshot = await get_outlet_snapshot()
+    indices, distances = await run_in_threadpool(lambda: snapshot.geo_index.nearest(lat, lng, k, max_km))
+    return outlets_with_distance(snapshot, indices, distances)
+
+@app.get("/outlets/within", response_model=List[NearbyOutlet])
+async def get_outlets_within(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=20000),
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lng: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lng: Optional[float] = Query(None, ge=-180, le=180),
+):
+    """Get outlets within a radius of a point, or inside a bounding box"""
+    snapshot = await get_outlet_snapshot()
+    # The index is built lazily, so touch it off the event loop too
+    index = await run_in_threadpool(lambda: snapshot.geo_index)
+    if None not in (lat, lng, radius_km):
+        indices, distances = await run_in_threadpool(index.within_radius, lat, lng, radius_km)
+        return outlets_with_distance(snapshot, indices, distances)
+    if None not in (min_lat, min_lng, max_lat, max_lng):
+        if min_lat > max_lat:
+            raise HTTPException(status_code=422, detail="min_lat must not exceed max_lat")
+        indices = await run_in_threadpool(index.within_bbox, min_lat, min_lng, max_lat, max_lng)
+        return [snapshot.outlets[i] for i in indices]
+    raise HTTPException(status_code=422, detail="Provide lat, lng and radius_km, or min_lat, min_lng, max_lat and max_lng")
+
+@app.get("/outlets/overlaps", response_model=List[OutletOverlap])
+async def get_outlet_overlaps(radius_km: float = Query(COVERAGE_RADIUS_KM, gt=0, le=100)):
+    """Get every pair of outlets whose radius_km circles overlap"""
+    snapshot = await get_outlet_snapshot()
+    if radius_km == COVERAGE_RADIUS_KM:
+        # The map's radius is served from the precomputed coverage graph
+        graph = await run_in_threadpool(lambda: snapshot.coverage_graph)
+        first, second, distances = graph.ids[graph.first], graph.ids[graph.second], graph.distance
+    else:
+        first, second, distances = await run_in_threadpool(lambda: snapshot.geo_index.overlapping_pairs(radius_km))
+        first, second = snapshot.ids[first], snapshot.ids[second]
+    return [
+        OutletOverlap(outlet_id=int(i), other_outlet_id=int(j), distance_km=round(float(d), 3))
+        for i, j, d in zip(first, second, distances)
+    ]
+
+class CoverageComponent(BaseModel):
+    component: int
+    size: int
+    outlet_ids: List[int]
+
+class CoverageSummary(BaseModel):
+    radius_km: float
+    outlets: int
+    overlapping_pairs: int
+    components: int
+    isolated_outlets: int
+    largest_component: int
+    groups: List[CoverageComponent]
+
+class CoverageNeighbour(BaseModel):
+    outlet_id: int
+    name: str
+    distance_km: float
+
+class OutletCoverage(BaseModel):
+    outlet_id: int
+    overlap_count: int
+    component: int
+    component_size: int
+    overlaps: List[CoverageNeighbour]
+
+@app.get("/outlets/coverage", response_model=CoverageSummary)
+async def get_coverage(limit: int = Query(20, ge=0, le=1000)):
+    """Summary of the 5 km coverage graph and its largest groups of connected outlets"""
+    snapshot = await get_outlet_snapshot()
+    graph = await run_in_threadpool(lambda: snapshot.coverage_graph)
+    groups = [
+        {"component": c, "size": int(graph.component_sizes[c]), "outlet_ids": graph.component_members(c).tolist()}
+        for c in range(min(limit, len(graph.component_sizes))) if graph.component_sizes[c] > 1
+    ]
+    return dict(graph.summary(), groups=groups)
+
+@app.get("/outlets/{outlet_id}/coverage", response_model=OutletCoverage)
+async def get_outlet_coverage(outlet_id: int):
+    """Outlets whose 5 km radius overlaps this outlet's, nearest first, and its coverage group"""
+    snapshot = await get_outlet_snapshot()
+    graph = await run_in_threadpool(lambda: snapshot.coverage_graph)
+    i = graph.position(outlet_id)
+    if i is None:
+        raise HTTPException(status_code=404, detail=f"Outlet {outlet_id} not found")
+    ids, distances = graph.neighbours_of(outlet_id)
+    positions = np.searchsorted(snapshot.ids, ids)
+    component = int(graph.components[i])
+    return {
+        "outlet_id": outlet_id,
+        "overlap_count": int(graph.overlap_counts[i]),
+        "component": component,
+        "component_size": int(graph.component_sizes[component]),
+        "overlaps": [{"outlet_id": int(j), "name": snapshot.outlets[p]["name"], "distance_km": round(float(d), 3)}
+                     for j, p, d in zip(ids, positions, distances)],
+    }
 
 class LLMData(BaseModel):
     llmresponse: str
 
-# Change from list to single string
-memory_db = {"llmresponse": ""}
+class LLMQuery(LLMData):
+    # Client-chosen conversation id: follow-ups in a session reuse its earlier outlets and search results
+    session_id: Optional[str] = Field(None, min_length=1, max_length=128)
+
+class LLMJob(BaseModel):
+    job_id: str
+    query: str
+    status: str                      # "queued", "running", "done" or "error"
+    llmresponse: Optional[str] = None
+    detail: Optional[str] = None
+
+class LLMJobAccepted(BaseModel):
+    job_id: str
+    status: str
+    deduplicated: bool = False
+
+def job_from_row(row):
+    return LLMJob(job_id=row["job_id"], query=row["query"], status=row["status"],
+                  llmresponse=row["response"], detail=row["detail"])
 
 @app.get("/llmresponses", response_model=LLMData)
-def get_llmresponses():
-    return LLMData(llmresponse=memory_db["llmresponse"])
-
-@app.post("/llmresponses")
-def add_llmresponse(llmresponse: LLMData):
-    # Process the query using the LLM chain
-    processed_response = process_query(llmresponse.llmresponse)
-    # Store the processed response in memory_db
-    memory_db["llmresponse"] = processed_response
-    return LLMData(llmresponse=processed_response)
-    
+async def get_llmresponses(session_id: str = Query(..., min_length=1, max_length=128)):
+    """The most recently completed answer of one session; other clients' answers are never returned"""
+    if session_memory is not None:
+        turns = await run_in_threadpool(session_memory.turns, session_id)
+        if turns:
+            return LLMData(llmresponse=turns[-1]["response"])
+    row = await run_in_threadpool(get_job_queue().latest, session_id)
+    return LLMData(llmresponse=row["response"] if row else "")
+
+@app.post("/llmresponses", response_model=LLMJobAccepted, status_code=202)
+async def add_llmresponse(llmresponse: LLMQuery, priority: int = Query(0, ge=-10, le=10)):
+    """Queue a query for the LLM workers and return its job id without waiting for the answer"""
+    try:
+        job_id, status, deduplicated = await run_in_threadpool(
+            get_job_queue().enqueue, llmresponse.llmresponse, priority, llmresponse.session_id)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(QUEUE_RETRY_AFTER)})
+    return LLMJobAccepted(job_id=job_id, status=status, deduplicated=deduplicated)
+
+# Recent streamed queries by job id, so a client that lost its stream can still fetch the answer
+MAX_STREAM_JOBS = 1000
+SSE_KEEPALIVE = 15
+stream_jobs = OrderedDict()
+
+def create_stream_job(query):
+    job = LLMJob(job_id=uuid.uuid4().hex, query=query, status="running")
+    stream_jobs[job.job_id] = job
+    while len(stream_jobs) > MAX_STREAM_JOBS:
+        stream_jobs.popitem(last=False)
+    return job
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/llmresponses/stream")
+async def stream_llmresponse(llmresponse: LLMQuery):
+    """Run a query and stream its progress as server-sent events.
+
+    Events: `job` (the job id), `stage` (stage name and status), `token` (a
+    piece of the final answer, when the compile agent runs), then `done` with
+    the full answer or `error` with a status code and detail.
+    """
+    job = create_stream_job(llmresponse.llmresponse)
+    events = asyncio.Queue()
+
+    async def run():
+        try:
+            response = await aprocess_query(job.query, emit=lambda event, data: events.put_nowait((event, data)),
+                                            session_id=llmresponse.session_id)
+            job.status, job.llmresponse = "done", response
+            events.put_nowait(("done", {"job_id": job.job_id, "llmresponse": response}))
+        except Exception as e:
+            status_code = 504 if isinstance(e, StageTimeout) else 503 if isinstance(e, PipelineBusy) else 500
+            print(f"Streamed query {job.job_id} failed: {str(e)}")
+            job.status, job.detail = "error", str(e)
+            events.put_nowait(("error", {"job_id": job.job_id, "status_code": status_code, "detail": str(e)}))
+
+    async def stream():
+        # The pipeline is cancelled when the client disconnects and this generator is closed
+        task = asyncio.ensure_future(run())
+        try:
+            yield sse_event("job", {"job_id": job.job_id})
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(events.get(), SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse_event(event, data)
+                if event in ("done", "error"):
+                    break
+        finally:
+            if not task.done():
+                task.cancel()
+                job.status, job.detail = "error", "Client disconnected"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/llmresponses/jobs/{job_id}", response_model=LLMJob)
+async def get_llmjob(job_id: str, wait: float = Query(0, ge=0, le=60)):
+    """Status and answer of a queued or streamed query.
+
+    With `wait`, the request is held for up to that many seconds until the
+    job has finished (long polling).
+    """
+    if job_id in stream_jobs:
+        return stream_jobs[job_id]
+    deadline = time.monotonic() + wait
+    while True:
+        row = await run_in_threadpool(get_job_queue().get, job_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if row["status"] in ("done", "error") or time.monotonic() >= deadline:
+            return job_from_row(row)
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+
+@app.get("/llmresponses/queue-metrics")
+async def get_queue_metrics():
+    """Queue depth, age of the oldest waiting job and average wait/run times"""
+    return await run_in_threadpool(get_job_queue().metrics)
+
+@app.get("/llmresponses/router-metrics")
+def get_router_metrics():
+    """Fast-path router counters and hit rate"""
+    return router_metrics()
+
+@app.get("/llmresponses/tool-metrics")
+def get_tool_metrics():
+    """Search agent runs and the tool calls they made, per tool"""
+    return tool_metrics()
+
+@app.get("/llmresponses/cache-metrics")
+def get_cache_metrics():
+    """Response cache hits (exact and semantic), misses, evictions and hit rate"""
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.stats()}
+
+@app.get("/llmresponses/session-metrics")
+def get_session_metrics():
+    """Stored sessions, turns, follow-ups (and how many were answered without the LLM) and evictions"""
+    if session_memory is None:
+        return {"enabled": False}
+    return {"enabled": True, **session_memory.stats()}
+
+@app.delete("/llmresponses/sessions/{session_id}", status_code=204)
+async def forget_session(session_id: str = Path(..., min_length=1, max_length=128)):
+    """Forget a conversation; its next query starts without context"""
+    if session_memory is not None:
+        await run_in_threadpool(session_memory.forget, session_id)
+    return Response(status_code=204)
+
+@app.get("/llmresponses/call-cache-metrics")
+def get_call_cache_metrics():
+    """Hits, misses and stale entries of the memoized web search and LLM calls"""
+    if call_store is None:
+        return {"mode": "off"}
+    return call_store.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition: pipeline span histograms, token and tool counters, cache and queue stats"""
+    sections = [tracing.render_metrics()]
+    sections.append(tracing.render_stats("router_stats", router_metrics(), "Fast-path router counters"))
+    sections.append(tracing.render_stats("tool_usage_stats", tool_metrics(), "Search agent runs and tool calls"))
+    if response_cache is not None:
+        sections.append(tracing.render_stats("response_cache_stats", response_cache.stats(), "Response cache counters"))
+    if session_memory is not None:
+        sections.append(tracing.render_stats("session_stats", session_memory.stats(), "Conversation memory counters"))
+    if call_store is not None:
+        sections.append(tracing.render_stats("call_cache_stats", call_store.stats(), "Memoized search/LLM call counters"))
+    queue = await run_in_threadpool(get_job_queue().metrics)
+    sections.append(tracing.render_stats("job_queue_stats", queue, "LLM job queue depth and timings"))
+    return PlainTextResponse("".join(sections), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/traces")
+def get_traces(limit: int = Query(20, ge=1, le=1000)):
+    """Most recent query traces (spans, token totals), newest first"""
+    return {"enabled": tracing.TRACING_ENABLED, "traces": tracing.recent_traces(limit)}
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
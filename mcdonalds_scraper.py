@@ -2,23 +2,84 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote, urlencode
+from urllib.request import Request, urlopen
+import argparse
 import json
+import re
+import threading
 import time
 import os
 import platform
 import subprocess
 import psycopg2
-from psycopg2.extras import execute_values
 from dotenv import load_dotenv
+from outlet_enrichment import default_sources, enrich_database
+from outlet_snapshot import VERSION_TABLE_SQL
+from outlet_sync import sync_outlets
 
-def setup_driver():
+try:
+    from orjson import loads as json_loads
+except ImportError:  # orjson is optional; it only speeds up parsing
+    json_loads = json.loads
+
+# Store locator per country; more countries plug in here
+LOCATORS = {
+    "my": "https://www.mcdonalds.com.my/locate-us",
+}
+# AJAX endpoint the locator page loads its results from. The URL and form are inferred, not
+# verified against the live site: --mode auto/http only use them with --unverified-store-finder
+STORE_FINDERS = {
+    "my": "https://www.mcdonalds.com.my/storefinder/index.php",
+}
+STORE_FINDER_VERIFIED = {"my": False}
+STORE_FINDER_FORM = {"ajax": "1", "action": "get_nearby_stores", "distance": "10000", "lat": "", "lng": "",
+                     "products": "", "address": "", "issuggestion": "0", "islocateus": "1"}
+HTTP_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; mcdonalds-ai-scraper)",
+                "X-Requested-With": "XMLHttpRequest"}
+DEFAULT_STATES = ["Kuala Lumpur"]
+# The locator also lists neighbouring outlets under some states; keep only addresses naming the state
+ADDRESS_MARKERS = {"Kuala Lumpur": "kuala lumpur"}
+# Other names states go by in addresses
+STATE_ALIASES = {
+    "Kuala Lumpur": ["wp kuala lumpur", "w.p. kuala lumpur"],
+    "Pulau Pinang": ["penang", "p. pinang"],
+    "Penang": ["pulau pinang", "p. pinang"],
+    "Melaka": ["malacca"],
+    "Malacca": ["melaka"],
+    "Johor": ["johore"],
+    "Negeri Sembilan": ["n. sembilan", "n.sembilan", "negri sembilan"],
+    "Terengganu": ["trengganu"],
+    "Putrajaya": ["wp putrajaya"],
+    "Labuan": ["wp labuan"],
+}
+# Latitude and longitude ranges every outlet of a country lies in
+COUNTRY_BOUNDS = {"my": ((0.8, 7.5), (99.5, 119.5))}
+# Store finder replies are only trusted when the stores have coordinates in the country, most of
+# them are in the asked state and the count fits one state
+STORE_FINDER_MIN_STATE_SHARE = 0.5
+STORE_FINDER_MAX_STORES = 300
+
+SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", "4"))
+SCRAPER_RETRIES = int(os.getenv("SCRAPER_RETRIES", "2"))
+# Upper bound (seconds) on loading one state's results, per attempt
+SCRAPER_STATE_TIMEOUT = float(os.getenv("SCRAPER_STATE_TIMEOUT", "60"))
+SCRAPER_HEADLESS = os.getenv("SCRAPER_HEADLESS", "1") == "1"
+RETRY_BACKOFF = 2.0
+
+# Every outlet box in #results carries its details as a JSON-LD script; read them all in one call
+RESULTS_SCRIPTS_JS = "return Array.from(document.querySelectorAll('#results script')).map(s => s.textContent)"
+
+def setup_driver(headless=SCRAPER_HEADLESS):
     """Setup and return a configured Chrome driver"""
     chrome_options = Options()
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
+    if headless:
+        chrome_options.add_argument("--headless=new")
     
     try:
         # For Mac ARM64, use system ChromeDriver
@@ -83,9 +144,14 @@ def setup_database():
                     telephone VARCHAR(50),
                     latitude DECIMAL(10, 8),
                     longitude DECIMAL(11, 8),
-                    waze_link TEXT
+                    waze_link TEXT,
+                    state VARCHAR(100)
                 )
             """)
+            # Tables created before multi-state scraping have no state column
+            cur.execute("ALTER TABLE mcdonalds_ai ADD COLUMN IF NOT EXISTS state VARCHAR(100)")
+            # Version row lets the API know when its outlet snapshot is stale
+            cur.execute(VERSION_TABLE_SQL)
             conn.commit()
         
         return conn
@@ -94,130 +160,452 @@ def setup_database():
         return None
 
 def insert_outlets_to_db(conn, outlets):
-    """Insert outlets data into the database"""
+    """Sync outlets data into the database, writing only what changed"""
     try:
         with conn.cursor() as cur:
-            # Prepare the data for insertion
-            values = [(
-                outlet['name'],
-                outlet['address'],
-                outlet['telephone'],
-                outlet['latitude'],
-                outlet['longitude'],
-                outlet['waze_link']
-            ) for outlet in outlets]
-            
-            # First, delete existing records
-            cur.execute("DELETE FROM mcdonalds_ai")
-            
-            # Then insert all new records
-            execute_values(cur, """
-                INSERT INTO mcdonalds_ai 
-                (name, address, telephone, latitude, longitude, waze_link)
-                VALUES %s
-            """, values)
+            summary = sync_outlets(cur, outlets)
         conn.commit()
-        print("Data successfully inserted into database")
+        print(f"Data successfully synced to database: {summary['inserted']} inserted, "
+              f"{summary['updated']} updated, {summary['deleted']} deleted, {summary['unchanged']} unchanged")
     except Exception as e:
         print(f"Error inserting data into database: {str(e)}")
         conn.rollback()
-
-def scrape_mcdonalds_outlets():
-    """Main function to scrape McDonald's outlets data"""
-    driver = setup_driver()
-    if not driver:
-        return
-    
-    # Setup database connection
-    conn = setup_database()
-    if not conn:
-        print("Failed to setup database connection")
         return
-    
-    wait = WebDriverWait(driver, 10)
+    enrich_outlets_in_db(conn, outlets)
+
+def enrich_outlets_in_db(conn, outlets):
+    """Derive outlet attributes from the names and the scraped facilities; only changed outlets are redone"""
+    try:
+        summary = enrich_database(conn, default_sources(outlets))
+        print(f"Outlet attributes enriched: {summary['processed']} processed, {summary['changed']} changed, "
+              f"{summary['skipped']} unchanged")
+    except Exception as e:
+        print(f"Error enriching outlet attributes: {str(e)}")
+
+#====================================
+# Parsing
+
+def parse_outlet(json_data, state):
+    """Build an outlet record from the JSON-LD of one outlet box"""
+    # Get latitude and longitude
+    latitude = json_data.get("geo", {}).get("latitude", "")
+    longitude = json_data.get("geo", {}).get("longitude", "")
+
+    # Create Waze link
+    waze_link = f"https://www.waze.com/live-map/directions?navigate=yes&to=ll.{latitude}%2C{longitude}"
+
+    outlet = {
+        "name": json_data.get("name", ""),
+        "address": json_data.get("address", ""),
+        "telephone": json_data.get("telephone", ""),
+        "latitude": latitude,
+        "longitude": longitude,
+        "waze_link": waze_link,
+        "state": state
+    }
+    # Facilities and opening hours feed the attribute enrichment (outlet_enrichment.py)
+    facilities = [feature.get("name") if isinstance(feature, dict) else feature
+                  for feature in json_data.get("amenityFeature") or []]
+    if facilities:
+        outlet["facilities"] = [name for name in facilities if name]
+    if json_data.get("openingHours"):
+        outlet["openingHours"] = json_data["openingHours"]
+    return outlet
+
+JSON_LD_PATTERN = re.compile(
+    r"""<script[^>]*type=["']application/ld\+json["'][^>]*>(.*?)</script>""", re.S | re.I)
+STATE_OPTION_PATTERN = re.compile(r"""<option[^>]*value=["']([^"']+)["']""", re.I)
+
+def load_json_ld(texts):
+    """Parse JSON-LD texts into outlet objects, skipping invalid blocks and non-outlet entries"""
+    items = []
+    for text in texts:
+        try:
+            data = json_loads(text)
+        except ValueError as e:
+            print(f"Error processing an outlet: {str(e)}")
+            continue
+        for item in data if isinstance(data, list) else data.get("@graph", [data]):
+            if isinstance(item, dict) and "address" in item and "geo" in item:
+                items.append(item)
+    return items
+
+def extract_json_ld(html):
+    """Every outlet JSON-LD block in a page, found in one regex pass"""
+    return load_json_ld(JSON_LD_PATTERN.findall(html))
+
+def extract_states(html):
+    select = re.search(r"""<select[^>]*id=["']states["'].*?</select>""", html, re.S | re.I)
+    return STATE_OPTION_PATTERN.findall(select.group(0)) if select else []
+
+def http_request(url, data=None, timeout=SCRAPER_STATE_TIMEOUT):
+    """GET (or POST form `data`) and return the body as text"""
+    body = urlencode(data).encode("ascii") if data is not None else None
+    request = Request(url, data=body, headers=HTTP_HEADERS)
+    with urlopen(request, timeout=timeout) as response:
+        return response.read().decode("utf-8")
+
+#====================================
+# Fetchers: return the JSON-LD objects of one state's outlets
+
+class SeleniumFetcher:
+    """Drives a (headless) Chrome through the live store locator; one instance per worker thread"""
+
+    def __init__(self, url=LOCATORS["my"], timeout=SCRAPER_STATE_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self.driver = None
+
+    def _driver(self):
+        if self.driver is None:
+            self.driver = setup_driver()
+            if self.driver is None:
+                raise RuntimeError("Chrome driver could not be started")
+            self.driver.set_page_load_timeout(self.timeout)
+        return self.driver
+
+    def list_states(self):
+        driver = self._driver()
+        driver.get(self.url)
+        dropdown = WebDriverWait(driver, self.timeout).until(EC.presence_of_element_located((By.ID, "states")))
+        return [option.get_attribute("value") for option in Select(dropdown).options if option.get_attribute("value")]
+
+    def fetch_state(self, state):
+        driver = self._driver()
+        wait = WebDriverWait(driver, self.timeout)
+        driver.get(self.url)
+        dropdown = wait.until(EC.element_to_be_clickable((By.ID, "states")))
+        # Results already on the page (from its initial load) must not pass for the selected state's
+        previous = driver.find_elements(By.CSS_SELECTOR, "#results script")
+        Select(dropdown).select_by_value(state)
+        if previous:
+            wait.until(EC.staleness_of(previous[0]))
+        # Wait until the outlet boxes of the selected state have rendered, instead of a fixed sleep
+        return load_json_ld(wait.until(lambda d: d.execute_script(RESULTS_SCRIPTS_JS) or False))
+
+    def reset(self):
+        """Drop the driver after an error; the next fetch starts a fresh one"""
+        self.close()
+
+    def close(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            finally:
+                self.driver = None
+
+def store_facilities(store):
+    """Facility labels of a store finder entry ("cat" ids with names, or plain labels)"""
+    facilities = store.get("cat") or store.get("categories") or store.get("facilities") or []
+    labels = []
+    for item in facilities.values() if isinstance(facilities, dict) else facilities:
+        if isinstance(item, dict):
+            item = item.get("cat_name") or item.get("name")
+        if item:
+            labels.append({"@type": "LocationFeatureSpecification", "name": str(item)})
+    return labels
+
+def store_coordinate(store, short, long):
+    """A store finder entry's latitude or longitude as a float, or None"""
+    try:
+        return float(store.get(short, store.get(long)))
+    except (TypeError, ValueError):
+        return None
+
+def check_store_finder_stores(state, stores, bounds=COUNTRY_BOUNDS["my"]):
+    """Raise ValueError unless a store finder reply plausibly lists `state`'s outlets.
+
+    Every store needs a name, an address and coordinates within `bounds`; the
+    reply may not hold more stores than any state has; and at least
+    STORE_FINDER_MIN_STATE_SHARE of them must be in the state, by their
+    "state" field or an address naming the state or one of its STATE_ALIASES.
+    An empty reply passes; callers treat it as "nothing found".
+    """
+    if len(stores) > STORE_FINDER_MAX_STORES:
+        raise ValueError(f"{len(stores)} stores for {state}, more than one state has")
+    names = {state.lower(), *STATE_ALIASES.get(state, [])}
+    (min_lat, max_lat), (min_lng, max_lng) = bounds
+    in_state = 0
+    for store in stores:
+        if not isinstance(store, dict) or not all(str(store.get(key) or "").strip() for key in ("name", "address")):
+            raise ValueError(f"Store without a name or address for {state}")
+        lat, lng = store_coordinate(store, "lat", "latitude"), store_coordinate(store, "lng", "longitude")
+        if lat is None or lng is None or not (min_lat <= lat <= max_lat and min_lng <= lng <= max_lng):
+            raise ValueError(f"Store {store['name']!r} has no coordinates in the country")
+        address = str(store["address"]).lower()
+        in_state += str(store.get("state") or "").strip().lower() in names or any(name in address for name in names)
+    if stores and in_state < len(stores) * STORE_FINDER_MIN_STATE_SHARE:
+        raise ValueError(f"Only {in_state} of {len(stores)} stores are in {state}")
+
+class StoreFinderFetcher:
+    """Queries the locator's AJAX data endpoint directly, without a browser"""
+
+    def __init__(self, url=LOCATORS["my"], endpoint=STORE_FINDERS["my"], timeout=SCRAPER_STATE_TIMEOUT,
+                 bounds=COUNTRY_BOUNDS["my"]):
+        self.url = url
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.bounds = bounds
+
+    def list_states(self):
+        states = extract_states(http_request(self.url, timeout=self.timeout))
+        if not states:
+            raise ValueError("No state dropdown in the locator page")
+        return states
+
+    def fetch_state(self, state):
+        form = dict(STORE_FINDER_FORM, state=state)
+        data = json_loads(http_request(self.endpoint, form, self.timeout))
+        stores = data.get("stores") if isinstance(data, dict) else data
+        if not isinstance(stores, list):
+            raise ValueError("Unexpected store finder response")
+        check_store_finder_stores(state, stores, self.bounds)
+        # Reshape into the JSON-LD layout the locator page embeds
+        return [{
+            "name": store["name"],
+            "address": store["address"],
+            "telephone": store.get("telephone") or store.get("phone", ""),
+            "geo": {"latitude": store.get("lat", store.get("latitude")),
+                    "longitude": store.get("lng", store.get("longitude"))},
+            "amenityFeature": store_facilities(store),
+        } for store in stores]
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+class HttpFetcher:
+    """Reads pre-rendered locator pages over plain HTTP, e.g. saved fixtures on a local server.
+
+    `base_url` serves `index.html` (with the #states dropdown) and one
+    `<state>.html` page per state.
+    """
+
+    def __init__(self, base_url, timeout=SCRAPER_STATE_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def list_states(self):
+        return extract_states(http_request(f"{self.base_url}/index.html", timeout=self.timeout))
+
+    def fetch_state(self, state):
+        return extract_json_ld(http_request(f"{self.base_url}/{quote(state)}.html", timeout=self.timeout))
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+class FallbackFetcher:
+    """Tries a browserless fetcher first and only starts Chrome when it fails or finds nothing"""
+
+    def __init__(self, primary, make_fallback):
+        self.primary = primary
+        self.make_fallback = make_fallback
+        self.fallback = None
+
+    def _fallback(self):
+        if self.fallback is None:
+            self.fallback = self.make_fallback()
+        return self.fallback
+
+    def list_states(self):
+        try:
+            return self.primary.list_states()
+        except Exception as e:
+            print(f"Listing states over HTTP failed ({str(e)}); falling back to Selenium")
+            return self._fallback().list_states()
+
+    def fetch_state(self, state):
+        try:
+            items = self.primary.fetch_state(state)
+            if items:
+                return items
+            print(f"No outlets for {state} over HTTP; falling back to Selenium")
+        except Exception as e:
+            print(f"HTTP fetch failed for {state} ({str(e)}); falling back to Selenium")
+        return self._fallback().fetch_state(state)
+
+    def reset(self):
+        if self.fallback is not None:
+            self.fallback.reset()
+
+    def close(self):
+        self.primary.close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+def make_fetcher_factory(mode, country="my", timeout=SCRAPER_STATE_TIMEOUT, fixtures=None, unverified=False):
+    """Factory for the fetchers of one extraction mode: selenium, auto, http or pages.
+
+    With `fixtures` (a base URL), every mode reads the fixture server instead of
+    the live site. The store finder modes (auto, http) refuse a live endpoint
+    that is not verified (STORE_FINDER_VERIFIED) unless `unverified` is set.
+    """
+    if mode in ("auto", "http") and not fixtures and not (STORE_FINDER_VERIFIED[country] or unverified):
+        raise ValueError(f"The {country} store finder endpoint is not verified; "
+                         f"use --mode selenium, or --unverified-store-finder to try it")
+    url = f"{fixtures.rstrip('/')}/index.html" if fixtures else LOCATORS[country]
+    endpoint = f"{fixtures.rstrip('/')}/storefinder/index.php" if fixtures else STORE_FINDERS[country]
+    bounds = COUNTRY_BOUNDS[country]
+    factories = {
+        "selenium": lambda: SeleniumFetcher(url, timeout),
+        "http": lambda: StoreFinderFetcher(url, endpoint, timeout, bounds),
+        "auto": lambda: FallbackFetcher(StoreFinderFetcher(url, endpoint, timeout, bounds),
+                                        lambda: SeleniumFetcher(url, timeout)),
+        "pages": lambda: HttpFetcher(fixtures or url.rsplit("/", 1)[0], timeout),
+    }
+    return factories[mode]
+
+#====================================
+# Engine
+
+def scrape_state(fetcher, state, retries=SCRAPER_RETRIES):
+    """Fetch and parse one state's outlets, retrying with exponential backoff"""
+    for attempt in range(retries + 1):
+        try:
+            items = fetcher.fetch_state(state)
+            break
+        except Exception as e:
+            print(f"Error loading {state} (attempt {attempt + 1}/{retries + 1}): {str(e)}")
+            fetcher.reset()
+            if attempt == retries:
+                raise
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
     outlets = []
-    
+    marker = ADDRESS_MARKERS.get(state)
+    for item in items:
+        try:
+            outlet = parse_outlet(item, state)
+            if marker is None or marker in outlet["address"].lower():
+                outlets.append(outlet)
+        except Exception as e:
+            print(f"Error processing an outlet in {state}: {str(e)}")
+    print(f"Found {len(outlets)} outlets in {state}")
+    return outlets
+
+def scrape_states(states, make_fetcher, workers=SCRAPER_WORKERS, retries=SCRAPER_RETRIES):
+    """Scrape states in parallel, one fetcher (browser) per worker thread.
+
+    Returns (outlets, failed_states). Outlets are ordered by state as given and
+    deduplicated by name, since the table keeps names unique.
+    """
+    local = threading.local()
+    fetchers = []
+    fetchers_lock = threading.Lock()
+
+    def run(state):
+        if not hasattr(local, "fetcher"):
+            local.fetcher = make_fetcher()
+            with fetchers_lock:
+                fetchers.append(local.fetcher)
+        return scrape_state(local.fetcher, state, retries)
+
+    by_state, failed = {}, []
     try:
-        # Navigate to the McDonald's location page
-        print("Navigating to McDonald's location page...")
-        driver.get("https://www.mcdonalds.com.my/locate-us")
-        
-        # Wait for the state dropdown to be present
-        print("Waiting for state dropdown...")
-        state_dropdown = wait.until(EC.presence_of_element_located((By.ID, "states")))
-        state_dropdown.click()
-        
-        # Select Kuala Lumpur
-        print("Selecting Kuala Lumpur...")
-        kuala_lumpur_option = wait.until(EC.presence_of_element_located(
-            (By.XPATH, "//select[@id='states']/option[@value='Kuala Lumpur']")))
-        kuala_lumpur_option.click()
-        
-        # Wait for results to load
-        print("Waiting for results to load...")
-        time.sleep(5)
-        
-        # Wait for the results container
-        results_container = wait.until(EC.presence_of_element_located((By.ID, "results")))
-        
-        # Find all outlet boxes
-        print("Finding outlet boxes...")
-        outlet_boxes = results_container.find_elements(By.CSS_SELECTOR, "div[data-v-6bf80f8c].columns")
-        
-        # Process each outlet
-        for box in outlet_boxes:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(states)))) as pool:
+            futures = {pool.submit(run, state): state for state in states}
+            for future in as_completed(futures):
+                state = futures[future]
+                try:
+                    by_state[state] = future.result()
+                except Exception:
+                    failed.append(state)
+    finally:
+        for fetcher in fetchers:
+            fetcher.close()
+
+    outlets, seen = [], set()
+    for state in states:
+        for outlet in by_state.get(state, []):
+            if outlet["name"] not in seen:
+                seen.add(outlet["name"])
+                outlets.append(outlet)
+    return outlets, failed
+
+def scrape_mcdonalds_outlets(states=None, make_fetcher=make_fetcher_factory("selenium"), workers=SCRAPER_WORKERS,
+                             retries=SCRAPER_RETRIES, output="mcdonalds_outlets.json", save_to_db=True):
+    """Main function to scrape McDonald's outlets data.
+
+    `states` is a list of state names, or None/"all" for every state in the dropdown.
+    """
+    # Setup database connection
+    conn = None
+    if save_to_db:
+        conn = setup_database()
+        if not conn:
+            print("Failed to setup database connection")
+            return
+
+    try:
+        if states in (None, "all"):
+            print("Listing states...")
+            fetcher = make_fetcher()
             try:
-                # Extract JSON data from script tag
-                script_tag = box.find_element(By.TAG_NAME, "script")
-                json_data = json.loads(script_tag.get_attribute("textContent"))
-                
-                # Only include outlets in Kuala Lumpur
-                address = json_data.get("address", "").lower()
-                if "kuala lumpur" in address:
-                    # Get latitude and longitude
-                    latitude = json_data.get("geo", {}).get("latitude", "")
-                    longitude = json_data.get("geo", {}).get("longitude", "")
-                    
-                    # Create Waze link
-                    waze_link = f"https://www.waze.com/live-map/directions?navigate=yes&to=ll.{latitude}%2C{longitude}"
-                    
-                    outlet_info = {
-                        "name": json_data.get("name", ""),
-                        "address": json_data.get("address", ""),
-                        "telephone": json_data.get("telephone", ""),
-                        "latitude": latitude,
-                        "longitude": longitude,
-                        "waze_link": waze_link
-                    }
-                    
-                    outlets.append(outlet_info)
-                    print(f"Found outlet: {outlet_info['name']}")
-                
-            except Exception as e:
-                print(f"Error processing an outlet: {str(e)}")
-                continue
-        
+                states = fetcher.list_states()
+            finally:
+                fetcher.close()
+
+        print(f"Scraping {len(states)} states with {workers} workers...")
+        started = time.perf_counter()
+        outlets, failed = scrape_states(states, make_fetcher, workers, retries)
+        elapsed = time.perf_counter() - started
+        print(f"Scraped {len(outlets)} outlets in {elapsed:.1f}s ({len(outlets) / elapsed:.1f} outlets/s)")
+        if failed:
+            # A partial scrape would delete the missing states' outlets from the table
+            print(f"Failed states: {', '.join(failed)}; nothing was saved")
+            return
+
         # Save results to a JSON file
-        print(f"\nSaving {len(outlets)} outlets to mcdonalds_outlets.json...")
-        with open("mcdonalds_outlets.json", "w", encoding="utf-8") as f:
-            json.dump(outlets, f, indent=4, ensure_ascii=False)
-        
-        # Insert data into database
-        print("Inserting data into database...")
-        insert_outlets_to_db(conn, outlets)
-            
-        print(f"\nSuccessfully scraped {len(outlets)} Kuala Lumpur outlets.")
-        print("Data saved to mcdonalds_outlets.json and database")
-        
-    except TimeoutException:
-        print("Timeout waiting for elements to load")
+        print(f"\nSaving {len(outlets)} outlets to {output}...")
+        with open(output, "w", encoding="utf-8") as f:
+            if output.endswith(".jsonl"):
+                # One outlet per line, streamable by outlet_loader.py
+                f.writelines(json.dumps(outlet, ensure_ascii=False) + "\n" for outlet in outlets)
+            else:
+                json.dump(outlets, f, indent=4, ensure_ascii=False)
+
+        if conn:
+            # Insert data into database
+            print("Inserting data into database...")
+            insert_outlets_to_db(conn, outlets)
+
+        print(f"\nSuccessfully scraped {len(outlets)} outlets from {len(states)} states.")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
     finally:
-        # Add a delay before closing to see the results
-        time.sleep(5)
-        driver.quit()
-        conn.close()
+        if conn:
+            conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape McDonald's outlets")
+    parser.add_argument("--states", nargs="+", default=DEFAULT_STATES,
+                        help='state names as listed on the locator, or "all"')
+    parser.add_argument("--country", default="my", choices=sorted(LOCATORS))
+    parser.add_argument("--mode", default="selenium", choices=["selenium", "auto", "http", "pages"],
+                        help="auto: store finder endpoint over HTTP, Selenium for states it cannot serve "
+                             "or answers implausibly; auto and http need --unverified-store-finder on the live site")
+    parser.add_argument("--unverified-store-finder", action="store_true",
+                        help="allow the store finder endpoint, whose URL and form are not verified")
+    parser.add_argument("--workers", type=int, default=SCRAPER_WORKERS, help="parallel fetchers")
+    parser.add_argument("--retries", type=int, default=SCRAPER_RETRIES)
+    parser.add_argument("--timeout", type=float, default=SCRAPER_STATE_TIMEOUT, help="seconds per state attempt")
+    parser.add_argument("--fixtures", help="read a fixture server at this base URL instead of the live site")
+    parser.add_argument("--output", default="mcdonalds_outlets.json", help="a .json array, or .jsonl for one outlet per line")
+    parser.add_argument("--no-db", action="store_true", help="only write the JSON file")
+    args = parser.parse_args()
+
+    try:
+        make_fetcher = make_fetcher_factory(args.mode, args.country, args.timeout, args.fixtures,
+                                            args.unverified_store_finder)
+    except ValueError as e:
+        parser.error(str(e))
+    states = "all" if args.states == ["all"] else args.states
+    scrape_mcdonalds_outlets(states, make_fetcher, args.workers, args.retries, args.output, not args.no_db)
 
 if __name__ == "__main__":
-    scrape_mcdonalds_outlets() 
\ No newline at end of file
+    main()
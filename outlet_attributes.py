@@ -0,0 +1,199 @@
+"""Outlet attributes (24 hours, drive-thru, birthday parties, ...) and the offline sources they come from.
+
+An attribute is yes, no or unknown. Sources are pluggable: each one has a
+`name`, `evidence(outlet)` (a string that changes whenever what the source
+knows about the outlet changes; outlet_enrichment.py hashes it to decide
+what to reprocess) and `attributes(outlet)` (the attributes it can tell,
+as {attribute: bool}). Sources never call the network, so enrichment can
+run as a batch stage after every scrape.
+"""
+import re
+from typing import NamedTuple
+
+import numpy as np
+
+from outlet_names import base_key, outlet_key
+
+# Tri-state codes of Snapshot.attributes arrays
+YES, NO, UNKNOWN = 1, 0, -1
+
+
+class Attribute(NamedTuple):
+    label: str          # how an answer names the attribute
+    has: str            # "<outlet> is open 24 hours"
+    has_not: str
+    question: re.Pattern    # matches a normalized question that asks about it
+    facility: re.Pattern    # matches a facility label or opening-hours text that lists it
+
+
+ATTRIBUTES = {
+    "drive_thru": Attribute(
+        "drive-thru", "has a drive-thru", "does not have a drive-thru",
+        re.compile(r"\b(drive ?thr(u|ough)s?|dt)\b"), re.compile(r"drive[\s-]?thr(u|ough)", re.I)),
+    "open_24h": Attribute(
+        "24-hour opening", "is open 24 hours", "is not open 24 hours",
+        re.compile(r"\b((open(ed)? )?(for )?24 ?(hours?|hrs?|h)( a day)?|(open )?24 7|open all night)\b"),
+        re.compile(r"24\s*(hours?|hrs?|h)\b|24/7|00:00\s*-\s*(24:00|23:59)", re.I)),
+    "birthday_party": Attribute(
+        "birthday parties", "hosts birthday parties", "does not host birthday parties",
+        re.compile(r"\b(birthday( parties| party)?|parties|party)\b"), re.compile(r"birthday|part(y|ies)", re.I)),
+    "mccafe": Attribute(
+        "McCafé", "has a McCafé", "does not have a McCafé",
+        re.compile(r"\bmc ?caf[eé]\b"), re.compile(r"mc\s?caf[eé]", re.I)),
+    "mcdelivery": Attribute(
+        "McDelivery", "offers McDelivery", "does not offer McDelivery",
+        re.compile(r"\b(mc ?delivery|deliver(y|s)?)\b"), re.compile(r"deliver", re.I)),
+    "breakfast": Attribute(
+        "breakfast", "serves breakfast", "does not serve breakfast",
+        re.compile(r"\bbreakfast\b"), re.compile(r"breakfast", re.I)),
+    "wifi": Attribute(
+        "WiFi", "has WiFi", "does not have WiFi",
+        re.compile(r"\bwi ?fi\b"), re.compile(r"wi[\s-]?fi", re.I)),
+}
+
+# Fields of a scraped or supplied record that list facilities; opening hours only tell 24 hours
+FACILITY_FIELDS = ("facilities", "amenityFeature")
+TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+FALSE_VALUES = {"0", "false", "no", "n", "f"}
+
+
+def named_drive_thru(name):
+    """True for names that follow the " DT" drive-thru naming convention"""
+    key = outlet_key(name)
+    return base_key(key) != key
+
+
+def parse_flag(value):
+    """bool for a yes/no value from JSON or CSV, None for blanks and anything else"""
+    if isinstance(value, bool) or value is None:
+        return value
+    text = str(value).strip().lower()
+    return True if text in TRUE_VALUES else False if text in FALSE_VALUES else None
+
+
+def labels(value):
+    """Label texts of a facility or opening-hours field: a string, a list, or JSON-LD feature objects"""
+    found = []
+    for item in value if isinstance(value, list) else [value]:
+        if isinstance(item, dict):
+            item = item.get("name") or item.get("cat_name") or ""
+        found.extend(label.strip() for label in str(item).split(";") if label.strip())
+    return found
+
+
+def attributes_from_record(record):
+    """Attributes a record states, overridden by explicit attribute fields.
+
+    A facility list is taken as complete (unlisted facilities are no); opening
+    hours say whether the outlet is open 24 hours.
+    """
+    attributes = {}
+    listed = [record[field] for field in FACILITY_FIELDS if record.get(field) not in (None, "")]
+    if listed:
+        text = " | ".join(label for value in listed for label in labels(value))
+        attributes = {name: bool(attribute.facility.search(text)) for name, attribute in ATTRIBUTES.items()}
+    if record.get("openingHours"):
+        hours = " | ".join(labels(record["openingHours"]))
+        attributes["open_24h"] = attributes.get("open_24h") or bool(ATTRIBUTES["open_24h"].facility.search(hours))
+    for name in ATTRIBUTES:
+        flag = parse_flag(record.get(name))
+        if flag is not None:
+            attributes[name] = flag
+    return attributes
+
+
+def merge_attributes(results):
+    """Combine the sources' answers: any yes wins, then any no, else unknown (None)"""
+    merged = {}
+    for name in ATTRIBUTES:
+        values = [result[name] for result in results if result.get(name) is not None]
+        merged[name] = True if any(values) else False if values else None
+    return merged
+
+
+def derive_attributes(outlet, sources):
+    """{attribute: True/False/None} for one outlet from every source"""
+    return merge_attributes([source.attributes(outlet) for source in sources])
+
+
+#====================================
+# Sources
+
+class NameSource:
+    """Drive-thru from the outlet name: "McDonald's Pandan Mewah DT" has one"""
+
+    name = "name"
+
+    def evidence(self, outlet):
+        return outlet["name"]
+
+    def attributes(self, outlet):
+        return {"drive_thru": True} if named_drive_thru(outlet["name"]) else {}
+
+
+class FacilitySource:
+    """Attributes from facility records matched to outlets by name.
+
+    Records are scraped outlets (parse_outlet keeps the JSON-LD facilities and
+    opening hours) or any file with a name column and facility or attribute
+    columns, e.g. a CSV of `name,open_24h,birthday_party`.
+    """
+
+    name = "facilities"
+
+    def __init__(self, records):
+        self.known = {}
+        for record in records:
+            attributes = attributes_from_record(record)
+            if record.get("name") and attributes:
+                self.known[outlet_key(record["name"])] = attributes
+
+    def __len__(self):
+        return len(self.known)
+
+    def evidence(self, outlet):
+        attributes = self.known.get(outlet_key(outlet["name"]))
+        return "?" if attributes is None else ",".join(f"{k}={int(v)}" for k, v in sorted(attributes.items()))
+
+    def attributes(self, outlet):
+        return self.known.get(outlet_key(outlet["name"]), {})
+
+
+#====================================
+# Snapshot side
+
+def split_attributes(outlets):
+    """Remove the attribute columns from outlet rows; returns {attribute: int8 array of YES/NO/UNKNOWN}.
+
+    Values are UNKNOWN when the rows have no attribute columns (the table was
+    not enriched yet), except that a " DT" name always means a drive-thru. A
+    name without it says nothing: some drive-thru outlets are not named so.
+    """
+    arrays = {}
+    for name in ATTRIBUTES:
+        if outlets and name in outlets[0]:
+            values = [outlet.pop(name) for outlet in outlets]
+            arrays[name] = np.fromiter((UNKNOWN if v is None else YES if v else NO for v in values),
+                                       dtype=np.int8, count=len(values))
+        else:
+            arrays[name] = np.full(len(outlets), UNKNOWN, dtype=np.int8)
+    named = np.fromiter((named_drive_thru(outlet["name"]) for outlet in outlets), dtype=bool, count=len(outlets))
+    arrays["drive_thru"][named] = YES
+    return arrays
+
+
+def known_labels(snapshot, position):
+    """Labels of the attributes an outlet is known to have, e.g. ["open 24 hours", "birthday parties"]"""
+    return [attribute.label for name, attribute in ATTRIBUTES.items() if snapshot.attributes[name][position] == YES]
+
+
+def asked_attributes(text):
+    """Attributes a normalized question asks about, in vocabulary order"""
+    return [name for name, attribute in ATTRIBUTES.items() if attribute.question.search(text)]
+
+
+def strip_attributes(text):
+    """A normalized question with its attribute phrases removed"""
+    for attribute in ATTRIBUTES.values():
+        text = attribute.question.sub(" ", text)
+    return " ".join(text.split())
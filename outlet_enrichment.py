@@ -0,0 +1,128 @@
+"""Batch enrichment of outlet attributes (24 hours, drive-thru, birthday parties, ...) into mcdonalds_ai.
+
+    python outlet_enrichment.py                                   # from outlet names only
+    python outlet_enrichment.py --facilities mcdonalds_outlets.json
+    python outlet_enrichment.py --facilities facilities.csv --full
+
+Runs after every sync of mcdonalds_scraper.py (with the scraped JSON-LD as
+facility source) or on its own. Attributes are derived from the offline
+sources in outlet_attributes.py and stored in one boolean column per
+attribute (NULL = unknown), with a partial index per attribute for the
+"which outlets have X" filter. The run is incremental: each outlet's
+enrichment input (its row_hash plus what every source knows about it) is
+hashed into attributes_hash, and only outlets whose input changed are
+derived again. A source that knows nothing about an outlet never clears
+what an earlier run stored. If any attribute changed, the table version is
+bumped so API snapshots reload.
+"""
+import argparse
+import hashlib
+import json
+import sys
+import time
+
+from psycopg2.extras import execute_values
+
+from outlet_attributes import ATTRIBUTES, FacilitySource, NameSource, derive_attributes
+from outlet_loader import read_records
+from outlet_sync import SYNC_PAGE_SIZE, bump_version, prepare_sync
+
+SCHEMA = [
+    *(f"ALTER TABLE mcdonalds_ai ADD COLUMN IF NOT EXISTS {name} BOOLEAN" for name in ATTRIBUTES),
+    # Digest of the enrichment input; NULL until an outlet is enriched
+    "ALTER TABLE mcdonalds_ai ADD COLUMN IF NOT EXISTS attributes_hash CHAR(32)",
+    *(f"CREATE INDEX IF NOT EXISTS mcdonalds_ai_{name} ON mcdonalds_ai (id) WHERE {name}" for name in ATTRIBUTES),
+]
+
+UPDATE_SQL = f"""
+    UPDATE mcdonalds_ai t SET {", ".join(f"{name} = v.{name}" for name in ATTRIBUTES)},
+    attributes_hash = v.attributes_hash
+    FROM (VALUES %s) AS v (name, {", ".join(ATTRIBUTES)}, attributes_hash)
+    WHERE t.name = v.name
+"""
+UPDATE_TEMPLATE = f"(%s, {', '.join('%s::boolean' for _ in ATTRIBUTES)}, %s)"
+
+
+def default_sources(records=None):
+    """Outlet names, plus facility records (scraped outlets or a facilities file) when given"""
+    sources = [NameSource()]
+    if records is not None:
+        sources.append(FacilitySource(records))
+    return sources
+
+
+def enrichment_hash(outlet, sources):
+    """Digest of everything an outlet's attributes are derived from"""
+    parts = [outlet.get("row_hash") or ""] + [f"{source.name}={source.evidence(outlet)}" for source in sources]
+    return hashlib.md5("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def enrich_outlets(cur, sources, full=False, page_size=SYNC_PAGE_SIZE):
+    """Derive and store the attributes of outlets whose input changed, on cursor `cur`; the caller commits.
+
+    With `full`, every outlet is derived again. Returns {"version",
+    "processed", "changed", "skipped"}; version is None when no stored
+    attribute changed.
+    """
+    prepare_sync(cur)
+    for statement in SCHEMA:
+        cur.execute(statement)
+    cur.execute(f"SELECT name, row_hash, attributes_hash, {', '.join(ATTRIBUTES)} FROM mcdonalds_ai")
+    columns = [column[0] for column in cur.description]
+    rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+    pending = []
+    for row in rows:
+        digest = enrichment_hash(row, sources)
+        if full or row["attributes_hash"] != digest:
+            pending.append((row, digest))
+
+    updates, changed = [], 0
+    for row, digest in pending:
+        attributes = derive_attributes(row, sources)
+        stored = {name: row[name] for name in ATTRIBUTES}
+        attributes = {name: stored[name] if value is None else value for name, value in attributes.items()}
+        changed += attributes != stored
+        updates.append((row["name"], *attributes.values(), digest))
+    if updates:
+        execute_values(cur, UPDATE_SQL, updates, template=UPDATE_TEMPLATE, page_size=page_size)
+    # Attributes are not part of the outlet rows clients sync, so no change feed entries
+    version = bump_version(cur) if changed else None
+    return {"version": version, "processed": len(pending), "changed": changed, "skipped": len(rows) - len(pending)}
+
+
+def enrich_database(conn, sources, full=False):
+    """Run enrich_outlets in its own transaction and commit"""
+    try:
+        with conn.cursor() as cur:
+            summary = enrich_outlets(cur, sources, full)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Derive outlet attributes into the database")
+    parser.add_argument("--facilities", help="JSON, JSONL or CSV records with a name and facility or "
+                                             "attribute fields, e.g. the scraper's output")
+    parser.add_argument("--full", action="store_true", help="derive every outlet again, not only changed ones")
+    args = parser.parse_args()
+
+    from mcdonalds_scraper import setup_database
+
+    sources = default_sources(read_records(args.facilities) if args.facilities else None)
+    conn = setup_database()
+    if conn is None:
+        sys.exit("Failed to setup database connection")
+    started = time.perf_counter()
+    try:
+        summary = enrich_database(conn, sources, args.full)
+    finally:
+        conn.close()
+    summary["elapsed_s"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
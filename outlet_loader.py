@@ -0,0 +1,189 @@
+"""Bulk-load outlets from JSON, JSONL or CSV files into Postgres without scraping.
+
+    python outlet_loader.py mcdonalds_outlets.json
+    python outlet_loader.py outlets.jsonl.gz --chunk-size 50000 --keep-missing
+    python outlet_loader.py outlets.csv --dry-run
+
+Files are streamed (a JSON array is decoded item by item), so memory stays
+flat for any file size. Each record is validated and normalized, then COPYed
+into a staging table in chunks and merged with the same diff sync the scraper
+uses (outlet_sync.py), all in one transaction.
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import sys
+import time
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # orjson is optional; it only speeds up parsing
+    json_loads = json.loads
+
+from outlet_sync import (STAGING_COLUMNS, STAGING_TABLE_SQL, InvalidOutlet, normalize_outlet, outlet_hash, prepare_sync,
+                         sync_staged)
+
+LOADER_CHUNK_SIZE = int(os.getenv("LOADER_CHUNK_SIZE", "10000"))
+READ_CHUNK_BYTES = 1 << 16
+FORMATS = ("json", "jsonl", "csv")
+MAX_REPORTED_ERRORS = 10
+
+SEPARATORS = re.compile(r"[\s,]*")
+WHITESPACE = re.compile(r"\s*")
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lower().lstrip(".")
+    if extension == "ndjson":
+        return "jsonl"
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot tell the format of {path}; pass --format")
+    return extension
+
+
+def iter_json_array(f, chunk_size=READ_CHUNK_BYTES):
+    """Yield the items of a top-level JSON array while reading `f` in chunks"""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def more():
+        nonlocal buffer, pos, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+    more()
+    pos = WHITESPACE.match(buffer).end()
+    if buffer[pos:pos + 1] != "[":
+        raise ValueError("Expected a JSON array of outlets")
+    pos += 1
+    while True:
+        pos = SEPARATORS.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("Unterminated JSON array")
+            more()
+            continue
+        if buffer[pos] == "]":
+            return
+        try:
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Most likely the item continues in the next chunk
+            if eof:
+                raise
+            more()
+            continue
+        yield item
+
+
+def read_records(path, fmt=None):
+    """Stream raw records (dicts) from a .json, .jsonl or .csv file, optionally gzipped"""
+    fmt = fmt or detect_format(path)
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        if fmt == "json":
+            yield from iter_json_array(f)
+        elif fmt == "jsonl":
+            for line in f:
+                if line.strip():
+                    yield json_loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def iter_chunks(records, chunk_size, stats):
+    """Normalize records into lists of staging rows; invalid ones are counted and skipped"""
+    chunk = []
+    for number, record in enumerate(records, 1):
+        try:
+            outlet = normalize_outlet(record)
+        except InvalidOutlet as e:
+            stats["skipped"] += 1
+            if stats["skipped"] <= MAX_REPORTED_ERRORS:
+                print(f"Skipping record {number}: {str(e)}")
+            continue
+        chunk.append((number,) + tuple(outlet[column] for column in STAGING_COLUMNS[1:-1]) + (outlet_hash(outlet),))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def copy_buffer(rows):
+    """Rows as a CSV buffer for COPY ... FROM STDIN"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    return buffer
+
+
+def load_file(conn, path, fmt=None, chunk_size=LOADER_CHUNK_SIZE, keep_missing=False):
+    """Stream `path` into the outlet table through COPY and commit; returns the sync summary plus counts.
+
+    Without `conn` nothing is written (dry run): records are still read,
+    validated and encoded, which measures the client side.
+    """
+    stats = {"rows": 0, "skipped": 0}
+    started = time.perf_counter()
+    # Empty text columns stay empty strings; only a missing state becomes NULL
+    copy_sql = (f"COPY mcdonalds_ai_load ({', '.join(STAGING_COLUMNS)}) FROM STDIN "
+                "WITH (FORMAT csv, FORCE_NOT_NULL (address, telephone, waze_link))")
+    try:
+        cur = conn.cursor() if conn else None
+        if cur:
+            prepare_sync(cur)
+            cur.execute(STAGING_TABLE_SQL)
+        for chunk in iter_chunks(read_records(path, fmt), chunk_size, stats):
+            buffer = copy_buffer(chunk)
+            if cur:
+                cur.copy_expert(copy_sql, buffer)
+            stats["rows"] += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(f"Loaded {stats['rows']} rows ({stats['rows'] / elapsed:.0f} rows/s)")
+        if cur:
+            stats.update(sync_staged(cur, keep_missing))
+            conn.commit()
+    except Exception:
+        if conn:
+            conn.rollback()
+        raise
+    elapsed = time.perf_counter() - started
+    stats["elapsed_s"] = round(elapsed, 3)
+    stats["rows_per_s"] = round(stats["rows"] / elapsed)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load outlets into the database")
+    parser.add_argument("path", help=".json, .jsonl/.ndjson or .csv file, optionally .gz")
+    parser.add_argument("--format", choices=FORMATS, help="override detection from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=LOADER_CHUNK_SIZE, help="rows per COPY")
+    parser.add_argument("--keep-missing", action="store_true",
+                        help="keep outlets that are not in the file instead of deleting them")
+    parser.add_argument("--dry-run", action="store_true", help="validate and encode only; no database")
+    args = parser.parse_args()
+
+    conn = None
+    if not args.dry_run:
+        from mcdonalds_scraper import setup_database
+
+        conn = setup_database()
+        if conn is None:
+            sys.exit("Failed to setup database connection")
+    try:
+        stats = load_file(conn, args.path, args.format, args.chunk_size, args.keep_missing)
+    finally:
+        if conn:
+            conn.close()
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
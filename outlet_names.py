@@ -0,0 +1,196 @@
+import difflib
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+# Fuzzy thresholds: resolving names the search agent wrote vs. spotting names in free text
+RESOLVE_CUTOFF = 0.8
+TEXT_CUTOFF = 0.88
+
+MCDONALDS_PREFIX = re.compile(r"^(mc\s?donald'?s?|mac\s?donald'?s?|mcd)\s+")
+# "McDonald's" followed by name-like tokens (capitalized words, numbers, DT, parentheses)
+MENTION_PATTERN = re.compile(
+    r"\bMc\s?Donald['’]?s\s+((?:[A-Z0-9(][\w.&'’()/-]*)(?:[ \t]+(?:[A-Z0-9(][\w.&'’()/-]*|of|dan|de))*)")
+
+# Capitalized words the agents write after an outlet name that are not part of it
+TRAILING_WORDS = {"in", "at", "is", "are", "has", "have", "offers", "outlet", "restaurant", "branch",
+                  "kuala", "lumpur", "kl", "malaysia"}
+NAME_STOPWORDS = {"the", "of", "in", "at", "kl", "dt", "jalan", "taman", "mall", "shell", "petronas",
+                  "petron", "bhp", "desa", "bandar", "sri", "kuala", "lumpur", "outlet", "outlets", "sf"}
+
+
+def normalize(text: str):
+    """Lowercase, unify apostrophes and collapse everything that is not a word character"""
+    text = text.lower().replace("’", "'")
+    return " ".join(re.sub(r"[^\w'&]+", " ", text).split())
+
+
+def outlet_key(name: str):
+    """Normalized outlet name without the McDonald's prefix, e.g. "pandan mewah dt" """
+    return MCDONALDS_PREFIX.sub("", normalize(name)).strip()
+
+
+def base_key(key: str):
+    """Outlet key with any trailing drive-thru marker removed"""
+    return key[:-3] if key.endswith(" dt") else key
+
+
+# Characters are counted into this many buckets (by code point) for the fuzzy match bound
+CHAR_BUCKETS = 64
+
+
+def char_counts(keys):
+    """(len(keys), CHAR_BUCKETS) character counts per key"""
+    lengths = np.fromiter((len(key) for key in keys), dtype=np.int64, count=len(keys))
+    codes = np.fromiter((ord(char) % CHAR_BUCKETS for key in keys for char in key), dtype=np.int64,
+                        count=int(lengths.sum()))
+    counts = np.zeros((len(keys), CHAR_BUCKETS), dtype=np.int32)
+    np.add.at(counts, (np.repeat(np.arange(len(keys)), lengths), codes), 1)
+    return counts
+
+
+def trigrams(key: str):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class OutletNameIndex:
+    """Lookup structure resolving free-form outlet names to outlets.
+
+    Exact lookups go through dicts of normalized keys (with and without the
+    DT suffix); misspellings go through a trigram inverted index, using only
+    the rarest trigrams of the query to collect candidates.
+    """
+
+    def __init__(self, outlets):
+        self.outlets = outlets
+        self.exact = defaultdict(list)       # "pandan mewah dt" -> [outlet index]
+        self.by_base = defaultdict(list)     # "pandan mewah" -> [outlet index]
+        self.postings = defaultdict(list)    # trigram -> [key id]
+        self.keys = []                       # key id -> key
+        key_ids = {}
+        for i, outlet in enumerate(outlets):
+            key = outlet_key(outlet["name"])
+            if not key:
+                continue
+            self.exact[key].append(i)
+            self.by_base[base_key(key)].append(i)
+            if key not in key_ids:
+                key_ids[key] = len(self.keys)
+                self.keys.append(key)
+                for gram in trigrams(key):
+                    self.postings[gram].append(key_ids[key])
+        self.key_lengths = np.fromiter((len(key) for key in self.keys), dtype=np.int64, count=len(self.keys))
+        self.key_chars = char_counts(self.keys)
+        self.max_tokens = max((len(key.split()) for key in self.keys), default=0)
+        self.token_frequency = Counter(
+            token for key in self.keys for token in set(base_key(key).split()) if token not in NAME_STOPWORDS)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup_exact(self, name: str):
+        """Outlet indices for an exact name, trying the DT and non-DT variants"""
+        key = outlet_key(name)
+        if key in self.exact:
+            return self.exact[key]
+        return self.by_base.get(base_key(key), [])
+
+    def lookup_fuzzy(self, name: str, cutoff=RESOLVE_CUTOFF):
+        """Outlet indices for the closest key scoring at least `cutoff`, best first"""
+        key = outlet_key(name)
+        query = trigrams(key)
+        if not key or not query:
+            return []
+        # Any key with a trigram Dice score >= cutoff shares one of the rarest trigrams
+        needed = max(1, int(cutoff * len(query) / 2))
+        rarest = sorted(query, key=lambda gram: len(self.postings.get(gram, ())))
+        candidates = {key_id for gram in rarest[:len(query) - needed + 1] for key_id in self.postings.get(gram, ())}
+        candidates = np.fromiter(sorted(candidates), dtype=np.int64, count=len(candidates))
+        # SequenceMatcher.ratio() is 2 * matched / total length, and no more characters can match
+        # than the two keys have in common (its quick_ratio bound; counting by bucket only raises
+        # it). Keys below the cutoff on that bound can never match and skip the exact ratio
+        shared = np.minimum(self.key_chars[candidates], char_counts([key])[0]).sum(axis=1)
+        candidates = candidates[2 * shared >= cutoff * (self.key_lengths[candidates] + len(key))]
+        scored = []
+        # The query is the indexed side (seq2), so it is analysed once rather than per candidate
+        matcher = difflib.SequenceMatcher(None, b=key)
+        for key_id in candidates.tolist():
+            matcher.set_seq1(self.keys[key_id])
+            score = matcher.ratio()
+            if score >= cutoff:
+                scored.append((score, key_id))
+        if not scored:
+            return []
+        best = max(score for score, _ in scored)
+        return [i for score, key_id in scored if score == best for i in self.exact[self.keys[key_id]]]
+
+    def resolve(self, name: str, cutoff=RESOLVE_CUTOFF):
+        """Outlets matching `name` exactly, by DT variant, or fuzzily"""
+        return self.lookup_exact(name) or self.lookup_fuzzy(name, cutoff)
+
+    def find_in_text(self, text: str, cutoff=TEXT_CUTOFF):
+        """Outlets named anywhere in free text; more than one means the match is ambiguous"""
+        tokens = normalize(text).split()
+        windows = [(size, " ".join(tokens[start:start + size]))
+                   for size in range(min(self.max_tokens, len(tokens)), 0, -1)
+                   for start in range(len(tokens) - size + 1)]
+
+        # 1. The longest window that is an outlet name (with or without DT)
+        for size, window in windows:
+            found = self.exact.get(window) or self.by_base.get(window)
+            if found:
+                return [self.outlets[i] for i in found]
+
+        # 2. The longest window that is a near-miss spelling of an outlet name
+        for size, window in windows:
+            if size == 1 and len(window) < 4:
+                continue
+            found = self.lookup_fuzzy(window, cutoff)
+            if found:
+                return [self.outlets[i] for i in found]
+
+        # 3. A word that only one outlet name contains (e.g. "klcc")
+        for token in tokens:
+            if len(token) >= 3 and self.token_frequency.get(token) == 1:
+                for key in self.keys:
+                    if token in base_key(key).split():
+                        return [self.outlets[i] for i in self.exact[key]]
+        return []
+
+
+def extract_outlet_mentions(text: str):
+    """Outlet names written as "McDonald's <Name>" in agent output, in order of appearance"""
+    mentions = []
+    for match in MENTION_PATTERN.finditer(text or ""):
+        name = match.group(1).strip(" .,:;'’")
+        if name and name not in mentions:
+            mentions.append(name)
+    return mentions
+
+
+def resolve_mention(mention: str, index: OutletNameIndex):
+    """Resolve a mention to an outlet, ignoring trailing filler such as "Outlet" or "KL" """
+    tokens = mention.split()
+    while len(tokens) > 1 and tokens[-1].lower() in TRAILING_WORDS:
+        tokens.pop()
+    name = " ".join(tokens)
+    found = index.resolve(name)
+    return index.outlets[found[0]] if found else None
+
+
+def validate_outlet_mentions(text: str, index: OutletNameIndex):
+    """Check every outlet named in `text` against the index.
+
+    Returns validation lines in the format the compile agent expects, or an
+    empty string when the text names no specific outlets.
+    """
+    lines = []
+    for mention in extract_outlet_mentions(text):
+        outlet = resolve_mention(mention, index)
+        if outlet is None:
+            lines.append(f"Is McDonald's {mention} in Kuala Lumpur? No")
+        else:
+            lines.append(f"Is McDonald's {mention} in Kuala Lumpur? Yes, as {outlet['name'].strip()}")
+    return "\n".join(lines)
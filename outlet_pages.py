@@ -0,0 +1,127 @@
+"""Keyset-paginated, projected and filtered views of the outlet snapshot in several encodings.
+
+Pages are ordered by outlet id; the cursor is the last id of the previous
+page, so a page costs the same however deep it is and stays stable when
+outlets are added or removed in between. JSON is always available; msgpack
+and Arrow IPC are served when the `msgpack` / `pyarrow` packages are
+installed. Both binary formats are columnar: {field: [values]}.
+"""
+import base64
+import hashlib
+import json
+from bisect import bisect_left
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; JSON is always available
+    msgpack = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pyarrow is optional too
+    pa = None
+
+OUTLET_FIELDS = ("id", "name", "address", "telephone", "latitude", "longitude", "waze_link", "state")
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+ACCEPTED_TYPES = {**{media_type: fmt for fmt, media_type in MEDIA_TYPES.items()},
+                  "application/x-msgpack": "msgpack"}
+
+
+def available_formats():
+    return [fmt for fmt, module in (("json", json), ("msgpack", msgpack), ("arrow", pa)) if module is not None]
+
+
+def negotiate_format(requested, accept):
+    """Pick the encoding from `format=` or the Accept header; None if the requested one is unavailable"""
+    formats = available_formats()
+    if requested:
+        return requested if requested in formats else None
+    for part in (accept or "").split(","):
+        fmt = ACCEPTED_TYPES.get(part.split(";")[0].strip().lower())
+        if fmt in formats:
+            return fmt
+    return "json"
+
+
+def parse_fields(text):
+    """Validate a comma-separated `fields=` value; empty means every field"""
+    if not text:
+        return OUTLET_FIELDS
+    fields = tuple(dict.fromkeys(field.strip() for field in text.split(",") if field.strip()))
+    unknown = [field for field in fields if field not in OUTLET_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown) or text}; choose from {', '.join(OUTLET_FIELDS)}")
+    return fields
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Last id of the previous page, or None; raises ValueError for a malformed cursor"""
+    if not cursor:
+        return None
+    return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii"))
+
+
+def select_page(snapshot, limit, after=None, name_prefix=None, bbox=None):
+    """Snapshot indices of the next page and the id to continue after (None on the last page).
+
+    Without filters this is two binary searches. `name_prefix` matches
+    case-insensitively through the snapshot's sorted names, and `bbox`
+    (min_lat, min_lng, max_lat, max_lng) goes through the geo index.
+    """
+    ids = snapshot.ids
+    if name_prefix is None and bbox is None:
+        start = int(np.searchsorted(ids, after, side="right")) if after is not None else 0
+        indices = np.arange(start, min(start + limit + 1, len(ids)))
+    else:
+        candidates = None
+        if name_prefix is not None:
+            names, order = snapshot.sorted_names
+            prefix = name_prefix.casefold()
+            low, high = bisect_left(names, prefix), bisect_left(names, prefix + "\U0010ffff")
+            candidates = np.sort(order[low:high])
+        if bbox is not None:
+            inside = snapshot.geo_index.within_bbox(*bbox)
+            candidates = inside if candidates is None else np.intersect1d(candidates, inside, assume_unique=True)
+        if after is not None:
+            candidates = candidates[int(np.searchsorted(ids[candidates], after, side="right")):]
+        indices = candidates[:limit + 1]
+    more = len(indices) > limit
+    indices = indices[:limit]
+    return indices, int(ids[indices[-1]]) if more else None
+
+
+def encode_page(snapshot, indices, fields=OUTLET_FIELDS, fmt="json"):
+    """Encode the outlets at `indices` with only `fields`: (body, media type)"""
+    rows = [snapshot.outlets[i] for i in indices]
+    if fmt == "json":
+        body = json.dumps([{field: row.get(field) for field in fields} for row in rows],
+                          ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    elif fmt == "msgpack":
+        body = msgpack.packb({field: [row.get(field) for row in rows] for field in fields})
+    else:
+        table = pa.table({field: [row.get(field) for row in rows] for field in fields})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        body = sink.getvalue().to_pybytes()
+    return body, MEDIA_TYPES[fmt]
+
+
+def page_etag(snapshot, query):
+    """ETag of one page: the snapshot's digest plus the request's query string and format"""
+    digest = hashlib.sha256(query.encode("utf-8")).hexdigest()[:16]
+    return f'"{snapshot.etag.strip(chr(34))}-{digest}"'
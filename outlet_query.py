@@ -0,0 +1,118 @@
+from typing import Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from outlet_attributes import ATTRIBUTES, NO, UNKNOWN, YES, known_labels
+from outlet_names import base_key, normalize, outlet_key
+from query_router import match_place
+
+# Radius searched around `near` when the agent gives none, and the most rows one call returns
+DEFAULT_NEAR_RADIUS_KM = 10.0
+MAX_RESULTS = 20
+
+
+class OutletQuery(BaseModel):
+    """Arguments of the agents' outlet_query tool; every field is optional and they combine with AND"""
+
+    name: Optional[str] = Field(None, description="Outlet name or part of it, e.g. 'Bukit Bintang'. "
+                                                  "Misspellings are tolerated")
+    near: Optional[str] = Field(None, description="Place, area or outlet to search around, e.g. 'KLCC'. "
+                                                  "Results are sorted nearest first")
+    radius_km: Optional[float] = Field(None, gt=0, le=50, description="Only outlets within this distance of "
+                                                                      f"`near` (default {DEFAULT_NEAR_RADIUS_KM:g})")
+    address_contains: Optional[str] = Field(None, description="Text the address must contain, e.g. 'Cheras'")
+    drive_thru: Optional[bool] = Field(None, description="true for drive-thru (DT) outlets only, "
+                                                         "false to leave them out")
+    open_24h: Optional[bool] = Field(None, description="true for outlets open 24 hours")
+    birthday_party: Optional[bool] = Field(None, description="true for outlets that host birthday parties")
+    mccafe: Optional[bool] = Field(None, description="true for outlets with a McCafé")
+    mcdelivery: Optional[bool] = Field(None, description="true for outlets that offer McDelivery")
+    breakfast: Optional[bool] = Field(None, description="true for outlets that serve breakfast")
+    wifi: Optional[bool] = Field(None, description="true for outlets with WiFi")
+    limit: int = Field(5, ge=1, le=MAX_RESULTS, description="Maximum number of outlets to return")
+
+
+def attribute_filter(snapshot, name, wanted, positions):
+    """Mask of `positions` whose attribute is known to be `wanted`.
+
+    Returns None when no outlet is known to be `wanted` and some are unknown,
+    i.e. the database cannot answer the filter yet.
+    """
+    stored = snapshot.attributes[name]
+    value = YES if wanted else NO
+    if not (stored == value).any() and (stored == UNKNOWN).any():
+        return None
+    return stored[positions] == value
+
+
+def name_matches(snapshot, name):
+    """Positions of outlets whose name contains `name` as whole words, or else resolves to it"""
+    key = base_key(outlet_key(name))
+    if not key:
+        return []
+    index = snapshot.name_index
+    padded = f" {key} "
+    matched = [i for k in index.keys if padded in f" {k} " for i in index.exact[k]]
+    return sorted(matched) or index.resolve(name)
+
+
+def query_outlets(snapshot, query: OutletQuery):
+    """(rows, total, error) for a query: up to `limit` (outlet, distance_km or None, attribute labels) rows
+    and the match count"""
+    outlets = snapshot.outlets
+    distances = None
+    if query.near:
+        place = match_place(query.near, snapshot)
+        if place is None:
+            return [], 0, f"Could not find a place called '{query.near}' near any outlet."
+        _, lat, lng = place
+        positions, distances = snapshot.geo_index.within_radius(lat, lng, query.radius_km or DEFAULT_NEAR_RADIUS_KM)
+    else:
+        positions = np.arange(len(outlets))
+
+    keep = np.ones(len(positions), dtype=bool)
+    if query.name:
+        keep &= np.isin(positions, name_matches(snapshot, query.name))
+    if query.address_contains:
+        text = normalize(query.address_contains)
+        keep &= np.fromiter((text in normalize(outlets[i]["address"]) for i in positions), dtype=bool,
+                            count=len(positions))
+    for name in ATTRIBUTES:
+        wanted = getattr(query, name)
+        if wanted is not None:
+            mask = attribute_filter(snapshot, name, wanted, positions)
+            if mask is None:
+                return [], 0, f"The database has no {ATTRIBUTES[name].label} data yet; use web_search for it."
+            keep &= mask
+    positions = positions[keep]
+    distances = distances[keep] if distances is not None else None
+    rows = [(outlets[i], None if distances is None else float(distances[n]), known_labels(snapshot, i))
+            for n, i in enumerate(positions[:query.limit])]
+    return rows, len(positions), None
+
+
+def format_outlets(rows, total):
+    """Tool observation: one line per outlet with the fields an answer can quote"""
+    if not rows:
+        return "No outlets in the database match this query."
+    lines = [("1 outlet matches" if total == 1 else f"{total} outlets match")
+             + (f", showing the first {len(rows)}:" if total > len(rows) else ":")]
+    for outlet, distance, labels in rows:
+        line = f"- {outlet['name'].strip()} | {outlet['address'].strip()} | tel {outlet['telephone'].strip() or 'n/a'}"
+        if distance is not None:
+            line += f" | {distance:.1f} km away"
+        if labels:
+            line += f" | {', '.join(labels)}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def run_outlet_query(snapshot, **arguments):
+    """Validate tool arguments, run the query and format the observation"""
+    query = OutletQuery(**arguments)
+    if not any((query.name, query.near, query.address_contains,
+                *(getattr(query, name) is not None for name in ATTRIBUTES))):
+        return "Give at least one of name, near, address_contains or an attribute such as drive_thru or open_24h."
+    rows, total, error = query_outlets(snapshot, query)
+    return error or format_outlets(rows, total)
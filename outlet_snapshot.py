@@ -0,0 +1,208 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from decimal import Decimal
+from functools import cached_property
+
+import numpy as np
+from psycopg2 import errors
+
+from database import fetch_all
+from geo_index import GeoIndex
+from outlet_attributes import ATTRIBUTES, split_attributes
+from outlet_names import OutletNameIndex
+from tile_index import TileIndex
+from coverage_graph import CoverageGraph
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Seconds between version checks against the database
+SNAPSHOT_CHECK_INTERVAL = float(os.getenv("SNAPSHOT_CHECK_INTERVAL", "5"))
+# max-age sent to clients; they revalidate with If-None-Match afterwards
+SNAPSHOT_MAX_AGE = int(os.getenv("SNAPSHOT_MAX_AGE", "60"))
+
+VERSION_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS mcdonalds_ai_meta (
+        id INTEGER PRIMARY KEY DEFAULT 1,
+        version BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+BUMP_VERSION_SQL = """
+    INSERT INTO mcdonalds_ai_meta (id, version) VALUES (1, 1)
+    ON CONFLICT (id) DO UPDATE
+    SET version = mcdonalds_ai_meta.version + 1, updated_at = now()
+"""
+
+# Inserts, updates and deletes per table version, written by outlet_sync
+CHANGES_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS mcdonalds_ai_changes (
+        id BIGSERIAL PRIMARY KEY,
+        version BIGINT NOT NULL,
+        op VARCHAR(10) NOT NULL,
+        name VARCHAR(255) NOT NULL,
+        changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+OUTLET_COLUMNS = "id, name, address, telephone, latitude, longitude, waze_link, state"
+# Written by outlet_enrichment.py; kept out of the /outlets body (see Snapshot.attributes)
+ATTRIBUTE_COLUMNS = ", ".join(ATTRIBUTES)
+
+
+def load_outlets():
+    """Read every outlet row, with its attribute columns once the table has been enriched"""
+    try:
+        return fetch_all(f"SELECT {OUTLET_COLUMNS}, {ATTRIBUTE_COLUMNS} FROM mcdonalds_ai ORDER BY id")
+    except errors.UndefinedColumn:
+        return fetch_all(f"SELECT {OUTLET_COLUMNS} FROM mcdonalds_ai ORDER BY id")
+
+
+def load_changes(since):
+    """Changes recorded after table version `since`, oldest first, and the oldest version still in the feed.
+
+    Returns (changes, oldest); oldest is None when the feed is empty.
+    """
+    changes = fetch_all(
+        "SELECT version, op, name, changed_at FROM mcdonalds_ai_changes WHERE version > %s ORDER BY id", (since,))
+    oldest = fetch_all("SELECT MIN(version) AS version FROM mcdonalds_ai_changes")[0]["version"]
+    return changes, oldest
+
+
+def load_version():
+    """Read the table version written by the scraper, or None if it is unavailable"""
+    try:
+        rows = fetch_all("SELECT version FROM mcdonalds_ai_meta WHERE id = 1")
+    except Exception:
+        return None
+    return rows[0]["version"] if rows else 0
+
+
+def _plain(value):
+    return float(value) if isinstance(value, Decimal) else value
+
+
+class Snapshot:
+    """Immutable view of the outlet table with pre-encoded response bodies"""
+
+    def __init__(self, version, outlets, previous=None):
+        self.version = version
+        self.outlets = [{key: _plain(value) for key, value in row.items()} for row in outlets]
+        # {attribute: int8 array of YES/NO/UNKNOWN in outlet order}, for attribute filters and answers
+        self.attributes = split_attributes(self.outlets)
+        self.body = json.dumps(self.outlets, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.variants = {"identity": (self.body, self.etag)}
+        self.variants["gzip"] = (gzip.compress(self.body, compresslevel=9, mtime=0), f'"{digest}-gzip"')
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(self.body), f'"{digest}-br"')
+        self.loaded_at = time.time()
+        # The newest coverage graph built so far, so this version's graph is an update rather than a rebuild
+        self._graph_base = None
+        if previous is not None:
+            self._graph_base = previous.__dict__.get("coverage_graph", previous._graph_base)
+
+    def matches(self, if_none_match):
+        """True if an If-None-Match header value matches any representation of this snapshot"""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or any(etag in tags for _, etag in self.variants.values())
+
+    def negotiate(self, accept_encoding):
+        """Pick the smallest supported encoding the client accepts: (encoding, body, etag)"""
+        accepted = set()
+        for part in (accept_encoding or "").split(","):
+            name, _, params = part.strip().partition(";")
+            if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                continue
+            accepted.add(name.strip().lower())
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and (encoding in accepted or "*" in accepted):
+                body, etag = self.variants[encoding]
+                return encoding, body, etag
+        body, etag = self.variants["identity"]
+        return "identity", body, etag
+
+    @cached_property
+    def geo_index(self):
+        """Spatial index over the outlet coordinates, built on first use"""
+        return GeoIndex.from_outlets(self.outlets)
+
+    @cached_property
+    def ids(self):
+        """Outlet ids in snapshot order (ascending), for keyset pagination"""
+        return np.fromiter((o["id"] for o in self.outlets), dtype=np.int64, count=len(self.outlets))
+
+    @cached_property
+    def sorted_names(self):
+        """(casefolded names in sorted order, snapshot index of each), for name-prefix lookups"""
+        keys = [o["name"].casefold() for o in self.outlets]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        return [keys[i] for i in order], np.asarray(order, dtype=np.int64)
+
+    @cached_property
+    def tile_index(self):
+        """Zoom-level clusters for map tiles; dropped with the snapshot on a re-scrape"""
+        return TileIndex(self.outlets)
+
+    @cached_property
+    def coverage_graph(self):
+        """5 km catchment overlap graph, updated incrementally from the previous snapshot's graph"""
+        base, self._graph_base = self._graph_base, None
+        return base.update(self.outlets) if base is not None else CoverageGraph.build(self.outlets)
+
+    @cached_property
+    def name_index(self):
+        """Exact/DT-variant/trigram index over the outlet names, built on first use"""
+        return OutletNameIndex(self.outlets)
+
+
+class OutletSnapshot:
+    """Process-wide cache of the outlet table, refreshed when the scraper bumps its version"""
+
+    def __init__(self, loader=load_outlets, version_loader=load_version,
+                 check_interval=SNAPSHOT_CHECK_INTERVAL):
+        self.loader = loader
+        self.version_loader = version_loader
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_fresh(self):
+        """True if the current snapshot can be served without touching the database"""
+        return self._snapshot is not None and time.monotonic() - self._checked_at < self.check_interval
+
+    @property
+    def current(self):
+        return self._snapshot
+
+    def get(self):
+        """Return the current snapshot, reloading it if the table version changed"""
+        if self.is_fresh():
+            return self._snapshot
+        with self._lock:
+            if self.is_fresh():
+                return self._snapshot
+            version = self.version_loader()
+            # An unknown version (no meta table yet) always reloads
+            if self._snapshot is None or version is None or version != self._snapshot.version:
+                self._snapshot = Snapshot(version, self.loader(), self._snapshot)
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def invalidate(self):
+        """Force the next `get` to check the version again"""
+        self._checked_at = 0.0
+
+
+outlet_snapshot = OutletSnapshot()
@@ -0,0 +1,240 @@
+"""Diff-based sync of scraped outlets into the mcdonalds_ai table.
+
+Every row stores a hash of its scraped fields. A sync reads only (name, hash)
+pairs, works out which outlets were inserted, updated or deleted, applies just
+those in one transaction and records them in the change feed
+(mcdonalds_ai_changes) under the new table version. Unchanged rows keep their
+ids, and an unchanged scrape does not bump the version at all. Scraped and
+file-loaded records go through the same normalize_outlet, so both paths
+produce the same names and hashes.
+"""
+import hashlib
+import math
+import os
+
+from psycopg2.extras import execute_values
+
+from outlet_snapshot import BUMP_VERSION_SQL, CHANGES_TABLE_SQL
+
+SYNC_PAGE_SIZE = int(os.getenv("OUTLET_SYNC_PAGE_SIZE", "1000"))
+# Change feed rows older than this many versions are pruned
+CHANGE_FEED_VERSIONS = int(os.getenv("CHANGE_FEED_VERSIONS", "100"))
+
+SYNC_COLUMNS = ("name", "address", "telephone", "latitude", "longitude", "waze_link", "state")
+INSERT, UPDATE, DELETE = "insert", "update", "delete"
+
+SCHEMA = [
+    # Rows written before diff sync have no hash and are rewritten once
+    "ALTER TABLE mcdonalds_ai ADD COLUMN IF NOT EXISTS row_hash CHAR(32)",
+    CHANGES_TABLE_SQL,
+    "CREATE INDEX IF NOT EXISTS mcdonalds_ai_changes_version ON mcdonalds_ai_changes (version)",
+]
+
+# Bulk loads COPY into this per-transaction table, then sync_staged merges it in SQL
+STAGING_TABLE_SQL = """
+    CREATE TEMP TABLE mcdonalds_ai_load (
+        seq BIGINT NOT NULL,
+        name VARCHAR(255) NOT NULL,
+        address TEXT,
+        telephone VARCHAR(50),
+        latitude DECIMAL(10, 8),
+        longitude DECIMAL(11, 8),
+        waze_link TEXT,
+        state VARCHAR(100),
+        row_hash CHAR(32) NOT NULL
+    ) ON COMMIT DROP
+"""
+STAGING_COLUMNS = ("seq",) + SYNC_COLUMNS + ("row_hash",)
+
+UPSERT_SQL = f"""
+    INSERT INTO mcdonalds_ai ({", ".join(SYNC_COLUMNS)}, row_hash) VALUES %s
+    ON CONFLICT (name) DO UPDATE SET
+    {", ".join(f"{column} = EXCLUDED.{column}" for column in SYNC_COLUMNS[1:])}, row_hash = EXCLUDED.row_hash
+"""
+
+
+STAGED_UPSERT_SQL = f"""
+    WITH latest AS (
+        SELECT DISTINCT ON (name) * FROM mcdonalds_ai_load ORDER BY name, seq DESC
+    ), upserted AS (
+        INSERT INTO mcdonalds_ai ({", ".join(SYNC_COLUMNS)}, row_hash)
+        SELECT {", ".join(f"l.{column}" for column in SYNC_COLUMNS)}, l.row_hash FROM latest l
+        LEFT JOIN mcdonalds_ai t ON t.name = l.name
+        WHERE t.row_hash IS DISTINCT FROM l.row_hash
+        ON CONFLICT (name) DO UPDATE SET
+        {", ".join(f"{column} = EXCLUDED.{column}" for column in SYNC_COLUMNS[1:])}, row_hash = EXCLUDED.row_hash
+        RETURNING mcdonalds_ai.name, xmax = 0 AS inserted
+    )
+    INSERT INTO mcdonalds_ai_changes (version, op, name)
+    SELECT %s, CASE WHEN inserted THEN 'insert' ELSE 'update' END, name FROM upserted
+"""
+
+STAGED_DELETE_SQL = """
+    WITH deleted AS (
+        DELETE FROM mcdonalds_ai t
+        WHERE NOT EXISTS (SELECT 1 FROM mcdonalds_ai_load l WHERE l.name = t.name)
+        RETURNING t.name
+    )
+    INSERT INTO mcdonalds_ai_changes (version, op, name) SELECT %s, 'delete', name FROM deleted
+"""
+
+
+class InvalidOutlet(ValueError):
+    """Raised for a record that cannot be loaded"""
+
+
+def clean_text(value):
+    """Trim and collapse whitespace; None for missing values"""
+    if value is None:
+        return None
+    return " ".join(str(value).split()) or None
+
+
+def coordinate(value, field, limit):
+    try:
+        number = float(str(value).strip())
+    except (TypeError, ValueError):
+        raise InvalidOutlet(f"{field} {value!r} is not a number")
+    if math.isnan(number) or not -limit <= number <= limit:
+        raise InvalidOutlet(f"{field} {number} is out of range")
+    return round(number, 8)
+
+
+def normalize_outlet(record):
+    """Validate one raw record and return it with the table's columns, or raise InvalidOutlet"""
+    if not isinstance(record, dict):
+        raise InvalidOutlet("record is not an object")
+    # Scraped JSON-LD keeps coordinates under "geo"
+    geo = record.get("geo") or {}
+    name = clean_text(record.get("name"))
+    if not name:
+        raise InvalidOutlet("name is missing")
+    latitude = coordinate(record.get("latitude", geo.get("latitude")), "latitude", 90)
+    longitude = coordinate(record.get("longitude", geo.get("longitude")), "longitude", 180)
+    return {
+        "name": name,
+        "address": clean_text(record.get("address")) or "",
+        "telephone": clean_text(record.get("telephone")) or "",
+        "latitude": latitude,
+        "longitude": longitude,
+        "waze_link": clean_text(record.get("waze_link"))
+        or f"https://www.waze.com/live-map/directions?navigate=yes&to=ll.{latitude}%2C{longitude}",
+        "state": clean_text(record.get("state")),
+    }
+
+
+def outlet_hash(outlet):
+    """Stable digest of an outlet's scraped fields"""
+    record = "\x1f".join("" if outlet.get(column) is None else str(outlet[column]) for column in SYNC_COLUMNS)
+    return hashlib.md5(record.encode("utf-8")).hexdigest()
+
+
+def diff_outlets(stored, outlets):
+    """Compare scraped outlets with the stored {name: row_hash} map.
+
+    Returns (upserts, changes): `upserts` are (outlet, hash) pairs to write and
+    `changes` lists (op, name) for every insert, update and delete. Later
+    duplicates of a name win, like repeated upserts would.
+    """
+    latest = {}
+    for outlet in outlets:
+        latest[outlet["name"]] = outlet
+    upserts, changes = [], []
+    for name, outlet in latest.items():
+        digest = outlet_hash(outlet)
+        if name not in stored:
+            changes.append((INSERT, name))
+        elif stored[name] != digest:
+            changes.append((UPDATE, name))
+        else:
+            continue
+        upserts.append((outlet, digest))
+    changes.extend((DELETE, name) for name in stored if name not in latest)
+    return upserts, changes
+
+
+def normalize_outlets(outlets):
+    """Normalized outlets, skipping (and reporting) records normalize_outlet rejects"""
+    normalized = []
+    for outlet in outlets:
+        try:
+            normalized.append(normalize_outlet(outlet))
+        except InvalidOutlet as e:
+            print(f"Skipping outlet {outlet.get('name') if isinstance(outlet, dict) else outlet!r}: {str(e)}")
+    return normalized
+
+
+def sync_outlets(cur, outlets, page_size=SYNC_PAGE_SIZE):
+    """Bring the table in line with `outlets` on cursor `cur`; the caller commits.
+
+    Outlets are normalized like outlet_loader.py does, so a scrape and a file
+    load of the same data write identical rows. Returns {"version",
+    "inserted", "updated", "deleted", "unchanged"}; version is None when
+    nothing changed.
+    """
+    outlets = normalize_outlets(outlets)
+    prepare_sync(cur)
+    cur.execute("SELECT name, row_hash FROM mcdonalds_ai")
+    stored = {name: row_hash or "" for name, row_hash in cur.fetchall()}
+    upserts, changes = diff_outlets(stored, outlets)
+    counts = {op: 0 for op in (INSERT, UPDATE, DELETE)}
+    for op, _ in changes:
+        counts[op] += 1
+    summary = {"version": None, "inserted": counts[INSERT], "updated": counts[UPDATE],
+               "deleted": counts[DELETE], "unchanged": len(stored) - counts[UPDATE] - counts[DELETE]}
+    if not changes:
+        return summary
+
+    deleted = [name for op, name in changes if op == DELETE]
+    if deleted:
+        cur.execute("DELETE FROM mcdonalds_ai WHERE name = ANY(%s)", (deleted,))
+    if upserts:
+        execute_values(cur, UPSERT_SQL, [
+            tuple(outlet.get(column) for column in SYNC_COLUMNS) + (digest,) for outlet, digest in upserts
+        ], page_size=page_size)
+
+    summary["version"] = bump_version(cur)
+    execute_values(cur, "INSERT INTO mcdonalds_ai_changes (version, op, name) VALUES %s",
+                   [(summary["version"], op, name) for op, name in changes], page_size=page_size)
+    return summary
+
+
+def prepare_sync(cur):
+    """Create the sync columns/tables if needed and lock out concurrent syncs; readers are not blocked"""
+    for statement in SCHEMA:
+        cur.execute(statement)
+    cur.execute("LOCK TABLE mcdonalds_ai IN SHARE ROW EXCLUSIVE MODE")
+
+
+def bump_version(cur):
+    """Bump the table version in the sync's transaction to invalidate API snapshots, and prune the feed"""
+    cur.execute(BUMP_VERSION_SQL + " RETURNING version")
+    version = cur.fetchone()[0]
+    cur.execute("DELETE FROM mcdonalds_ai_changes WHERE version <= %s", (version - CHANGE_FEED_VERSIONS,))
+    return version
+
+
+def sync_staged(cur, keep_missing=False):
+    """Merge the rows COPYed into mcdonalds_ai_load into the table, entirely in SQL.
+
+    Same result and summary as sync_outlets, without holding the outlets in
+    Python. With `keep_missing`, outlets absent from the load are kept.
+    Call prepare_sync before filling the staging table.
+    """
+    cur.execute("ANALYZE mcdonalds_ai_load")
+    cur.execute("SELECT COUNT(*) FROM mcdonalds_ai")
+    stored = cur.fetchone()[0]
+    # The version this sync will get if it changes anything; the table lock keeps it ours
+    cur.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM mcdonalds_ai_meta")
+    version = cur.fetchone()[0]
+    cur.execute(STAGED_UPSERT_SQL, (version,))
+    if not keep_missing:
+        cur.execute(STAGED_DELETE_SQL, (version,))
+    cur.execute("SELECT op, COUNT(*) FROM mcdonalds_ai_changes WHERE version = %s GROUP BY op", (version,))
+    counts = dict(cur.fetchall())
+    summary = {"version": None, "inserted": counts.get(INSERT, 0), "updated": counts.get(UPDATE, 0),
+               "deleted": counts.get(DELETE, 0)}
+    summary["unchanged"] = stored - summary["updated"] - summary["deleted"]
+    if any(counts.values()):
+        summary["version"] = bump_version(cur)
+    return summary
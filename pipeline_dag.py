@@ -0,0 +1,105 @@
+import asyncio
+import inspect
+import time
+
+import tracing
+
+
+class StageTimeout(Exception):
+    """Raised when a pipeline stage exceeds its timeout"""
+
+    def __init__(self, stage, timeout):
+        super().__init__(f"The {stage} stage timed out after {timeout}s")
+        self.stage = stage
+
+
+class PipelineRun:
+    """Runs the stages of one query as a small DAG of asyncio tasks.
+
+    A stage starts as soon as the stages it depends on have finished and
+    receives their results as keyword arguments, so independent stages run
+    concurrently. Every stage is timed; stages that are still pending when
+    the run closes (e.g. speculative work that turned out to be unneeded)
+    are cancelled and reported as such. `listener(stage, status)`, if given,
+    is called whenever a stage starts running or finishes.
+    """
+
+    def __init__(self, listener=None):
+        self.started_at = time.perf_counter()
+        self.tasks = {}
+        self.timings = {}
+        self.listener = listener
+
+    def start(self, name, func, deps=(), timeout=None):
+        """Schedule `func(**dep_results)` once every stage in `deps` has finished.
+
+        `func` may return an awaitable (awaited under `timeout`) or a plain value.
+        """
+        if name in self.tasks:
+            raise ValueError(f"Stage {name!r} already started")
+        missing = [dep for dep in deps if dep not in self.tasks]
+        if missing:
+            raise ValueError(f"Stage {name!r} depends on unknown stages {missing}")
+        self.tasks[name] = asyncio.ensure_future(self._run(name, func, deps, timeout))
+        return self.tasks[name]
+
+    async def _run(self, name, func, deps, timeout):
+        inputs = {dep: await self.tasks[dep] for dep in deps}
+        began = time.perf_counter()
+        self.timings[name] = {"start_ms": self._ms(began), "status": "running"}
+        self._notify(name)
+        try:
+            # LLM and tool calls made by the stage are recorded under its span
+            with tracing.span("stage", name):
+                result = func(**inputs)
+                # Plain functions are allowed for cheap local stages
+                if inspect.isawaitable(result):
+                    try:
+                        result = await (asyncio.wait_for(result, timeout) if timeout else result)
+                    except asyncio.TimeoutError:
+                        raise StageTimeout(name, timeout) from None
+            self.timings[name]["status"] = "done"
+            return result
+        except StageTimeout:
+            self.timings[name]["status"] = "timeout"
+            raise
+        except asyncio.CancelledError:
+            self.timings[name]["status"] = "cancelled"
+            raise
+        except Exception:
+            self.timings[name]["status"] = "error"
+            raise
+        finally:
+            self.timings[name]["duration_ms"] = self._ms(time.perf_counter()) - self.timings[name]["start_ms"]
+            self._notify(name)
+
+    def _notify(self, name):
+        if self.listener is not None:
+            self.listener(name, self.timings[name]["status"])
+
+    async def result(self, name):
+        return await self.tasks[name]
+
+    def cancel(self, name):
+        """Cancel a stage whose result is no longer wanted"""
+        task = self.tasks.get(name)
+        if task is not None and not task.done():
+            task.cancel()
+
+    async def close(self):
+        """Cancel every unfinished stage and wait for the cancellations to settle"""
+        pending = [task for task in self.tasks.values() if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        # Retrieve exceptions of failed stages nobody awaited, so asyncio does not warn about them
+        for task in self.tasks.values():
+            if task.done() and not task.cancelled():
+                task.exception()
+
+    def report(self):
+        """Per-stage start offset, duration and status (ms), plus the end-to-end latency"""
+        return {"total_ms": self._ms(time.perf_counter()), "stages": self.timings}
+
+    def _ms(self, moment):
+        return round((moment - self.started_at) * 1000, 2)
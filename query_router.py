@@ -0,0 +1,240 @@
+import re
+import threading
+from collections import Counter
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from outlet_attributes import ATTRIBUTES, UNKNOWN, YES, asked_attributes, strip_attributes
+from outlet_names import normalize, outlet_key
+
+#====================================
+# Vocabulary
+
+# Any of these makes a query McDonald's-related
+MCDONALDS_PATTERN = re.compile(r"\b(mc\s?donald'?s?|mac\s?donald'?s?|mcd|mekdi|maccas)\b")
+# Generic words that might still be about McDonald's; never reject these locally
+DOMAIN_PATTERN = re.compile(r"\b(outlets?|branch(es)?|restaurants?|stores?|drive[\s-]?thru|dt|fast\s?food|burgers?)\b")
+COMPETITOR_PATTERN = re.compile(
+    r"\b(kfc|burger\s?king|pizza\s?hut|domino'?s|subway|starbucks|texas\s?chicken|a\s?&\s?w|"
+    r"marrybrown|wendy'?s|taco\s?bell|popeyes|tealive|secret\s?recipe|nando'?s|carl'?s\s?jr)\b")
+
+PHONE_PATTERN = re.compile(r"\b(phone|telephone|tel|contact|call)\b")
+ADDRESS_PATTERN = re.compile(r"\b(address|where\s+is|located|location\s+of)\b")
+WAZE_PATTERN = re.compile(r"\b(waze|directions?|navigate)\b")
+NEARBY_PATTERN = re.compile(
+    r"\b(?:near|nearby|close\s+to|around|(?:nearest|closest)(?:\s+(?:mcdonald'?s|mcd|outlets?))?\s+to)"
+    r"\s+(?:the\s+)?([^?.!]+)", re.IGNORECASE)
+# Questions about facilities or opening hours need the search agent
+OPEN_QUESTION_PATTERN = re.compile(
+    r"\b(hours?|open|opening|close|closing|24|birthday|party|parties|breakfast|delivery|wifi|"
+    r"parking|menu|price|halal|playground|promotion|review|best|busy)\b")
+
+NEARBY_COUNT = 5
+# Outlets named in an attribute answer before the rest are counted
+ATTRIBUTE_LISTED = 10
+# Words an attribute question may contain besides attributes, outlet names and context words
+ATTRIBUTE_FILLER_WORDS = {
+    "which", "what", "where", "is", "are", "there", "any", "outlet", "outlets", "branch", "branches", "restaurant",
+    "restaurants", "store", "stores", "have", "has", "with", "a", "an", "the", "that", "do", "does", "can", "i",
+    "it", "they", "them", "those", "these", "allow", "allows", "offer", "offers", "provide", "provides", "serve",
+    "serves", "host", "hosts", "support", "supports", "for", "me", "list", "show", "all", "got", "of", "one",
+    "ones", "and", "or", "open", "available", "regarding", "please", "tell", "give"}
+# Words the detection agent adds when it puts a query in context
+CONTEXT_WORDS = {"mcdonald's", "mcdonalds", "mcdonald", "mcd", "in", "kuala", "lumpur", "kl"}
+
+
+class Route(NamedTuple):
+    kind: str                    # "reject", "answer" or "llm"
+    response: Optional[str] = None
+    reason: str = ""
+
+
+#====================================
+# Outlet name matching
+
+def match_place(text: str, snapshot):
+    """Resolve a place name to (label, lat, lng) from outlet names or addresses"""
+    outlets = snapshot.outlets
+    named = snapshot.name_index.find_in_text(text)
+    if len(named) == 1:
+        return named[0]["name"].strip(), float(named[0]["latitude"]), float(named[0]["longitude"])
+    place = normalize(text)
+    if len(place) < 3:
+        return None
+    pattern = re.compile(rf"(?<![\w']){re.escape(place)}(?![\w'])")
+    in_area = [o for o in outlets if pattern.search(normalize(o["address"]))]
+    if not in_area:
+        return None
+    lat = sum(float(o["latitude"]) for o in in_area) / len(in_area)
+    lng = sum(float(o["longitude"]) for o in in_area) / len(in_area)
+    return text.strip(" ?.!"), lat, lng
+
+
+#====================================
+# Answers
+
+def describe_outlet(outlet, wants_phone, wants_address, wants_waze):
+    name = outlet["name"].strip()
+    parts = []
+    if wants_address:
+        parts.append(f"{name} is located at {outlet['address'].strip()}.")
+    if wants_phone:
+        parts.append(f"The telephone number of {name} is {outlet['telephone'].strip()}.")
+    if wants_waze:
+        parts.append(f"You can get directions to {name} on Waze: {outlet['waze_link']}")
+    return " ".join(parts)
+
+
+def answer_attributes(query, snapshot):
+    """Answer "which outlets are open 24 hours?" or "does <outlet> have a drive-thru?" from the enriched
+    attributes, or None when the question asks for more or an attribute it needs is unknown for any outlet
+    it covers (a list is only complete when every outlet is known)"""
+    text = normalize(query)
+    named = snapshot.name_index.find_in_text(query)
+    # Names are taken out first so the DT of "Pandan Mewah DT" is not read as a drive-thru question
+    for outlet in named:
+        text = text.replace(outlet_key(outlet["name"]), " ")
+    asked = asked_attributes(text)
+    if not asked or set(strip_attributes(text).split()) - CONTEXT_WORDS - ATTRIBUTE_FILLER_WORDS:
+        return None
+
+    if named:
+        positions = np.fromiter((snapshot.name_index.lookup_exact(o["name"])[0] for o in named), dtype=np.int64,
+                                count=len(named))
+        values = {name: snapshot.attributes[name][positions] for name in asked}
+        if any((column == UNKNOWN).any() for column in values.values()):
+            return None
+        sentences = []
+        for n, outlet in enumerate(named):
+            phrases = [ATTRIBUTES[name].has if values[name][n] == YES else ATTRIBUTES[name].has_not
+                       for name in asked]
+            sentences.append(f"{outlet['name'].strip()} {' and '.join(phrases)}.")
+        return " ".join(sentences)
+
+    values = [snapshot.attributes[name] for name in asked]
+    # Outlets without data might still qualify
+    if any((column == UNKNOWN).any() for column in values):
+        return None
+    matched = np.flatnonzero(np.logical_and.reduce([column == YES for column in values]))
+    labels = " and ".join(ATTRIBUTES[name].label for name in asked)
+    if len(matched) == 0:
+        return f"No McDonald's outlet is listed with {labels}."
+    names = [snapshot.outlets[i]["name"].strip() for i in matched[:ATTRIBUTE_LISTED]]
+    if len(matched) > len(names):
+        names.append(f"{len(matched) - len(names)} more")
+    joined = names[0] if len(names) == 1 else ", ".join(names[:-1]) + f" and {names[-1]}"
+    counted = "1 McDonald's outlet is" if len(matched) == 1 else f"{len(matched)} McDonald's outlets are"
+    return f"{counted} listed with {labels}: {joined}."
+
+
+def answer_nearby(place, snapshot):
+    label, lat, lng = place
+    indices, distances = snapshot.geo_index.nearest(lat, lng, k=NEARBY_COUNT)
+    if len(indices) == 0:
+        return None
+    listed = [f"{snapshot.outlets[i]['name'].strip()} ({d:.1f} km)" for i, d in zip(indices, distances)]
+    joined = listed[0] if len(listed) == 1 else ", ".join(listed[:-1]) + f" and {listed[-1]}"
+    return f"The McDonald's outlets nearest to {label} are {joined}."
+
+
+#====================================
+# Speculation helpers
+
+def contextualize(query: str):
+    """Local approximation of the detection agent's rewrite, used to start the search early"""
+    text = query.strip()
+    if not MCDONALDS_PATTERN.search(normalize(text)):
+        text, replaced = re.subn(r"\b(outlets?)\b", r"McDonald's \1", text, count=1, flags=re.IGNORECASE)
+        if not replaced:
+            text = f"McDonald's: {text}"
+    if not re.search(r"\b(kuala\s+lumpur|kl)\b", text, re.IGNORECASE):
+        body, mark = (text[:-1], text[-1]) if text[-1:] in "?.!" else (text, "")
+        text = f"{body} in Kuala Lumpur{mark}"
+    return text
+
+
+def content_words(text: str):
+    return set(normalize(text).split()) - CONTEXT_WORDS
+
+
+def request_key(text: str):
+    """Normalized query without context words, in order; equal keys ask the same question"""
+    return " ".join(word for word in normalize(text).split() if word not in CONTEXT_WORDS)
+
+
+def same_request(first: str, second: str):
+    """True if two queries differ only by the context words the detection agent adds"""
+    return content_words(first) == content_words(second)
+
+
+#====================================
+# Router
+
+_metrics = Counter()
+_metrics_lock = threading.Lock()
+
+
+def _record(route: Route):
+    with _metrics_lock:
+        _metrics["total"] += 1
+        _metrics[route.kind] += 1
+        if route.reason:
+            _metrics[f"{route.kind}:{route.reason}"] += 1
+    return route
+
+
+def router_metrics():
+    """Counts per route plus the share of queries answered without the LLM chain"""
+    with _metrics_lock:
+        stats = dict(_metrics)
+    total = stats.get("total", 0)
+    fast = stats.get("reject", 0) + stats.get("answer", 0)
+    stats["fast_path_hit_rate"] = round(fast / total, 4) if total else 0.0
+    return stats
+
+
+def competitor_question(text: str):
+    """True for a normalized query about a competitor that does not mention McDonald's"""
+    return not MCDONALDS_PATTERN.search(text) and bool(COMPETITOR_PATTERN.search(text))
+
+
+def route_query(query: str, snapshot=None):
+    """Decide whether a query can be rejected or answered locally, or needs the LLM chain.
+
+    `snapshot` is the outlet snapshot (see outlet_snapshot.py); without it only
+    rejections are handled locally.
+    """
+    text = normalize(query)
+    mentions_mcdonalds = bool(MCDONALDS_PATTERN.search(text))
+
+    if competitor_question(text):
+        return _record(Route("reject", reason="competitor"))
+    if not mentions_mcdonalds and not DOMAIN_PATTERN.search(text):
+        return _record(Route("reject", reason="off_topic"))
+    if snapshot is None or not snapshot.outlets:
+        return _record(Route("llm"))
+    answer = answer_attributes(query, snapshot)
+    if answer:
+        return _record(Route("answer", answer, reason="attributes"))
+    if OPEN_QUESTION_PATTERN.search(text):
+        return _record(Route("llm"))
+
+    # Match on the raw query so the place keeps the user's spelling in the answer
+    nearby = NEARBY_PATTERN.search(query)
+    if nearby:
+        place = match_place(nearby.group(1), snapshot)
+        answer = answer_nearby(place, snapshot) if place else None
+        if answer:
+            return _record(Route("answer", answer, reason="nearby"))
+        return _record(Route("llm"))
+
+    wants_phone = bool(PHONE_PATTERN.search(text))
+    wants_address = bool(ADDRESS_PATTERN.search(text))
+    wants_waze = bool(WAZE_PATTERN.search(text))
+    if wants_phone or wants_address or wants_waze:
+        named = snapshot.name_index.find_in_text(query)
+        if len(named) == 1:
+            answer = describe_outlet(named[0], wants_phone, wants_address, wants_waze)
+            return _record(Route("answer", answer, reason="lookup"))
+    return _record(Route("llm"))
@@ -0,0 +1,328 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from outlet_names import normalize
+from query_router import request_key
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")   # memory | sqlite | off
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "response_cache.sqlite3")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+RESPONSE_CACHE_SEMANTIC = os.getenv("RESPONSE_CACHE_SEMANTIC", "off")    # off | hashing | openai
+RESPONSE_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SEMANTIC_THRESHOLD", "0.85"))
+
+
+def cache_key(query: str, data_version: str):
+    """Key on the query without the context words the detection agent adds, plus the outlet data version"""
+    return f"{data_version}:{request_key(query)}"
+
+
+#====================================
+# Backends
+
+def notify_evicted(backend, keys):
+    """Tell the backend's owner which keys expired or were evicted"""
+    if keys and backend.on_evict is not None:
+        backend.on_evict(keys)
+
+
+class InMemoryBackend:
+    """Size-bounded LRU dict with per-entry expiry"""
+
+    shared = False    # private to this process
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()    # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.on_evict = None             # called with the keys dropped by expiry or LRU eviction
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] >= time.time():
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+        notify_evicted(self, [key])
+        return None
+
+    def set(self, key, value, ttl):
+        evicted = []
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+                self.evictions += 1
+        notify_evicted(self, evicted)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """On-disk LRU cache shared by every worker process on the host"""
+
+    shared = True
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, max_entries=RESPONSE_CACHE_MAX_ENTRIES, table="response_cache"):
+        self.max_entries = max_entries
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+        self.evictions = 0
+        self.on_evict = None    # called with the keys this process saw expire or evicted
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] >= now:
+                self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+                return row[0]
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        notify_evicted(self, [key])
+        return None
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        evicted = []
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now))
+            excess = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_entries
+            if excess > 0:
+                evicted = [row[0] for row in self._conn.execute(
+                    f"SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?", (excess,))]
+                self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(k,) for k in evicted])
+                self.evictions += len(evicted)
+        notify_evicted(self, evicted)
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+#====================================
+# Embeddings for the semantic tier
+
+def hashing_embedder(dimensions=512):
+    """Local, dependency-free embedding: hashed word and character-trigram counts"""
+    def embed(texts):
+        vectors = np.zeros((len(texts), dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = normalize(text).split()
+            features = words + [f"{w[i:i + 3]}" for w in words for i in range(max(1, len(w) - 2))]
+            for feature in features:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                vectors[row, int.from_bytes(digest, "little") % dimensions] += 1.0
+        return vectors
+    return embed
+
+
+def openai_embedder(model="text-embedding-3-small"):
+    """Embedding function backed by the OpenAI embeddings API"""
+    from langchain_openai import OpenAIEmbeddings
+    client = OpenAIEmbeddings(model=model)
+    return lambda texts: np.asarray(client.embed_documents(list(texts)), dtype=np.float32)
+
+
+class VectorIndex:
+    """Brute-force cosine-similarity index over unit vectors, one row of a preallocated array per key.
+
+    Holds at most `capacity` vectors (the backend's max_entries); when full, a
+    new key takes the row of the oldest one. Rows of removed keys are reused.
+    """
+
+    def __init__(self, capacity=RESPONSE_CACHE_MAX_ENTRIES):
+        self.capacity = capacity
+        self.rows = OrderedDict()            # key -> row, oldest first
+        self.keys = [None] * capacity        # row -> key, None for a free row
+        self.free = list(range(capacity - 1, -1, -1))
+        self.vectors = None                  # (capacity, dimensions), allocated on the first add
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, key, vector):
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            if self.vectors is None:
+                self.vectors = np.zeros((self.capacity, len(vector)), dtype=np.float32)
+            row = self.rows.pop(key, None)
+            if row is None:
+                if self.free:
+                    row = self.free.pop()
+                else:
+                    _, row = self.rows.popitem(last=False)
+            self.rows[key] = row
+            self.keys[row] = key
+            self.vectors[row] = vector
+
+    def remove(self, keys):
+        with self._lock:
+            for key in keys:
+                row = self.rows.pop(key, None)
+                if row is not None:
+                    self.keys[row] = None
+                    self.vectors[row] = 0.0
+                    self.free.append(row)
+
+    def search(self, vector, prefix, threshold):
+        """[(key, similarity)] of the keys starting with `prefix` at least `threshold` similar, best first"""
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            if not self.rows:
+                return []
+            scores = self.vectors @ vector
+            rows = np.flatnonzero(scores >= threshold)
+            rows = rows[np.argsort(-scores[rows], kind="stable")]
+            return [(self.keys[row], float(scores[row])) for row in rows
+                    if self.keys[row] is not None and self.keys[row].startswith(prefix)]
+
+    def clear(self):
+        with self._lock:
+            self.rows.clear()
+            self.keys = [None] * self.capacity
+            self.free = list(range(self.capacity - 1, -1, -1))
+            self.vectors = None
+
+
+#====================================
+# Cache
+
+class ResponseCache:
+    """Exact (and optionally semantic) cache of final pipeline responses.
+
+    Entries are keyed on the normalized query plus the outlet data version, so
+    a re-scrape makes old entries unreachable. The semantic tier's vectors are
+    bounded by the backend's size and dropped as the backend evicts entries.
+    """
+
+    def __init__(self, backend, ttl=RESPONSE_CACHE_TTL, embed=None, threshold=RESPONSE_CACHE_SEMANTIC_THRESHOLD):
+        self.backend = backend
+        self.ttl = ttl
+        self.embed = embed
+        self.threshold = threshold
+        self.vectors = None
+        if embed:
+            self.vectors = VectorIndex(backend.max_entries)
+            backend.on_evict = self.vectors.remove
+        self.metrics = Counter()
+        self._data_version = None
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.metrics[name] += 1
+
+    def sync_version(self, data_version):
+        """Drop old entries when the outlet data changes.
+
+        A per-process backend is cleared at once. A shared one (SQLite) is left
+        to age old-version keys out: other workers may already have stored
+        entries for the new version.
+        """
+        with self._lock:
+            if self._data_version is not None and data_version != self._data_version:
+                if not self.backend.shared:
+                    self.backend.clear()
+                if self.vectors is not None:
+                    self.vectors.clear()
+                self.metrics["invalidations"] += 1
+            self._data_version = data_version
+
+    def get(self, query, data_version):
+        self.sync_version(data_version)
+        key = cache_key(query, data_version)
+        value = self.backend.get(key)
+        if value is not None:
+            self._count("hits_exact")
+            return json.loads(value)
+        if self.vectors is not None:
+            vector = self.embed([key.split(":", 1)[1]])[0]
+            for similar, _ in self.vectors.search(vector, f"{data_version}:", self.threshold):
+                value = self.backend.get(similar)
+                if value is not None:
+                    self._count("hits_semantic")
+                    return json.loads(value)
+                # Evicted by another process sharing the backend; try the next candidate
+                self.vectors.remove([similar])
+        self._count("misses")
+        return None
+
+    def put(self, query, data_version, response):
+        key = cache_key(query, data_version)
+        self.backend.set(key, json.dumps(response), self.ttl)
+        if self.vectors is not None:
+            self.vectors.add(key, self.embed([key.split(":", 1)[1]])[0])
+        self._count("stores")
+
+    def clear(self):
+        self.backend.clear()
+        if self.vectors is not None:
+            self.vectors.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.metrics)
+        hits = stats.get("hits_exact", 0) + stats.get("hits_semantic", 0)
+        lookups = hits + stats.get("misses", 0)
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        stats["entries"] = len(self.backend)
+        stats["evictions"] = self.backend.evictions
+        return stats
+
+
+def create_response_cache():
+    """Build the cache configured by the RESPONSE_CACHE_* environment variables, or None if disabled"""
+    if RESPONSE_CACHE_BACKEND == "off":
+        return None
+    backend = SQLiteBackend() if RESPONSE_CACHE_BACKEND == "sqlite" else InMemoryBackend()
+    embed = {"hashing": hashing_embedder, "openai": openai_embedder}.get(RESPONSE_CACHE_SEMANTIC)
+    return ResponseCache(backend, embed=embed() if embed else None)
+
+
+response_cache = create_response_cache()
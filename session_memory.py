@@ -0,0 +1,153 @@
+import json
+import os
+import re
+import threading
+from collections import Counter
+from typing import List, NamedTuple, Optional
+
+from outlet_names import extract_outlet_mentions, normalize, resolve_mention
+from query_router import (ADDRESS_PATTERN, OPEN_QUESTION_PATTERN, PHONE_PATTERN, WAZE_PATTERN, competitor_question,
+                          describe_outlet)
+from response_cache import InMemoryBackend, SQLiteBackend
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "auto")     # auto | memory | sqlite | off
+# Queries run in llm_worker.py processes instead of the API, so sessions must be stored where both see them
+OUT_OF_PROCESS_WORKERS = int(os.getenv("LLM_EMBEDDED_WORKERS", "8")) == 0
+SESSION_PATH = os.getenv("SESSION_PATH", "sessions.sqlite3")
+# Seconds a session survives after its last turn, and the most sessions kept (least recently used go first)
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+# Per-session caps: turns kept, outlets remembered per turn and characters of each stored text
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "5"))
+SESSION_MAX_OUTLETS = 10
+SESSION_MAX_TEXT = int(os.getenv("SESSION_MAX_TEXT", "4000"))
+
+# Pronouns and phrases that refer back to something said earlier ("is it open 24 hours?", "which of
+# those ..."); existential "there", "same" and dummy "it" ("is it possible to ...") are not references
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(its|they|them|their|theirs|those|these|this one|that one|which of|what about|how about)\b|"
+    r"\bit\b(?!'?s? (possible|true|necessary|worth|ok|okay|better|cheaper|safe))")
+
+
+class FollowUp(NamedTuple):
+    query: str                       # the question with the outlets it refers to written out
+    outlets: List[str]
+    search: str = ""                 # earlier search results the agent may reuse
+    response: Optional[str] = None   # set when the earlier outlets answer the question directly
+
+
+def _clip(text):
+    text = text or ""
+    return text if len(text) <= SESSION_MAX_TEXT else text[:SESSION_MAX_TEXT] + "..."
+
+
+def named_outlets(text, snapshot):
+    """Database names of the outlets `text` mentions, in order"""
+    names = []
+    for mention in extract_outlet_mentions(text):
+        outlet = resolve_mention(mention, snapshot.name_index)
+        if outlet is not None and outlet["name"].strip() not in names:
+            names.append(outlet["name"].strip())
+    return names[:SESSION_MAX_OUTLETS]
+
+
+def join_names(names):
+    return names[0] if len(names) == 1 else ", ".join(names[:-1]) + f" and {names[-1]}"
+
+
+def resolve_follow_up(query, turns, snapshot):
+    """Put a follow-up question in the context of the session's earlier turns.
+
+    A query is a follow-up when it refers back ("its phone number", "which of
+    those") without naming an outlet itself. Competitor questions are never
+    put in McDonald's context, so the router still rejects them. Telephone,
+    address and Waze questions about the earlier outlets are answered from
+    the snapshot; any other follow-up is rewritten to name them and carries
+    the earlier search results. Returns None for queries that are not
+    follow-ups.
+    """
+    if snapshot is None or not turns:
+        return None
+    text = normalize(query)
+    if not FOLLOW_UP_PATTERN.search(text) or competitor_question(text) or snapshot.name_index.find_in_text(query):
+        return None
+    earlier = next((turn for turn in reversed(turns) if turn.get("outlets")), None)
+    if earlier is None:
+        return None
+    names = earlier["outlets"]
+
+    wants = (bool(PHONE_PATTERN.search(text)), bool(ADDRESS_PATTERN.search(text)), bool(WAZE_PATTERN.search(text)))
+    if any(wants) and not OPEN_QUESTION_PATTERN.search(text):
+        outlets = [snapshot.outlets[found[0]] for found in map(snapshot.name_index.lookup_exact, names) if found]
+        if outlets:
+            response = " ".join(describe_outlet(outlet, *wants) for outlet in outlets)
+            return FollowUp(query, names, earlier.get("search", ""), response)
+
+    text = query.rstrip()
+    body, mark = (text[:-1], text[-1]) if text[-1:] in "?.!" else (text, "")
+    return FollowUp(f"{body}, regarding {join_names(names)}{mark}", names, earlier.get("search", ""))
+
+
+class SessionMemory:
+    """Recent turns of each conversation, bounded per session and in total.
+
+    A turn records the question, the query it was resolved to, the outlets its
+    answer named, the search agent's results and the answer. Sessions are
+    stored as JSON in a response-cache backend, so eviction is LRU with a TTL
+    that restarts on every turn, in-process or in SQLite for every worker on
+    the host.
+    """
+
+    def __init__(self, backend, ttl=SESSION_TTL, max_turns=SESSION_MAX_TURNS):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.metrics = Counter()
+        # Serializes read-modify-write of a session within this process
+        self._lock = threading.Lock()
+
+    def turns(self, session_id):
+        value = self.backend.get(session_id)
+        return json.loads(value)["turns"] if value is not None else []
+
+    def record(self, session_id, turn, snapshot=None):
+        """Append a turn, remembering the outlets its answer (or else its question) named"""
+        turn = {key: _clip(value) for key, value in turn.items()}
+        if snapshot is not None:
+            turn["outlets"] = (named_outlets(turn.get("response"), snapshot)
+                               or named_outlets(turn.get("resolved") or turn["query"], snapshot))
+        with self._lock:
+            turns = (self.turns(session_id) + [turn])[-self.max_turns:]
+            self.backend.set(session_id, json.dumps({"turns": turns}), self.ttl)
+        self.metrics["turns"] += 1
+
+    def forget(self, session_id):
+        self.backend.delete(session_id)
+
+    def stats(self):
+        stats = dict(self.metrics)
+        stats["sessions"] = len(self.backend)
+        stats["evictions"] = self.backend.evictions
+        return stats
+
+
+def create_session_memory(backend=SESSION_BACKEND, out_of_process=OUT_OF_PROCESS_WORKERS):
+    """Build the store configured by the SESSION_* environment variables, or None if disabled.
+
+    auto is SQLite when queries run in llm_worker.py processes and in-process
+    memory otherwise; memory with out-of-process workers is refused, since the
+    API would never see the turns the workers record.
+    """
+    if backend == "off":
+        return None
+    if backend == "auto":
+        backend = "sqlite" if out_of_process else "memory"
+    if backend == "memory" and out_of_process:
+        raise ValueError("SESSION_BACKEND=memory cannot be shared with llm_worker.py processes "
+                         "(LLM_EMBEDDED_WORKERS=0); use sqlite or auto")
+    if backend == "sqlite":
+        return SessionMemory(SQLiteBackend(SESSION_PATH, SESSION_MAX_ENTRIES, table="sessions"))
+    return SessionMemory(InMemoryBackend(SESSION_MAX_ENTRIES))
+
+
+session_memory = create_session_memory()
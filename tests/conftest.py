@@ -0,0 +1,26 @@
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+# Nothing under test talks to the APIs or the database
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("TAVILY_API_KEY", "test")
+os.environ.setdefault("RESPONSE_CACHE_BACKEND", "off")
+
+
+@pytest.fixture(scope="session")
+def outlet_records():
+    """The scraped outlets in mcdonalds_outlets.json, as the scraper wrote them"""
+    with open(os.path.join(ROOT, "mcdonalds_outlets.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def snapshot(outlet_records):
+    from outlet_snapshot import Snapshot
+
+    return Snapshot(1, [dict(outlet, id=i + 1) for i, outlet in enumerate(outlet_records)])
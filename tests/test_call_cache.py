@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+from call_cache import CachedSearch, CallStore
+
+
+class ThreadRecordingStore(CallStore):
+    """Call store that remembers which thread each read and write ran on"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = []
+
+    def get(self, namespace, key, max_age):
+        self.threads.append(threading.get_ident())
+        return super().get(namespace, key, max_age)
+
+    def put(self, namespace, key, value):
+        self.threads.append(threading.get_ident())
+        return super().put(namespace, key, value)
+
+
+class FakeSearch:
+    def __init__(self):
+        self.calls = 0
+
+    async def arun(self, query):
+        self.calls += 1
+        return [{"url": "https://example.com", "content": query}]
+
+
+def test_cached_search_keeps_sqlite_off_the_event_loop(tmp_path):
+    store = ThreadRecordingStore(str(tmp_path / "calls.sqlite3"))
+    tool = FakeSearch()
+    search = CachedSearch(tool, store)
+
+    async def ask_twice():
+        first = await search.arun("McDonald's Bangsar")
+        second = await search.arun("McDonald's Bangsar")
+        return threading.get_ident(), first, second
+
+    loop_thread, first, second = asyncio.run(ask_twice())
+    assert first == second and tool.calls == 1
+    assert len(store.threads) == 3 and loop_thread not in store.threads
@@ -0,0 +1,91 @@
+import random
+
+import numpy as np
+
+from coverage_graph import CoverageGraph
+from geo_index import GeoIndex, haversine_km
+
+
+def scattered_outlets(count, seed=0):
+    rng = random.Random(seed)
+    return [{"id": i + 1, "latitude": 3.1 + rng.uniform(-0.4, 0.4), "longitude": 101.6 + rng.uniform(-0.4, 0.4)}
+            for i in range(count)]
+
+
+def edges(graph):
+    return sorted(zip(graph.ids[graph.first].tolist(), graph.ids[graph.second].tolist()))
+
+
+def assert_same_graph(a, b):
+    assert np.array_equal(a.ids, b.ids)
+    assert edges(a) == edges(b)
+    assert np.array_equal(a.overlap_counts, b.overlap_counts)
+    assert np.array_equal(a.component_sizes, b.component_sizes)
+
+
+def test_update_matches_a_rebuild():
+    outlets = scattered_outlets(500)
+    graph = CoverageGraph.build(outlets)
+    rng = random.Random(1)
+    updated = [dict(outlet) for outlet in outlets if outlet["id"] % 97]          # some removed
+    for outlet in rng.sample(updated, 10):                                         # some moved
+        outlet["latitude"] += rng.uniform(-0.05, 0.05)
+    updated += [dict(outlet, id=1000 + i) for i, outlet in enumerate(scattered_outlets(5, seed=2))]  # some added
+    rng.shuffle(updated)
+    assert_same_graph(graph.update(updated), CoverageGraph.build(updated))
+
+
+def test_within_radius_many_matches_single_queries():
+    rng = random.Random(3)
+    # Include points near a pole and across the antimeridian
+    lat = np.array([rng.uniform(-60, 60) for _ in range(300)] + [88.5, 88.6, 10.0, 10.01])
+    lon = np.array([rng.uniform(-180, 180) for _ in range(300)] + [10.0, -170.0, 179.99, -179.99])
+    index = GeoIndex(lat, lon, cell_deg=1.0)
+    queries = np.arange(0, len(lat), 7).tolist() + [len(lat) - 1, len(lat) - 3]
+    query, near, distances = index.within_radius_many(lat[queries], lon[queries], 500.0)
+    for k, i in enumerate(queries):
+        found = sorted(near[query == k].tolist())
+        brute = np.flatnonzero(haversine_km(lat[i], lon[i], lat, lon) <= 500.0)
+        assert found == sorted(index.within_radius(lat[i], lon[i], 500.0)[0].tolist()) == brute.tolist()
+    assert np.allclose(distances, haversine_km(lat[np.asarray(queries)[query]], lon[np.asarray(queries)[query]],
+                                               lat[near], lon[near]))
+
+
+def test_build_matches_brute_force():
+    outlets = scattered_outlets(300)
+    graph = CoverageGraph.build(outlets, radius_km=2.0)
+    lat, lon = graph.lat, graph.lon
+    close = haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :]) <= 4.0
+    np.fill_diagonal(close, False)
+    first, second = np.nonzero(np.triu(close))
+    assert edges(graph) == sorted(zip(graph.ids[first].tolist(), graph.ids[second].tolist()))
+    assert np.array_equal(graph.overlap_counts, close.sum(axis=1))
+
+    # Components by flood fill over the dense adjacency
+    component = np.full(len(graph), -1)
+    for start in range(len(graph)):
+        if component[start] < 0:
+            stack = [start]
+            while stack:
+                node = stack.pop()
+                if component[node] < 0:
+                    component[node] = start
+                    stack.extend(np.flatnonzero(close[node] & (component < 0)).tolist())
+    expected = sorted(np.unique(component, return_counts=True)[1].tolist(), reverse=True)
+    assert graph.component_sizes.tolist() == expected
+    for c, size in enumerate(graph.component_sizes):
+        members = np.flatnonzero(graph.components == c)
+        assert len(members) == size and len(set(component[members].tolist())) == 1
+
+    outlet_id = int(graph.ids[np.argmax(graph.overlap_counts)])
+    ids, distances = graph.neighbours_of(outlet_id)
+    i = graph.position(outlet_id)
+    assert sorted(ids.tolist()) == graph.ids[close[i]].tolist()
+    assert np.all(np.diff(distances) >= 0)
+
+
+def test_update_falls_back_to_a_rebuild():
+    outlets = scattered_outlets(200)
+    assert_same_graph(CoverageGraph.build([]).update(outlets), CoverageGraph.build(outlets))
+    moved = [dict(outlet, latitude=outlet["latitude"] + 0.01) for outlet in outlets]
+    assert_same_graph(CoverageGraph.build(outlets).update(moved), CoverageGraph.build(moved))
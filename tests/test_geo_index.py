@@ -0,0 +1,56 @@
+import random
+
+import numpy as np
+import pytest
+
+from geo_index import GeoIndex, haversine_km
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = random.Random(0)
+    # Dense around Kuala Lumpur, plus points near a pole and on both sides of the antimeridian
+    lat = [3.1 + rng.uniform(-0.5, 0.5) for _ in range(400)] + [rng.uniform(-89, 89) for _ in range(100)]
+    lon = [101.7 + rng.uniform(-0.5, 0.5) for _ in range(400)] + [rng.uniform(-180, 180) for _ in range(100)]
+    lat += [89.9, 89.8, -10.0, -10.0]
+    lon += [0.0, 179.0, 179.99, -179.99]
+    return np.array(lat), np.array(lon)
+
+
+@pytest.mark.parametrize("radius_km", [0.5, 5.0, 60.0, 2000.0])
+def test_within_radius_matches_brute_force(points, radius_km):
+    lat, lon = points
+    index = GeoIndex(lat, lon)
+    for i in range(0, len(lat), 17):
+        found, distances = index.within_radius(lat[i], lon[i], radius_km)
+        brute = haversine_km(lat[i], lon[i], lat, lon)
+        assert sorted(found.tolist()) == np.flatnonzero(brute <= radius_km).tolist()
+        assert np.all(np.diff(distances) >= 0)
+        assert np.allclose(distances, brute[found])
+
+
+def test_nearest_matches_brute_force(points):
+    lat, lon = points
+    index = GeoIndex(lat, lon)
+    for i in (0, 123, 450, len(lat) - 1):
+        found, distances = index.nearest(lat[i], lon[i], k=7)
+        brute = np.sort(haversine_km(lat[i], lon[i], lat, lon))[:7]
+        assert np.allclose(distances, brute)
+
+
+def test_within_bbox_wraps_the_antimeridian(points):
+    lat, lon = points
+    index = GeoIndex(lat, lon)
+    inside = index.within_bbox(-11.0, 179.0, -9.0, -179.0)
+    assert set(inside.tolist()) == set(np.flatnonzero((lat >= -11) & (lat <= -9) & ((lon >= 179) | (lon <= -179))))
+    box = index.within_bbox(3.0, 101.6, 3.2, 101.8)
+    assert box.tolist() == np.flatnonzero((lat >= 3.0) & (lat <= 3.2) & (lon >= 101.6) & (lon <= 101.8)).tolist()
+
+
+def test_overlapping_pairs_match_brute_force(points):
+    lat, lon = points
+    first, second, distances = GeoIndex(lat, lon).overlapping_pairs(5.0)
+    brute = haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+    expected = {(i, j) for i, j in zip(*np.nonzero(brute <= 10.0)) if i < j}
+    assert set(zip(first.tolist(), second.tolist())) == expected
+    assert np.allclose(distances, brute[first, second])
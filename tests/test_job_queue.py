@@ -0,0 +1,104 @@
+import pytest
+
+from job_queue import DONE, ERROR, QUEUED, RUNNING, JobQueue, QueueFull
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), max_depth=3)
+
+
+def test_identical_queries_share_a_job_within_a_session(queue):
+    job_id, status, deduplicated = queue.enqueue("Which outlets are open 24 hours?")
+    assert (status, deduplicated) == (QUEUED, False)
+    assert queue.enqueue("which outlets are open 24 hours") == (job_id, QUEUED, True)
+
+    first, _, _ = queue.enqueue("Which outlets are open 24 hours?", session_id="a")
+    second, _, _ = queue.enqueue("Which outlets are open 24 hours?", session_id="b")
+    assert len({job_id, first, second}) == 3
+
+
+def test_duplicate_raises_the_priority_of_the_waiting_job(queue):
+    low, _, _ = queue.enqueue("Outlets in Cheras")
+    high, _, _ = queue.enqueue("Outlets in Bangsar", priority=1)
+    queue.enqueue("Outlets in Cheras", priority=5)
+    assert [queue.claim("w")["job_id"] for _ in range(2)] == [low, high]
+
+
+def test_claim_takes_the_highest_priority_then_the_oldest_job(queue):
+    first, _, _ = queue.enqueue("Outlets in Cheras")
+    second, _, _ = queue.enqueue("Outlets in Bangsar")
+    urgent, _, _ = queue.enqueue("Outlets in Ampang", priority=2)
+    claimed = [queue.claim("w")["job_id"] for _ in range(3)]
+    assert claimed == [urgent, first, second]
+    assert queue.claim("w") is None
+    assert queue.get(urgent)["status"] == RUNNING
+    assert queue.get(urgent)["worker"] == "w"
+
+
+def test_running_job_is_deduplicated_until_it_finishes(queue):
+    job_id, _, _ = queue.enqueue("Outlets in Cheras")
+    queue.claim("w")
+    assert queue.enqueue("Outlets in Cheras") == (job_id, RUNNING, True)
+    queue.complete(job_id, "Two outlets")
+    again, status, deduplicated = queue.enqueue("Outlets in Cheras")
+    assert again != job_id and (status, deduplicated) == (QUEUED, False)
+
+
+def test_expired_job_is_claimed_again(queue):
+    job_id, _, _ = queue.enqueue("Outlets in Cheras")
+    queue.claim("dead")
+    # Still within the visibility timeout, so nothing is handed out twice
+    assert queue.requeue_stale(timeout=60) == 0
+    assert queue.claim("other") is None
+
+    assert queue.requeue_stale(timeout=0) == 1
+    job = queue.claim("other")
+    assert job["job_id"] == job_id
+    assert queue.get(job_id)["worker"] == "other"
+    assert queue.get(job_id)["attempts"] == 2
+
+
+def test_job_fails_after_the_last_attempt(queue):
+    job_id, _, _ = queue.enqueue("Outlets in Cheras")
+    for _ in range(2):
+        queue.claim("dead")
+        queue.requeue_stale(timeout=0, max_attempts=2)
+    job = queue.get(job_id)
+    assert job["status"] == ERROR
+    assert job["attempts"] == 2
+    assert job["detail"] == "Worker did not finish the job"
+    assert queue.claim("other") is None
+
+
+def test_release_returns_the_job_without_counting_the_attempt(queue):
+    job_id, _, _ = queue.enqueue("Outlets in Cheras")
+    queue.claim("stopping")
+    queue.release(job_id)
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"], job["worker"]) == (QUEUED, 0, None)
+    assert queue.claim("next")["job_id"] == job_id
+
+
+def test_full_queue_rejects_new_jobs_but_not_duplicates(queue):
+    job_ids = [queue.enqueue(f"Outlets in area {n}")[0] for n in range(3)]
+    with pytest.raises(QueueFull):
+        queue.enqueue("Outlets in Cheras")
+    assert queue.enqueue("Outlets in area 0")[0] == job_ids[0]
+    # Running jobs no longer count towards the depth
+    queue.claim("w")
+    queue.enqueue("Outlets in Cheras")
+    assert queue.metrics()["queue_depth"] == 3
+
+
+def test_latest_returns_the_last_completed_job_of_a_session(queue):
+    assert queue.latest("a") is None
+    job_id, _, _ = queue.enqueue("Outlets in Cheras", session_id="a")
+    queue.claim("w")
+    queue.complete(job_id, "Two outlets")
+    other, _, _ = queue.enqueue("Outlets in Ampang", session_id="b")
+    queue.claim("w")
+    queue.fail(other, "model error")
+    assert queue.latest("a")["response"] == "Two outlets"
+    assert queue.latest("b") is None
+    assert queue.metrics()["jobs"] == {QUEUED: 0, RUNNING: 0, DONE: 1, ERROR: 1}
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+import llm_train
+import tracing
+from outlet_snapshot import outlet_snapshot
+
+
+class ThreadRecordingCache:
+    """Response cache stand-in that remembers which thread each call ran on"""
+
+    def __init__(self, cached):
+        self.cached = cached
+        self.threads = []
+
+    def get(self, query, data_version):
+        self.threads.append(threading.get_ident())
+        return self.cached
+
+
+def serve_outlets(outlet_records, monkeypatch):
+    outlets = [dict(outlet, id=i + 1) for i, outlet in enumerate(outlet_records)]
+    monkeypatch.setattr(outlet_snapshot, "loader", lambda: outlets)
+    monkeypatch.setattr(outlet_snapshot, "version_loader", lambda: "test")
+    outlet_snapshot.invalidate()
+
+
+def test_response_cache_lookup_runs_off_the_event_loop(outlet_records, monkeypatch):
+    serve_outlets(outlet_records, monkeypatch)
+    cache = ThreadRecordingCache("McDonald's Bangsar hosts birthday parties.")
+    monkeypatch.setattr(llm_train, "response_cache", cache)
+
+    async def ask():
+        loop_thread = threading.get_ident()
+        response = await llm_train.aprocess_query("Which outlet allows birthday parties?")
+        return loop_thread, response
+
+    loop_thread, response = asyncio.run(ask())
+    assert response == cache.cached
+    assert cache.threads and loop_thread not in cache.threads
+
+
+def test_route_and_cache_hit_go_to_the_trace_not_stdout(outlet_records, monkeypatch, capsys):
+    serve_outlets(outlet_records, monkeypatch)
+    monkeypatch.setattr(llm_train, "response_cache", ThreadRecordingCache("Cached answer"))
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", True)
+
+    assert llm_train.process_query("Which outlet allows birthday parties?") == "Cached answer"
+    attributes = tracing.recent_traces(1)[0]["attributes"]
+    assert attributes["route"] and attributes["response_cache"] == "hit"
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from job_queue import QUEUED, JobQueue
+from llm_worker import run_worker
+
+
+class SlowClaimQueue(JobQueue):
+    """Claims take a while, so a worker can be cancelled while one is in flight"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.claiming = threading.Event()
+
+    def claim(self, worker):
+        self.claiming.set()
+        time.sleep(0.2)
+        return super().claim(worker)
+
+
+def test_job_claimed_while_the_worker_is_cancelled_goes_back_to_the_queue(tmp_path):
+    queue = SlowClaimQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id, _, _ = queue.enqueue("Which outlets are open 24 hours?")
+
+    async def process(query):
+        raise AssertionError("a cancelled worker must not run the job")
+
+    async def cancel_mid_claim():
+        worker = asyncio.create_task(run_worker(queue, process, concurrency=1))
+        await asyncio.to_thread(queue.claiming.wait)
+        worker.cancel()
+        try:
+            await worker
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(cancel_mid_claim())
+    job = queue.get(job_id)
+    assert job["status"] == QUEUED and job["attempts"] == 0
+
+
+def test_last_answer_is_only_returned_to_its_own_session(tmp_path, monkeypatch):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    for session_id, answer in (("alice", "Alice's answer"), ("bob", "Bob's answer")):
+        job_id, _, _ = queue.enqueue("Which outlets are open 24 hours?", session_id=session_id)
+        queue.complete(job_id, answer)
+    monkeypatch.setattr(main, "get_job_queue", lambda: queue)
+    monkeypatch.setattr(main, "session_memory", None)
+
+    client = TestClient(main.app)
+    assert client.get("/llmresponses").status_code == 422
+    assert client.get("/llmresponses", params={"session_id": "alice"}).json() == {"llmresponse": "Alice's answer"}
+    assert client.get("/llmresponses", params={"session_id": "carol"}).json() == {"llmresponse": ""}
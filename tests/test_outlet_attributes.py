@@ -0,0 +1,99 @@
+import pytest
+
+import outlet_enrichment
+from outlet_attributes import ATTRIBUTES, NO, UNKNOWN, YES
+from outlet_enrichment import default_sources, enrich_outlets, enrichment_hash
+from outlet_query import run_outlet_query
+from outlet_snapshot import Snapshot
+from query_router import route_query
+
+
+def enriched(outlet_records, **columns):
+    """Snapshot whose rows carry attribute columns; `columns` maps attribute -> {name: value}"""
+    rows = []
+    for i, outlet in enumerate(outlet_records):
+        row = dict(outlet, id=i + 1)
+        for attribute, values in columns.items():
+            row[attribute] = values.get(outlet["name"])
+        rows.append(row)
+    return Snapshot(1, rows)
+
+
+def test_dt_name_is_a_drive_thru_and_other_names_stay_unknown(snapshot):
+    names = [outlet["name"] for outlet in snapshot.outlets]
+    values = snapshot.attributes["drive_thru"]
+    assert values[names.index("McDonald's Pandan Mewah DT")] == YES
+    assert values[names.index("McDonald's Bangsar")] == UNKNOWN
+
+
+def test_unknown_drive_thru_goes_to_the_agents(snapshot):
+    assert route_query("Does McDonald's Bangsar have a drive-thru?", snapshot).kind == "llm"
+    assert route_query("Which outlets have a drive-thru?", snapshot).kind == "llm"
+    assert "no drive-thru data" in run_outlet_query(snapshot, drive_thru=False)
+
+
+def test_known_attributes_are_answered_locally(outlet_records):
+    names = [outlet["name"] for outlet in outlet_records]
+    snapshot = enriched(outlet_records, open_24h={name: i % 2 == 0 for i, name in enumerate(names)},
+                        drive_thru={"McDonald's Bangsar": False})
+    assert snapshot.attributes["drive_thru"][names.index("McDonald's Bangsar")] == NO
+    route = route_query("Does McDonald's Bangsar have a drive-thru?", snapshot)
+    assert route.response == "McDonald's Bangsar does not have a drive-thru."
+    route = route_query("Which outlets are open 24 hours?", snapshot)
+    assert route.kind == "answer" and route.response.startswith(f"{(len(names) + 1) // 2} McDonald's outlets")
+
+
+class EnrichedTable:
+    """Cursor stand-in over mcdonalds_ai rows as enrich_outlets selects them"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.description = [(column,) for column in ("name", "row_hash", "attributes_hash", *ATTRIBUTES)]
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return [tuple(row.get(column[0]) for column in self.description) for row in self.rows]
+
+
+def stored_row(name, **attributes):
+    return dict({"name": name, "row_hash": f"hash of {name}", "attributes_hash": None}, **attributes)
+
+
+@pytest.fixture
+def written(monkeypatch):
+    """Rows enrich_outlets writes, as {name: {column: value}}; the table version bumps to 2"""
+    rows = {}
+
+    def execute_values(cur, sql, values, template, page_size):
+        for name, *values in values:
+            rows[name] = dict(zip([*ATTRIBUTES, "attributes_hash"], values))
+
+    monkeypatch.setattr(outlet_enrichment, "execute_values", execute_values)
+    monkeypatch.setattr(outlet_enrichment, "bump_version", lambda cur: 2)
+    return rows
+
+
+def test_enrichment_skips_outlets_whose_input_is_unchanged(written):
+    sources = default_sources()
+    rows = [stored_row("McDonald's Bangsar"), stored_row("McDonald's Pandan Mewah DT", drive_thru=True)]
+    for row in rows:
+        row["attributes_hash"] = enrichment_hash(row, sources)
+    summary = enrich_outlets(EnrichedTable(rows), sources)
+    assert summary == {"version": None, "processed": 0, "changed": 0, "skipped": 2}
+    assert written == {}
+    # --full derives them again, but nothing changes
+    assert enrich_outlets(EnrichedTable(rows), sources, full=True)["processed"] == 2
+
+
+def test_enrichment_keeps_stored_values_a_source_does_not_know(written):
+    rows = [stored_row("McDonald's Bangsar", open_24h=True, birthday_party=False),
+            stored_row("McDonald's Pandan Mewah DT", open_24h=False)]
+    summary = enrich_outlets(EnrichedTable(rows), default_sources())
+    assert summary == {"version": 2, "processed": 2, "changed": 1, "skipped": 0}
+    bangsar, pandan = written["McDonald's Bangsar"], written["McDonald's Pandan Mewah DT"]
+    # The name source only tells drive-thru yes; nothing else may be cleared to NULL
+    assert (bangsar["open_24h"], bangsar["birthday_party"], bangsar["drive_thru"]) == (True, False, None)
+    assert (pandan["drive_thru"], pandan["open_24h"]) == (True, False)
+    assert bangsar["attributes_hash"] == enrichment_hash(rows[0], default_sources())
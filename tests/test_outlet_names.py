@@ -0,0 +1,24 @@
+import difflib
+
+import pytest
+
+from outlet_names import RESOLVE_CUTOFF, OutletNameIndex, outlet_key
+
+
+def best_matches(index, name, cutoff):
+    """Reference lookup_fuzzy: score every key with difflib, keep the best at or above `cutoff`"""
+    key = outlet_key(name)
+    scores = {other: difflib.SequenceMatcher(None, other, key).ratio() for other in index.keys}
+    best = max(scores.values())
+    return sorted(i for other, score in scores.items() if score == best and score >= cutoff
+                  for i in index.exact[other])
+
+
+@pytest.mark.parametrize("cutoff", [RESOLVE_CUTOFF, 0.88])
+def test_fuzzy_lookup_matches_scoring_every_key(outlet_records, cutoff):
+    index = OutletNameIndex(outlet_records)
+    for outlet in outlet_records[::3]:
+        key = outlet_key(outlet["name"])
+        for position in range(0, len(key), 2):
+            typo = key[:position] + key[position + 1:]
+            assert sorted(index.lookup_fuzzy(typo, cutoff)) == best_matches(index, typo, cutoff), typo
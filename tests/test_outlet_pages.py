@@ -0,0 +1,43 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from outlet_pages import OUTLET_FIELDS, encode_page
+from outlet_snapshot import outlet_snapshot
+
+
+def expected_columns(snapshot, indices, fields):
+    return {field: [snapshot.outlets[i].get(field) for i in indices] for field in fields}
+
+
+def test_msgpack_page_round_trips(snapshot):
+    msgpack = pytest.importorskip("msgpack")
+    indices = list(range(5))
+    body, media_type = encode_page(snapshot, indices, OUTLET_FIELDS, "msgpack")
+    assert media_type == "application/msgpack"
+    assert msgpack.unpackb(body) == expected_columns(snapshot, indices, OUTLET_FIELDS)
+
+
+def test_arrow_page_round_trips(snapshot):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+
+    indices = list(range(3, 9))
+    fields = ("id", "name", "latitude")
+    body, media_type = encode_page(snapshot, indices, fields, "arrow")
+    assert media_type == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(io.BytesIO(body)).read_all()
+    assert table.to_pydict() == expected_columns(snapshot, indices, fields)
+
+
+def test_full_list_varies_on_accept(outlet_records, monkeypatch):
+    outlets = [dict(outlet, id=i + 1) for i, outlet in enumerate(outlet_records)]
+    monkeypatch.setattr(outlet_snapshot, "loader", lambda: outlets)
+    monkeypatch.setattr(outlet_snapshot, "version_loader", lambda: "test")
+    outlet_snapshot.invalidate()
+
+    response = TestClient(main.app).get("/outlets")
+    assert response.status_code == 200
+    assert {part.strip() for part in response.headers["vary"].split(",")} >= {"Accept", "Accept-Encoding"}
@@ -0,0 +1,46 @@
+import outlet_sync
+from outlet_loader import iter_chunks
+from outlet_sync import STAGING_COLUMNS, sync_outlets
+
+
+class StoredTable:
+    """Cursor stand-in over (name, row_hash) rows; records every statement it is given"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def fetchall(self):
+        return list(self.rows)
+
+
+def loaded_rows(records):
+    """(name, row_hash) pairs outlet_loader.py would COPY for `records`"""
+    stats = {"rows": 0, "skipped": 0}
+    name, row_hash = STAGING_COLUMNS.index("name"), STAGING_COLUMNS.index("row_hash")
+    return [(row[name], row[row_hash]) for chunk in iter_chunks(records, 1000, stats) for row in chunk]
+
+
+def test_scrape_after_file_load_changes_nothing(outlet_records):
+    # Some scraped names end in a space; both paths must agree on the key and the hash
+    assert any(record["name"] != record["name"].strip() for record in outlet_records)
+    cur = StoredTable(loaded_rows(outlet_records))
+    summary = sync_outlets(cur, outlet_records)
+    assert summary == {"version": None, "inserted": 0, "updated": 0, "deleted": 0,
+                       "unchanged": len(outlet_records)}
+    assert not any("DELETE" in sql or "INSERT" in sql for sql in cur.statements if "CREATE" not in sql)
+
+
+def test_changed_outlet_is_still_detected(outlet_records, monkeypatch):
+    written = []
+    monkeypatch.setattr(outlet_sync, "execute_values", lambda cur, sql, rows, page_size: written.extend(rows))
+    monkeypatch.setattr(outlet_sync, "bump_version", lambda cur: 2)
+    cur = StoredTable(loaded_rows(outlet_records))
+    scraped = [dict(record) for record in outlet_records]
+    scraped[0]["telephone"] = "03-00000000"
+    summary = sync_outlets(cur, scraped)
+    assert (summary["version"], summary["updated"], summary["deleted"], summary["inserted"]) == (2, 1, 0, 0)
+    assert written[0][0] == outlet_records[0]["name"].strip()
@@ -0,0 +1,29 @@
+from response_cache import InMemoryBackend, ResponseCache, SQLiteBackend, cache_key, hashing_embedder
+
+
+def test_semantic_vectors_follow_backend_evictions():
+    cache = ResponseCache(InMemoryBackend(max_entries=3), embed=hashing_embedder())
+    for number in range(5):
+        cache.put(f"Which outlets are open in Kuala Lumpur {number}?", "v1", f"answer {number}")
+    assert len(cache.vectors) == len(cache.backend) == 3
+    assert {key for key in cache.vectors.rows} == set(cache.backend._entries)
+
+
+def test_stale_top_candidate_falls_through_to_the_next_one():
+    cache = ResponseCache(InMemoryBackend(), embed=hashing_embedder(), threshold=0.3)
+    cache.put("Which outlets in Bangsar are open 24 hours?", "v1", "Bangsar")
+    cache.put("Which outlets in Cheras have a drive-thru?", "v1", "Cheras")
+    # Removed behind the index's back, as another process sharing the backend would
+    cache.backend.delete(cache_key("Which outlets in Bangsar are open 24 hours?", "v1"))
+    assert cache.get("Which outlets in Bangsar are open 24 hours today?", "v1") == "Cheras"
+
+
+def test_shared_backend_survives_a_version_change(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer, reader = ResponseCache(SQLiteBackend(path)), ResponseCache(SQLiteBackend(path))
+    assert reader.get("Which outlets are open 24 hours?", "v1") is None
+    writer.get("Which outlets are open 24 hours?", "v2")
+    writer.put("Which outlets are open 24 hours?", "v2", "Bangsar")
+    # The reader sees v2 for the first time; the writer's v2 entry must not be wiped
+    assert reader.get("Which outlets are open 24 hours?", "v2") == "Bangsar"
+    assert reader.stats()["invalidations"] == 1
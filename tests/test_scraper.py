@@ -0,0 +1,146 @@
+import json
+import time
+
+import pytest
+from selenium.common.exceptions import StaleElementReferenceException
+
+import mcdonalds_scraper
+from mcdonalds_scraper import (FallbackFetcher, SeleniumFetcher, StoreFinderFetcher, check_store_finder_stores,
+                               make_fetcher_factory)
+
+
+def stores(state, count=3, address="Jalan {i}, 50450 {state}"):
+    return [{"name": f"McDonald's {state} {i}", "address": address.format(i=i, state=state),
+             "lat": 3.1, "lng": 101.7} for i in range(count)]
+
+
+class StaticFetcher:
+    def __init__(self, items):
+        self.items = items
+        self.fetched = []
+
+    def fetch_state(self, state):
+        self.fetched.append(state)
+        return self.items
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def reply(monkeypatch):
+    """The store finder endpoint answers with the JSON of reply["reply"]; the posted form lands in reply"""
+    posted = {}
+
+    def http_request(url, data=None, timeout=None):
+        posted.update(data)
+        return json.dumps(posted["reply"])
+
+    monkeypatch.setattr(mcdonalds_scraper, "http_request", http_request)
+    return posted
+
+
+def test_store_finder_reply_for_the_asked_state_is_used(reply):
+    reply["reply"] = {"stores": stores("Selangor")}
+    items = StoreFinderFetcher().fetch_state("Selangor")
+    assert reply["state"] == "Selangor"
+    assert [item["name"] for item in items] == [f"McDonald's Selangor {i}" for i in range(3)]
+
+
+@pytest.mark.parametrize("bad", [
+    stores("Kuala Lumpur"),                                           # another state's outlets
+    stores("Selangor", mcdonalds_scraper.STORE_FINDER_MAX_STORES + 1),  # the whole country
+    [dict(store, address="") for store in stores("Selangor")],        # no addresses
+    [{"name": "", "address": "Jalan 1, Selangor", "lat": 3.1, "lng": 101.7}],  # no name
+    [dict(store, lat=None) for store in stores("Selangor")],          # no coordinates
+    [dict(store, lat=51.5, lng=-0.1) for store in stores("Selangor")],  # outside the country
+])
+def test_implausible_store_finder_replies_are_rejected(reply, bad):
+    reply["reply"] = {"stores": bad}
+    with pytest.raises(ValueError):
+        StoreFinderFetcher().fetch_state("Selangor")
+
+
+def test_state_field_counts_when_addresses_do_not_name_the_state():
+    check_store_finder_stores("Selangor", [dict(store, state="Selangor")
+                                           for store in stores("Selangor", address="Jalan {i}, Shah Alam")])
+    with pytest.raises(ValueError):
+        check_store_finder_stores("Selangor", stores("Selangor", address="Jalan {i}, Shah Alam"))
+
+
+def test_state_aliases_count_as_the_state():
+    check_store_finder_stores("Pulau Pinang", stores("Penang", address="Jalan {i}, 10200 {state}"))
+    check_store_finder_stores("Melaka", stores("Malacca"))
+
+
+def test_store_finder_modes_need_an_explicit_flag_on_the_live_site():
+    with pytest.raises(ValueError):
+        make_fetcher_factory("auto")
+    assert make_fetcher_factory("auto", unverified=True)
+    assert make_fetcher_factory("http", fixtures="http://127.0.0.1:8765")
+    assert make_fetcher_factory("selenium")
+
+
+def test_auto_mode_falls_back_to_selenium_on_an_implausible_reply(reply):
+    reply["reply"] = {"stores": stores("Kuala Lumpur")}
+    browser = StaticFetcher([{"name": "McDonald's Shah Alam", "address": "Shah Alam, Selangor"}])
+    fetcher = FallbackFetcher(StoreFinderFetcher(), lambda: browser)
+    assert fetcher.fetch_state("Selangor") == browser.items
+    assert browser.fetched == ["Selangor"]
+
+
+class FakeElement:
+    def __init__(self, stale=lambda: False):
+        self.stale = stale
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        if self.stale():
+            raise StaleElementReferenceException()
+        return True
+
+
+class LocatorPage:
+    """A locator page that shows Kuala Lumpur on load and swaps in the selected state's results 0.1 s later"""
+
+    def __init__(self):
+        self.selected_at = None
+
+    def loaded(self):
+        return self.selected_at is not None and time.monotonic() - self.selected_at > 0.1
+
+    def get(self, url):
+        self.selected_at = None
+        self.initial = FakeElement(stale=self.loaded)
+
+    def find_element(self, by, value):
+        return FakeElement()
+
+    def find_elements(self, by, value):
+        return [] if self.loaded() else [self.initial]
+
+    def execute_script(self, script):
+        state = self.state if self.loaded() else "Kuala Lumpur"
+        return [json.dumps({"name": f"McDonald's {state}", "address": f"Jalan 1, {state}",
+                            "geo": {"latitude": 3.1, "longitude": 101.7}})]
+
+
+def test_selenium_fetch_waits_for_the_selected_state_to_replace_the_initial_results(monkeypatch):
+    page = LocatorPage()
+
+    class Select:
+        def __init__(self, dropdown):
+            pass
+
+        def select_by_value(self, state):
+            page.state, page.selected_at = state, time.monotonic()
+
+    monkeypatch.setattr(mcdonalds_scraper, "Select", Select)
+    fetcher = SeleniumFetcher(timeout=5)
+    fetcher.driver = page
+    assert [item["name"] for item in fetcher.fetch_state("Selangor")] == ["McDonald's Selangor"]
@@ -0,0 +1,47 @@
+import pytest
+
+import session_memory
+from query_router import route_query
+from response_cache import InMemoryBackend, SQLiteBackend
+from session_memory import resolve_follow_up
+
+BANGSAR_TURN = {"query": "Where is McDonald's Bangsar?", "outlets": ["McDonald's Bangsar"]}
+
+
+@pytest.mark.parametrize("query", [
+    "Is there any outlet open 24 hours?",
+    "Is there a drive-thru outlet in Cheras?",
+    "Which one is the same as KFC?",
+    "Is it possible to book a birthday party at any outlet?",
+])
+def test_standalone_questions_are_not_follow_ups(snapshot, query):
+    assert resolve_follow_up(query, [BANGSAR_TURN], snapshot) is None
+
+
+def test_competitor_question_is_still_rejected(snapshot):
+    query = "Is their burger cheaper than KFC?"
+    assert resolve_follow_up(query, [BANGSAR_TURN], snapshot) is None
+    assert route_query(query, snapshot).kind == "reject"
+
+
+def test_pronoun_follow_up_is_answered_from_the_snapshot(snapshot):
+    follow_up = resolve_follow_up("What is its phone number?", [BANGSAR_TURN], snapshot)
+    assert follow_up.outlets == ["McDonald's Bangsar"]
+    assert "03-22012551" in follow_up.response
+
+
+def test_follow_up_is_rewritten_to_name_the_earlier_outlets(snapshot):
+    follow_up = resolve_follow_up("Which of those are open 24 hours?", [BANGSAR_TURN], snapshot)
+    assert follow_up.response is None
+    assert follow_up.query == "Which of those are open 24 hours, regarding McDonald's Bangsar?"
+
+
+def test_auto_backend_is_shared_with_out_of_process_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_memory, "SESSION_PATH", str(tmp_path / "sessions.sqlite3"))
+    assert isinstance(session_memory.create_session_memory("auto", out_of_process=True).backend, SQLiteBackend)
+    assert isinstance(session_memory.create_session_memory("auto", out_of_process=False).backend, InMemoryBackend)
+
+
+def test_memory_backend_is_refused_with_out_of_process_workers():
+    with pytest.raises(ValueError):
+        session_memory.create_session_memory("memory", out_of_process=True)
@@ -0,0 +1,130 @@
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from geo_index import haversine_km
+
+# Web-mercator tiles are TILE_SIZE px wide; points are clustered in square cells of CLUSTER_CELL_PX
+TILE_SIZE = 256
+CLUSTER_CELL_PX = 64
+MAX_ZOOM = 20
+# Radius of the coverage circle drawn around every outlet on the map
+COVERAGE_RADIUS_KM = 5.0
+TILE_CACHE_SIZE = int(os.getenv("TILE_CACHE_SIZE", "4096"))
+MAX_MERCATOR_LAT = 85.05112878
+# Outlet fields sent with single-outlet clusters so the map can show a popup
+OUTLET_TILE_FIELDS = ("id", "name", "address", "telephone", "waze_link")
+
+
+def mercator(lat, lon):
+    """Normalized web-mercator (x, y) in [0, 1] for degree arrays; y grows southwards like tile rows"""
+    lat = np.radians(np.clip(np.asarray(lat, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0
+    return x, y
+
+
+class ClusterLevel:
+    """Grid clusters of one zoom level, sorted by cell key (row-major over the whole world)"""
+
+    def __init__(self, keys, lat, lon, counts, radius_km, first):
+        self.keys = keys
+        self.lat = lat
+        self.lon = lon
+        self.counts = counts
+        self.radius_km = radius_km
+        self.first = first   # original index of one member; the outlet itself for single-outlet clusters
+
+
+class TileIndex:
+    """Zoom-level clusters of a fixed set of outlets, served as XYZ tiles.
+
+    Each zoom level groups the points into CLUSTER_CELL_PX grid cells of the
+    web-mercator plane, with the members' centroid, count and a coverage
+    radius (farthest member from the centroid plus COVERAGE_RADIUS_KM), so a
+    tile holds at most (TILE_SIZE / CLUSTER_CELL_PX)^2 clusters whatever the
+    dataset size. Levels are built on first use; rendered tiles are kept in
+    an LRU. An index belongs to one outlet snapshot, so a re-scrape (a new
+    snapshot) starts with an empty cache.
+    """
+
+    def __init__(self, outlets, cell_px=CLUSTER_CELL_PX, coverage_km=COVERAGE_RADIUS_KM,
+                 cache_size=TILE_CACHE_SIZE):
+        self.outlets = outlets
+        self.lat = np.asarray([float(o["latitude"]) for o in outlets], dtype=np.float64)
+        self.lon = np.asarray([float(o["longitude"]) for o in outlets], dtype=np.float64)
+        self.x, self.y = mercator(self.lat, self.lon)
+        self.cells_per_tile = TILE_SIZE // cell_px
+        self.coverage_km = coverage_km
+        self.cache_size = cache_size
+        self._levels = {}
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def level(self, zoom):
+        """Clusters of one zoom level, built on first use"""
+        level = self._levels.get(zoom)
+        if level is None:
+            level = self._build_level(zoom)
+            self._levels[zoom] = level
+        return level
+
+    def _build_level(self, zoom):
+        cells = (1 << zoom) * self.cells_per_tile
+        cols = np.clip(np.floor(self.x * cells), 0, cells - 1).astype(np.int64)
+        rows = np.clip(np.floor(self.y * cells), 0, cells - 1).astype(np.int64)
+        keys = rows * cells + cols
+        order = np.argsort(keys, kind="stable")
+        if len(order) == 0:
+            empty = np.empty(0)
+            return ClusterLevel(np.empty(0, dtype=np.int64), empty, empty, np.empty(0, dtype=np.int64), empty,
+                                np.empty(0, dtype=np.int64))
+        cell_keys, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+        lat, lon = self.lat[order], self.lon[order]
+        centre_lat = np.add.reduceat(lat, starts) / counts
+        centre_lon = np.add.reduceat(lon, starts) / counts
+        members = np.repeat(np.arange(len(cell_keys)), counts)
+        spread = haversine_km(lat, lon, centre_lat[members], centre_lon[members])
+        radius = np.maximum.reduceat(spread, starts) + self.coverage_km
+        return ClusterLevel(cell_keys, centre_lat, centre_lon, counts, radius, order[starts])
+
+    def _tile_clusters(self, zoom, x, y):
+        """Positions (in the zoom level's arrays) of the clusters inside one tile"""
+        level = self.level(zoom)
+        cells = (1 << zoom) * self.cells_per_tile
+        rows = np.arange(y * self.cells_per_tile, (y + 1) * self.cells_per_tile)
+        low = np.searchsorted(level.keys, rows * cells + x * self.cells_per_tile)
+        high = np.searchsorted(level.keys, rows * cells + (x + 1) * self.cells_per_tile)
+        return level, np.concatenate([np.arange(a, b) for a, b in zip(low, high)])
+
+    def render(self, zoom, x, y):
+        """JSON body of one tile, cached"""
+        key = (zoom, x, y)
+        with self._lock:
+            body = self._tiles.get(key)
+            if body is not None:
+                self._tiles.move_to_end(key)
+                return body
+            level, positions = self._tile_clusters(zoom, x, y)
+            clusters = []
+            for i in positions:
+                cluster = {
+                    "lat": round(float(level.lat[i]), 6),
+                    "lng": round(float(level.lon[i]), 6),
+                    "count": int(level.counts[i]),
+                    "radius_km": round(float(level.radius_km[i]), 3),
+                }
+                if cluster["count"] == 1:
+                    outlet = self.outlets[level.first[i]]
+                    cluster["outlet"] = {field: outlet.get(field) for field in OUTLET_TILE_FIELDS}
+                clusters.append(cluster)
+            body = json.dumps({"z": zoom, "x": x, "y": y, "clusters": clusters},
+                              ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self._tiles[key] = body
+            if len(self._tiles) > self.cache_size:
+                self._tiles.popitem(last=False)
+            return body
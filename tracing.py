@@ -0,0 +1,405 @@
+"""Spans, counters and latency histograms for the query pipeline.
+
+A trace covers one query; inside it, spans record pipeline stages, LLM calls,
+tool calls and database queries with their duration and status. Every span
+also feeds the `pipeline_span_seconds` histogram, and LLM spans add their
+token counts to `llm_tokens_total`. `render_metrics` serves the registry in
+the Prometheus text format. Finished traces are kept in a short in-memory
+ring and, with TRACE_EXPORT_PATH set, appended to that file as JSON lines.
+
+With PIPELINE_TRACING=off, `span` returns a shared null context, `count` and
+`observe` return at once, and no LangChain callback is attached, so the
+pipeline pays a single flag check per call site.
+"""
+import bisect
+import contextlib
+import contextvars
+import itertools
+import json
+import math
+import os
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+TRACING_ENABLED = os.getenv("PIPELINE_TRACING", "on").lower() not in ("0", "off", "false", "no")
+# JSON-lines file every finished trace is appended to (off when unset)
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")
+RECENT_TRACES = int(os.getenv("TRACE_RECENT", "100"))
+# Histogram upper bounds in seconds, from a cache hit to a slow agent run
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+METRIC_HELP = {
+    "pipeline_trace_seconds": "End-to-end latency of traced queries",
+    "pipeline_traces_total": "Traced queries by outcome",
+    "pipeline_span_seconds": "Latency of pipeline stages, LLM calls, tool calls and DB queries",
+    "pipeline_retries_total": "Retried LLM calls and restarted speculative searches",
+    "llm_calls_total": "LLM calls by pipeline stage, model and outcome",
+    "llm_tokens_total": "LLM prompt and completion tokens by pipeline stage",
+    "tool_calls_total": "Agent tool calls by tool and outcome",
+}
+
+_NULL_CONTEXT = contextlib.nullcontext()
+_current_trace = contextvars.ContextVar("trace", default=None)
+_current_span = contextvars.ContextVar("span", default=None)
+# Span ids only need to be unique within a process's traces
+_span_ids = itertools.count(1)
+
+
+#====================================
+# Metric registry
+
+class Metrics:
+    """Labelled counters and fixed-bucket histograms, rendered in the Prometheus text format"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counters = defaultdict(float)       # (name, labels) -> value
+        self.histograms = {}                      # (name, labels) -> [per-bucket counts..., +Inf, sum]
+        self._lock = threading.Lock()
+
+    def inc(self, metric, value=1, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] += value
+
+    def observe(self, metric, seconds, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(self.buckets) + 2)
+            histogram[bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram[-1] += seconds
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, list(value)) for key, value in self.histograms.items())
+        lines, declared = [], set()
+
+        def declare(name, kind):
+            if name not in declared:
+                declared.add(name)
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), histogram in histograms:
+            declare(name, "histogram")
+            cumulative = list(itertools.accumulate(histogram[:-1]))
+            for bound, count in zip(self.buckets, cumulative):
+                lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {count}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {cumulative[-1]}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(histogram[-1])}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative[-1]}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if isinstance(value, float) and math.isfinite(value) and value == int(value):
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render_stats(name, stats, help=""):
+    """Gauge lines for the numeric leaves of a stats dict (e.g. cache or queue metrics), keyed by label"""
+    lines = [f"# HELP {name} {help}"] if help else []
+    lines.append(f"# TYPE {name} gauge")
+    for key, value in _flatten(stats):
+        lines.append(f'{name}{{key="{_escape(key)}"}} {_number(float(value))}')
+    return "\n".join(lines) + "\n"
+
+
+def _flatten(stats, prefix=""):
+    for key, value in stats.items():
+        key = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield key, value
+
+
+metrics = Metrics()
+
+
+def count(metric, value=1, **labels):
+    """Add to a counter; a no-op when tracing is off"""
+    if TRACING_ENABLED:
+        metrics.inc(metric, value, **labels)
+
+
+def observe(metric, seconds, **labels):
+    if TRACING_ENABLED:
+        metrics.observe(metric, seconds, **labels)
+
+
+def render_metrics():
+    return metrics.render()
+
+
+#====================================
+# Traces and spans
+
+class Trace:
+    """Spans of one query, plus its token totals"""
+
+    def __init__(self, name, attributes):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes = attributes
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.spans = []
+        self.tokens = defaultdict(int)
+
+    def offset_ms(self, moment):
+        return round((moment - self.started) * 1000, 2)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.offset_ms(time.perf_counter()),
+            "attributes": self.attributes,
+            "tokens": dict(self.tokens),
+            "spans": self.spans,
+        }
+
+
+class Span:
+    """One timed operation inside a trace; `attributes` may be extended while it runs"""
+
+    __slots__ = ("span_id", "parent_id", "kind", "name", "started", "attributes", "status")
+
+    def __init__(self, kind, name, parent_id, attributes):
+        self.span_id = next(_span_ids)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.name = name
+        self.started = time.perf_counter()
+        self.attributes = attributes
+        self.status = "ok"
+
+    def finish(self, trace):
+        duration = time.perf_counter() - self.started
+        observe("pipeline_span_seconds", duration, kind=self.kind, name=self.name, status=self.status)
+        if trace is not None:
+            trace.spans.append({
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "kind": self.kind,
+                "name": self.name,
+                "start_ms": trace.offset_ms(self.started),
+                "duration_ms": round(duration * 1000, 2),
+                "status": self.status,
+                **({"attributes": self.attributes} if self.attributes else {}),
+            })
+
+
+_recent = deque(maxlen=RECENT_TRACES)
+_export_lock = threading.Lock()
+
+
+def recent_traces(limit=20):
+    """The most recently finished traces, newest first"""
+    return list(_recent)[::-1][:limit]
+
+
+def _export(trace):
+    record = trace.to_dict()
+    _recent.append(record)
+    if TRACE_EXPORT_PATH:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with _export_lock, open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+@contextlib.contextmanager
+def _trace(name, attributes):
+    trace = Trace(name, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    status = "ok"
+    try:
+        yield trace
+    except BaseException as e:
+        status = _status(e)
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        duration = time.perf_counter() - trace.started
+        observe("pipeline_trace_seconds", duration, name=name, status=status)
+        count("pipeline_traces_total", name=name, status=status)
+        _export(trace)
+
+
+def trace(name, **attributes):
+    """Context manager opening a trace for one query; yields the Trace (None when tracing is off)"""
+    if not TRACING_ENABLED:
+        return _NULL_CONTEXT
+    return _trace(name, attributes)
+
+
+@contextlib.contextmanager
+def _span(kind, name, attributes):
+    parent = _current_span.get()
+    span = Span(kind, name, parent.span_id if parent else None, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = _status(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.finish(_current_trace.get())
+
+
+def span(kind, name, **attributes):
+    """Context manager timing one operation (a stage, tool or DB query) in the current trace.
+
+    Yields the Span so callers can add attributes, or None when tracing is off.
+    """
+    if not TRACING_ENABLED:
+        return _NULL_CONTEXT
+    return _span(kind, name, attributes)
+
+
+def annotate(**attributes):
+    """Add attributes to the current trace, e.g. the route taken or a cache hit"""
+    trace = _current_trace.get() if TRACING_ENABLED else None
+    if trace is not None:
+        trace.attributes.update(attributes)
+
+
+def _status(error):
+    name = type(error).__name__
+    if name == "CancelledError":
+        return "cancelled"
+    if name in ("TimeoutError", "StageTimeout"):
+        return "timeout"
+    return "error"
+
+
+#====================================
+# LangChain callbacks
+
+class TracingCallback(BaseCallbackHandler):
+    """Records a span per LLM and tool call, with token usage, errors and retries.
+
+    Runs inline on the caller's event loop so it sees the caller's trace and
+    pipeline stage; start times are kept by LangChain run id until the call ends.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._runs = {}   # run_id -> (span, trace)
+
+    def _start(self, run_id, kind, name, attributes=None):
+        parent = _current_span.get()
+        span = Span(kind, name, parent.span_id if parent else None, attributes or {})
+        if parent is not None and parent.kind == "stage":
+            span.attributes["stage"] = parent.name
+        self._runs[run_id] = (span, _current_trace.get())
+
+    def _end(self, run_id, status="ok"):
+        span, trace = self._runs.pop(run_id, (None, None))
+        if span is not None:
+            span.status = status
+            span.finish(trace)
+        return span, trace
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm", _model_name(serialized, kwargs))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm", _model_name(serialized, kwargs))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        span, trace = self._runs.get(run_id, (None, None))
+        if span is not None:
+            usage = _token_usage(response)
+            stage = span.attributes.get("stage", "none")
+            for kind, tokens in usage.items():
+                span.attributes[f"{kind}_tokens"] = tokens
+                count("llm_tokens_total", tokens, stage=stage, type=kind)
+                if trace is not None:
+                    trace.tokens[kind] += tokens
+            count("llm_calls_total", stage=stage, model=span.name, status="ok")
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        span, _ = self._end(run_id, _status(error))
+        if span is not None:
+            count("llm_calls_total", stage=span.attributes.get("stage", "none"), model=span.name,
+                  status=_status(error))
+
+    def on_retry(self, retry_state, *, run_id, **kwargs):
+        count("pipeline_retries_total", reason="llm")
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name", "unknown")
+        self._start(run_id, "tool", name, {"input": str(input_str)[:200]})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        span, _ = self._end(run_id)
+        if span is not None:
+            count("tool_calls_total", tool=span.name, status="ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        span, _ = self._end(run_id, _status(error))
+        if span is not None:
+            count("tool_calls_total", tool=span.name, status=_status(error))
+
+
+def _model_name(serialized, kwargs):
+    params = kwargs.get("invocation_params") or {}
+    name = params.get("model_name") or params.get("model") or (serialized or {}).get("name") or "llm"
+    return re.sub(r"[^\w.:-]", "_", str(name))
+
+
+def _token_usage(response):
+    """{"prompt": n, "completion": n} from an LLMResult, from llm_output or the messages' usage metadata"""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return {"prompt": usage.get("prompt_tokens", 0), "completion": usage.get("completion_tokens", 0)}
+    totals = defaultdict(int)
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            totals["prompt"] += metadata.get("input_tokens", 0)
+            totals["completion"] += metadata.get("output_tokens", 0)
+    return dict(totals) if any(totals.values()) else {}
+
+
+tracing_callback = TracingCallback() if TRACING_ENABLED else None
+
+
+def callbacks(*extra):
+    """Runtime callbacks for a chain or agent run: `extra` plus the tracing callback when enabled"""
+    return [*extra, tracing_callback] if tracing_callback is not None else list(extra)